@@ -0,0 +1,158 @@
+"""Document parsers benchmark: parse time, blocks, chunks and peak memory for
+every registered format::
+
+    python -m benchmarks.document_parsers --pages 1000
+    python -m benchmarks.document_parsers --files rules.pdf rules.odt
+
+Without ``--files`` synthetic docx, pdf, odt and md documents of about the
+same text volume are generated.
+"""
+
+import argparse
+import io
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+from benchmarks.docx_parser import make_document
+from src.elastic.doc_parser import StructureChunker, parser_registry
+
+LINES_PER_PAGE = 50
+PARAGRAPH_LINES = 5
+
+
+def make_pdf(pages: int) -> bytes:
+    """Minimal pdf with a Helvetica text layer, one sentence per 5 lines."""
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in range(pages):
+        lines = []
+        for line in range(LINES_PER_PAGE):
+            end = "." if line % PARAGRAPH_LINES == PARAGRAPH_LINES - 1 else ""
+            lines.append(
+                f"({page}-{line} minimum setback from the red line{end}) Tj T*"
+            )
+        lines.append(f"({page + 1}) Tj")
+        content = ("BT /F1 10 Tf 12 TL 50 800 Td " + " ".join(lines) + " ET").encode()
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode()
+
+    buffer = io.BytesIO()
+    buffer.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(buffer.tell())
+        buffer.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = buffer.tell()
+    buffer.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        buffer.write(b"%010d 00000 n \n" % offset)
+    buffer.write(
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (len(objects) + 1, xref)
+    )
+    return buffer.getvalue()
+
+
+def make_odt(paragraphs: int, tables: int, rows: int) -> bytes:
+
+    body = []
+    every = max(paragraphs // max(tables, 1), 1)
+    for i in range(paragraphs):
+        if i % 50 == 0:
+            body.append(f'<text:h text:outline-level="1">Глава {i // 50}</text:h>')
+        body.append(
+            f"<text:p>Пункт {i}. Минимальный отступ застройки от красной линии "
+            f"— {i % 7} м.</text:p>"
+        )
+        if tables and i % every == 0:
+            cells = "".join(
+                "<table:table-row>"
+                + "".join(
+                    f"<table:table-cell><text:p>{r}:{c}</text:p></table:table-cell>"
+                    for c in range(6)
+                )
+                + "</table:table-row>"
+                for r in range(rows)
+            )
+            body.append(f"<table:table>{cells}</table:table>")
+            tables -= 1
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        "<office:document-content "
+        'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+        'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" '
+        'xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0">'
+        "<office:body><office:text>" + "".join(body) + "</office:text>"
+        "</office:body></office:document-content>"
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("mimetype", "application/vnd.oasis.opendocument.text")
+        archive.writestr("content.xml", content)
+    return buffer.getvalue()
+
+
+def make_markdown(paragraphs: int) -> bytes:
+
+    lines = []
+    for i in range(paragraphs):
+        if i % 50 == 0:
+            lines.append(f"# Глава {i // 50}\n")
+        lines.append(f"Пункт {i}. Минимальный отступ застройки от красной линии.\n")
+    return "\n".join(lines).encode()
+
+
+def measure(file_name: str, data: bytes) -> None:
+
+    parser = parser_registry.get(file_name)
+    chunker = StructureChunker()
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = sum(1 for _ in chunker.chunk(parser.iter_blocks(io.BytesIO(data))))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{file_name:<24} {len(data) / 2**20:7.1f} MiB {elapsed:8.3f} s "
+        f"{chunker.stats.blocks:7d} blocks {chunks:6d} chunks "
+        f"peak {peak / 2**20:7.1f} MiB"
+    )
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", nargs="*", help="documents to parse")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--tables", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.files:
+        for file in map(Path, args.files):
+            measure(file.name, file.read_bytes())
+        return
+
+    paragraphs = args.pages * LINES_PER_PAGE // PARAGRAPH_LINES
+    measure("synthetic.docx", make_document(paragraphs, args.tables, args.rows))
+    measure("synthetic.pdf", make_pdf(args.pages))
+    measure("synthetic.odt", make_odt(paragraphs, args.tables, args.rows))
+    measure("synthetic.md", make_markdown(paragraphs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Docx parsing benchmark: python-docx + pandas table conversion (previous
+DocParser implementation) against the streaming lxml parser::
+
+    python -m benchmarks.docx_parser --paragraphs 20000 --tables 500
+    python -m benchmarks.docx_parser --file regulations.docx
+
+Without ``--file`` a synthetic document with merged table cells is generated.
+"""
+
+import argparse
+import io
+import time
+import tracemalloc
+import warnings
+
+from docx import Document
+
+from src.elastic.doc_parser.doc_parser import DocParser
+
+
+def legacy_iter_contexts(source):
+
+    import pandas as pd
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    parent = Document(source)
+    for child in parent.element.body.iterchildren():
+        if child.tag.endswith("}p"):
+            para = Paragraph(child, parent)
+            if para.text != "":
+                yield para.text, "text"
+        elif child.tag.endswith("}tbl"):
+            table = Table(child, parent)
+            columns = []
+            col_counter = 0
+            for i in [cell.text for cell in table.rows[0].cells if cell]:
+                if i:
+                    columns.append(i)
+                else:
+                    columns.append(f"Без_названия_{col_counter}")
+                    col_counter += 1
+            yield str(
+                pd.DataFrame(
+                    [[cell.text for cell in row.cells] for row in table.rows[1:]],
+                    columns=columns,
+                ).to_dict("list")
+            ), "table"
+
+
+def make_document(paragraphs: int, tables: int, rows: int) -> bytes:
+
+    document = Document()
+    every = max(paragraphs // max(tables, 1), 1)
+    for i in range(paragraphs):
+        document.add_paragraph(
+            f"Пункт {i}. Минимальный отступ застройки от красной линии — {i % 7} м."
+        )
+        if tables and i % every == 0:
+            table = document.add_table(rows=rows, cols=6)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"{r}:{c}"
+            table.cell(1, 0).merge(table.cell(rows - 1, 0))
+            table.cell(0, 1).merge(table.cell(0, 3))
+            tables -= 1
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def measure(name: str, parse, data: bytes) -> None:
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    blocks = sum(1 for _ in parse(io.BytesIO(data)))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<8} {elapsed:8.3f} s  {blocks:7d} blocks  peak {peak / 2**20:8.1f} MiB"
+    )
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", help="docx file to parse")
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--tables", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=20)
+    args = parser.parse_args()
+    # legacy parser warns on every table with merged header cells
+    warnings.simplefilter("ignore", UserWarning)
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            data = f.read()
+    else:
+        data = make_document(args.paragraphs, args.tables, args.rows)
+    print(f"document size {len(data) / 2**20:.1f} MiB")
+
+    start = time.perf_counter()
+    import pandas  # noqa: F401
+
+    print(f"pandas import {time.perf_counter() - start:.3f} s")
+    measure("legacy", legacy_iter_contexts, data)
+    measure("lxml", DocParser.iter_contexts_for_vectorization, data)
+
+
+if __name__ == "__main__":
+    main()
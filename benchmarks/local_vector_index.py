@@ -0,0 +1,148 @@
+"""Retrieval latency of the local vector index against elastic kNN.
+
+Fills an index with random vectors and compares ``client.search`` with
+``LocalVectorIndex.search`` for the same queries, for float32 and int8
+vectors, and reports how many top-k ids agree with elastic::
+
+    python -m benchmarks.local_vector_index --docs 500 2000 --dims 4096 \\
+        --elastic-url http://localhost:9200
+
+Without ``--elastic-url`` the in-memory elastic stand-in is used, so only the
+local search numbers are meaningful.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from elasticsearch import Elasticsearch, helpers
+
+from benchmarks.memory_elastic import memory_client
+from benchmarks.stats import format_latency
+from src.elastic.local_vector_index import LocalVectorIndex
+
+INDEX_NAME = "bench_local_vectors"
+
+
+def fill_index(client: Elasticsearch, docs: int, dims: int, seed: int) -> None:
+
+    client.options(ignore_status=404).indices.delete(index=INDEX_NAME)
+    client.indices.create(
+        index=INDEX_NAME,
+        mappings={
+            "properties": {
+                "body": {"type": "text"},
+                "body_vector": {
+                    "type": "dense_vector",
+                    "dims": dims,
+                    "index": True,
+                    "similarity": "cosine",
+                },
+            }
+        },
+    )
+    rng = np.random.default_rng(seed)
+    helpers.bulk(
+        client,
+        (
+            {
+                "_index": INDEX_NAME,
+                "_id": str(i),
+                "_source": {
+                    "body": f"document {i}",
+                    "body_vector": rng.normal(size=dims).tolist(),
+                },
+            }
+            for i in range(docs)
+        ),
+        chunk_size=200,
+        refresh=True,
+    )
+
+
+def wait_loaded(local_index: LocalVectorIndex, timeout: float = 600) -> None:
+
+    deadline = time.monotonic() + timeout
+    while local_index.get_snapshot(INDEX_NAME) is None:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{INDEX_NAME} was not loaded to the local index")
+        time.sleep(0.1)
+
+
+def measure(search, bodies: list[dict]) -> tuple[list[float], list[list[str]]]:
+
+    latencies, ids = [], []
+    for body in bodies:
+        start = time.perf_counter()
+        response = search(body)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append([hit["_id"] for hit in response["hits"]["hits"]])
+    return latencies, ids
+
+
+def overlap(expected: list[list[str]], actual: list[list[str]]) -> float:
+
+    return sum(
+        len(set(e) & set(a)) / len(e) for e, a in zip(expected, actual) if e
+    ) / max(len(expected), 1)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--elastic-url", help="In-memory elastic by default")
+    parser.add_argument("--docs", type=int, nargs="+", default=[500, 2000])
+    parser.add_argument("--dims", type=int, default=4096)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    client = (
+        Elasticsearch(args.elastic_url, request_timeout=120)
+        if args.elastic_url
+        else memory_client()
+    )
+    rng = np.random.default_rng(args.seed + 1)
+    bodies = [
+        {
+            "knn": {
+                "field": "body_vector",
+                "query_vector": rng.normal(size=args.dims).tolist(),
+                "k": args.k,
+                "num_candidates": max(args.k * 10, 100),
+            },
+            "_source": ["body"],
+        }
+        for _ in range(args.queries)
+    ]
+    try:
+        for docs in args.docs:
+            fill_index(client, docs, args.dims, args.seed)
+            print(f"{docs} documents, {args.dims} dims, top {args.k}")
+            elastic_ms, expected = measure(
+                lambda body: client.search(index=INDEX_NAME, body=body), bodies
+            )
+            print("  " + format_latency("elastic", elastic_ms))
+            for dtype in ("float32", "int8"):
+                with tempfile.TemporaryDirectory() as cache_dir:
+                    local_index = LocalVectorIndex(
+                        client, Path(cache_dir), max_docs=docs, dtype=dtype
+                    )
+                    wait_loaded(local_index)
+                    local_ms, actual = measure(
+                        lambda body: local_index.search(INDEX_NAME, body), bodies
+                    )
+                print(
+                    "  "
+                    + format_latency(f"local {dtype}", local_ms)
+                    + f", top-{args.k} overlap {overlap(expected, actual):.3f}"
+                )
+    finally:
+        client.options(ignore_status=404).indices.delete(index=INDEX_NAME)
+
+
+if __name__ == "__main__":
+    main()
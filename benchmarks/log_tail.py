@@ -0,0 +1,77 @@
+"""Log tail latency on a large log file.
+
+Writes a log file of ``--size-mb`` in the ``init_logs`` format and compares
+reading the last lines by iterating the whole file (the previous
+implementation) with ``LogsService.get_logs`` seeking from the end::
+
+    python -m benchmarks.log_tail --size-mb 500 --length 100 200
+
+Level filtered tails are measured too, they read back until ``--length``
+matching lines are found.
+"""
+
+import argparse
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+
+from benchmarks.stats import format_latency
+from src.logs.logs_service import LogsService
+
+LEVELS = ["INFO"] * 8 + ["WARNING", "ERROR"]
+
+
+def write_log(path: Path, size: int) -> None:
+
+    line = "{} | {} | src.idu_llm.idu_llm_service:generate:42 | Request {} done\n"
+    with open(path, "w", encoding="utf-8") as f:
+        written = number = 0
+        while written < size:
+            text = line.format(
+                "2026-01-01 12:00:00", LEVELS[number % len(LEVELS)], number
+            )
+            written += f.write(text)
+            number += 1
+
+
+def read_all(path: Path, length: int) -> list[str]:
+
+    with open(path, "r") as f:
+        return list(deque(f, maxlen=length))
+
+
+def measure(func, runs: int) -> list[float]:
+
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=200)
+    parser.add_argument("--length", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / ".log"
+        write_log(path, int(args.size_mb * 2**20))
+        logs_service = LogsService(path)
+        print(f"{args.size_mb:.0f} MB log")
+        for length in args.length:
+            for name, func in (
+                ("full read", lambda: read_all(path, length)),
+                ("tail", lambda: logs_service.get_logs(length)),
+                ("tail ERROR", lambda: logs_service.get_logs(length, "ERROR")),
+            ):
+                print(format_latency(f"{name} {length}", measure(func, args.runs)))
+
+
+if __name__ == "__main__":
+    main()
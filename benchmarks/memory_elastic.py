@@ -0,0 +1,492 @@
+"""In-process Elasticsearch stand-in for benchmarks without a cluster.
+
+``MemoryNode`` is an ``elastic_transport`` node answering the REST calls used
+by ``ElasticService`` from memory, so the regular ``Elasticsearch`` client and
+bulk helpers run unchanged::
+
+    client = memory_client()
+
+Supported: index create/exists/get/delete, aliases, ``_bulk``, documents by
+id with ``op_type`` and ``if_seq_no`` checks, ``_search``/``_msearch`` with
+exact cosine kNN, ``term``/``bool.filter``/``match_all`` queries, ``sort``,
+``size``, ``_source`` lists and excludes, ``min_score``, scrolls, ``_count``,
+``_refresh`` and ``_delete_by_query``. Other query clauses (geo filters) match everything.
+"""
+
+import fnmatch
+import json
+import threading
+import time
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+from elastic_transport import ApiResponseMeta, BaseNode, HttpHeaders
+from elastic_transport._node import NodeApiResponse
+from elasticsearch import Elasticsearch
+
+SHARDS = {"total": 1, "successful": 1, "skipped": 0, "failed": 0}
+
+
+class ElasticError(Exception):
+
+    def __init__(self, status: int, error_type: str, reason: str):
+
+        super().__init__(reason)
+        self.status = status
+        self.body = {
+            "error": {"type": error_type, "reason": reason},
+            "status": status,
+        }
+
+
+class MemoryIndex:
+
+    def __init__(self, mappings: dict | None = None):
+
+        self.mappings = mappings or {}
+        self.aliases: set[str] = set()
+        self.docs: dict[str, dict] = {}
+        self.seq_no: dict[str, int] = {}
+        self.next_seq_no = 0
+        self._vectors: dict[str, tuple[list[str], np.ndarray]] = {}
+
+    def put(self, doc_id: str, source: dict) -> tuple[int, bool]:
+
+        created = doc_id not in self.docs
+        self.docs[doc_id] = source
+        self.seq_no[doc_id] = self.next_seq_no
+        self.next_seq_no += 1
+        self._vectors.clear()
+        return self.seq_no[doc_id], created
+
+    def delete(self, doc_id: str) -> bool:
+
+        self._vectors.clear()
+        self.seq_no.pop(doc_id, None)
+        return self.docs.pop(doc_id, None) is not None
+
+    def vectors(self, field: str) -> tuple[list[str], np.ndarray]:
+        """Ids and L2 normalized vectors of documents with ``field``."""
+
+        if field not in self._vectors:
+            ids = [i for i, doc in self.docs.items() if doc.get(field) is not None]
+            matrix = np.array([self.docs[i][field] for i in ids], dtype=np.float32)
+            if len(ids):
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                matrix /= np.where(norms == 0, 1, norms)
+            self._vectors[field] = ids, matrix
+        return self._vectors[field]
+
+
+class MemoryStore:
+
+    def __init__(self):
+
+        self.indexes: dict[str, MemoryIndex] = {}
+        # scroll id -> remaining hits and page size
+        self.scrolls: dict[str, tuple[list[dict], int]] = {}
+        self.lock = threading.RLock()
+
+    def resolve(self, expression: str, allow_missing: bool = False) -> list[str]:
+        """Concrete index names of a comma separated list of indexes,
+        aliases and wildcards."""
+
+        names = []
+        for part in expression.split(","):
+            if part in ("_all", "*") or "*" in part:
+                pattern = "*" if part == "_all" else part
+                matched = [
+                    name
+                    for name, index in self.indexes.items()
+                    if fnmatch.fnmatchcase(name, pattern)
+                    or any(fnmatch.fnmatchcase(i, pattern) for i in index.aliases)
+                ]
+            elif part in self.indexes:
+                matched = [part]
+            else:
+                matched = [
+                    name
+                    for name, index in self.indexes.items()
+                    if part in index.aliases
+                ]
+                if not matched and not allow_missing:
+                    raise ElasticError(404, "index_not_found_exception", part)
+            names += [i for i in matched if i not in names]
+        return names
+
+    def write_index(self, name: str) -> MemoryIndex:
+
+        names = self.resolve(name, allow_missing=True)
+        if len(names) > 1:
+            raise ElasticError(400, "illegal_argument_exception", name)
+        if not names:
+            self.indexes[name] = MemoryIndex()
+            return self.indexes[name]
+        return self.indexes[names[0]]
+
+    def handle(self, method: str, target: str, body: bytes | None) -> tuple[int, dict]:
+
+        url = urlsplit(target)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        parts = [unquote(i) for i in url.path.strip("/").split("/") if i]
+        with self.lock:
+            return self.route(method, parts, params, body or b"")
+
+    def route(
+        self, method: str, parts: list[str], params: dict, body: bytes
+    ) -> tuple[int, dict]:
+
+        if not parts:
+            return 200, {"version": {"number": "8.16.0"}, "tagline": "memory"}
+        if parts[0] == "_bulk":
+            return 200, self.bulk(None, body, params)
+        if parts[0] == "_msearch":
+            return 200, self.msearch(body)
+        if parts[:2] == ["_search", "scroll"]:
+            return 200, self.scroll(method, json.loads(body or b"{}"))
+        if parts[0] == "_aliases":
+            return 200, self.update_aliases(json.loads(body))
+        if parts[0] == "_alias":
+            return self.get_alias("*", parts[1] if len(parts) > 1 else None, method)
+        name = parts[0]
+        if len(parts) == 1:
+            if method == "HEAD":
+                return (200 if self.resolve(name, allow_missing=True) else 404), {}
+            if method == "PUT":
+                return 200, self.create(name, json.loads(body or b"{}"))
+            if method == "DELETE":
+                return 200, self.delete(name)
+            return 200, self.get(name)
+        action = parts[1]
+        if action == "_alias":
+            return self.get_alias(name, parts[2] if len(parts) > 2 else None, method)
+        if action == "_bulk":
+            return 200, self.bulk(name, body, params)
+        if action == "_search":
+            return 200, self.search(name, json.loads(body or b"{}"), params)
+        if action == "_count":
+            return 200, {
+                "count": sum(len(self.indexes[i].docs) for i in self.resolve(name))
+            }
+        if action == "_refresh":
+            self.resolve(name)
+            return 200, {"_shards": SHARDS}
+        if action == "_delete_by_query":
+            deleted = 0
+            for index_name in self.resolve(name):
+                index = self.indexes[index_name]
+                deleted += len(index.docs)
+                for doc_id in list(index.docs):
+                    index.delete(doc_id)
+            return 200, {"deleted": deleted}
+        if action in ("_doc", "_create"):
+            doc_id = parts[2]
+            if method == "GET":
+                return self.get_doc(name, doc_id, params)
+            if method == "DELETE":
+                index = self.write_index(name)
+                found = index.delete(doc_id)
+                return (200 if found else 404), {
+                    "result": "deleted" if found else "not_found"
+                }
+            if action == "_create":
+                params["op_type"] = "create"
+            return self.index_doc(name, doc_id, json.loads(body), params)
+        raise ElasticError(400, "unsupported_operation", "/".join(parts))
+
+    def create(self, name: str, body: dict) -> dict:
+
+        if self.resolve(name, allow_missing=True):
+            raise ElasticError(400, "resource_already_exists_exception", name)
+        self.indexes[name] = MemoryIndex(body.get("mappings"))
+        for alias in body.get("aliases") or {}:
+            self.indexes[name].aliases.add(alias)
+        return {"acknowledged": True, "index": name}
+
+    def delete(self, expression: str) -> dict:
+
+        for name in self.resolve(expression):
+            del self.indexes[name]
+        return {"acknowledged": True}
+
+    def get(self, expression: str) -> dict:
+
+        return {
+            name: {
+                "aliases": {i: {} for i in self.indexes[name].aliases},
+                "mappings": self.indexes[name].mappings,
+                "settings": {},
+            }
+            for name in self.resolve(expression)
+        }
+
+    def get_alias(
+        self, expression: str, alias: str | None, method: str
+    ) -> tuple[int, dict]:
+
+        result = {}
+        for name in self.resolve(expression, allow_missing=True):
+            aliases = [
+                i
+                for i in self.indexes[name].aliases
+                if alias is None or fnmatch.fnmatchcase(i, alias)
+            ]
+            if aliases or alias is None:
+                result[name] = {"aliases": {i: {} for i in aliases}}
+        status = 404 if alias is not None and not result else 200
+        return status, ({} if method == "HEAD" else result)
+
+    def update_aliases(self, body: dict) -> dict:
+
+        for action in body["actions"]:
+            ((kind, spec),) = action.items()
+            if kind == "remove_index":
+                self.delete(spec["index"])
+            elif kind == "add":
+                for name in self.resolve(spec["index"]):
+                    self.indexes[name].aliases.add(spec["alias"])
+            elif kind == "remove":
+                for name in self.resolve(spec["index"]):
+                    self.indexes[name].aliases.discard(spec["alias"])
+        return {"acknowledged": True}
+
+    def get_doc(self, name: str, doc_id: str, params: dict) -> tuple[int, dict]:
+
+        for index_name in self.resolve(name):
+            index = self.indexes[index_name]
+            if doc_id in index.docs:
+                result = {
+                    "_index": index_name,
+                    "_id": doc_id,
+                    "_seq_no": index.seq_no[doc_id],
+                    "_primary_term": 1,
+                    "found": True,
+                }
+                if params.get("_source") != "false":
+                    result["_source"] = index.docs[doc_id]
+                return 200, result
+        return 404, {"_index": name, "_id": doc_id, "found": False}
+
+    def index_doc(
+        self, name: str, doc_id: str, source: dict, params: dict
+    ) -> tuple[int, dict]:
+
+        index = self.write_index(name)
+        if params.get("op_type") == "create" and doc_id in index.docs:
+            raise ElasticError(409, "version_conflict_engine_exception", doc_id)
+        if "if_seq_no" in params and index.seq_no.get(doc_id) != int(
+            params["if_seq_no"]
+        ):
+            raise ElasticError(409, "version_conflict_engine_exception", doc_id)
+        seq_no, created = index.put(doc_id, source)
+        return (201 if created else 200), {
+            "_index": name,
+            "_id": doc_id,
+            "_seq_no": seq_no,
+            "_primary_term": 1,
+            "result": "created" if created else "updated",
+        }
+
+    def bulk(self, default_index: str | None, body: bytes, params: dict) -> dict:
+
+        lines = [json.loads(i) for i in body.splitlines() if i.strip()]
+        items = []
+        position = 0
+        while position < len(lines):
+            ((kind, meta),) = lines[position].items()
+            position += 1
+            name = meta.get("_index", default_index)
+            doc_id = meta.get("_id")
+            try:
+                if kind == "delete":
+                    found = self.write_index(name).delete(doc_id)
+                    result = {"status": 200 if found else 404}
+                else:
+                    source = lines[position]
+                    position += 1
+                    if kind == "update":
+                        index = self.write_index(name)
+                        source = {**index.docs.get(doc_id, {}), **source["doc"]}
+                    if doc_id is None:
+                        doc_id = str(len(self.write_index(name).docs))
+                    status, result = self.index_doc(
+                        name, doc_id, source, {"op_type": kind}
+                    )
+                    result["status"] = status
+            except ElasticError as e:
+                result = {"status": e.status, "error": e.body["error"]}
+            items.append({kind: {"_index": name, "_id": doc_id, **result}})
+        return {
+            "took": 0,
+            "errors": any("error" in next(iter(i.values())) for i in items),
+            "items": items,
+        }
+
+    @staticmethod
+    def matches(doc: dict, query: dict | None) -> bool:
+
+        if not query or "match_all" in query:
+            return True
+        if "term" in query:
+            ((field, value),) = query["term"].items()
+            if isinstance(value, dict):
+                value = value["value"]
+            return str(doc.get(field)) == str(value)
+        if "terms" in query:
+            ((field, values),) = query["terms"].items()
+            return str(doc.get(field)) in {str(i) for i in values}
+        if "bool" in query:
+            clauses = query["bool"].get("filter", []) + query["bool"].get("must", [])
+            if isinstance(clauses, dict):
+                clauses = [clauses]
+            return all(MemoryStore.matches(doc, i) for i in clauses)
+        return True
+
+    def search(self, expression: str, body: dict, params: dict) -> dict:
+
+        start = time.perf_counter()
+        hits = []
+        knn = body.get("knn")
+        for index_name in self.resolve(expression):
+            index = self.indexes[index_name]
+            if knn is not None:
+                ids, matrix = index.vectors(knn["field"])
+                if not ids:
+                    continue
+                query = np.asarray(knn["query_vector"], dtype=np.float32)
+                query /= np.linalg.norm(query) or 1
+                # elastic cosine similarity score
+                scores = (1 + matrix @ query) / 2
+                candidates = [
+                    (float(score), doc_id)
+                    for score, doc_id in zip(scores, ids)
+                    if self.matches(index.docs[doc_id], knn.get("filter"))
+                ]
+                candidates.sort(reverse=True)
+                hits += [
+                    (score, index_name, doc_id)
+                    for score, doc_id in candidates[: knn["k"]]
+                ]
+            else:
+                hits += [
+                    (1.0, index_name, doc_id)
+                    for doc_id, doc in index.docs.items()
+                    if self.matches(doc, body.get("query"))
+                ]
+        if "min_score" in body:
+            hits = [i for i in hits if i[0] >= body["min_score"]]
+        if knn is not None:
+            hits.sort(key=lambda i: i[0], reverse=True)
+        for sort in reversed(body.get("sort") or []):
+            ((field, spec),) = sort.items() if isinstance(sort, dict) else ((sort, {}),)
+            hits.sort(
+                key=lambda i: self.indexes[i[1]].docs[i[2]].get(field) or 0,
+                reverse=(spec or {}).get("order") == "desc",
+            )
+        size = int(body.get("size", params.get("size", 10)))
+        source_fields = body.get("_source", True)
+        result_hits = []
+        for score, index_name, doc_id in hits:
+            source = self.indexes[index_name].docs[doc_id]
+            if isinstance(source_fields, list):
+                source = {k: v for k, v in source.items() if k in source_fields}
+            elif isinstance(source_fields, dict):
+                excludes = source_fields.get("excludes", [])
+                source = {k: v for k, v in source.items() if k not in excludes}
+            elif source_fields is False:
+                source = None
+            hit = {"_index": index_name, "_id": doc_id, "_score": score}
+            if source is not None:
+                hit["_source"] = source
+            result_hits.append(hit)
+        response = {
+            "took": int((time.perf_counter() - start) * 1000),
+            "timed_out": False,
+            "_shards": SHARDS,
+            "hits": {
+                "total": {"value": len(hits), "relation": "eq"},
+                "max_score": max((i[0] for i in hits), default=None),
+                "hits": result_hits[:size],
+            },
+        }
+        if "scroll" in params:
+            scroll_id = str(len(self.scrolls))
+            self.scrolls[scroll_id] = (result_hits[size:], size)
+            response["_scroll_id"] = scroll_id
+        return response
+
+    def scroll(self, method: str, body: dict) -> dict:
+
+        if method == "DELETE":
+            scroll_ids = body.get("scroll_id") or []
+            for scroll_id in (
+                [scroll_ids] if isinstance(scroll_ids, str) else scroll_ids
+            ):
+                self.scrolls.pop(scroll_id, None)
+            return {"succeeded": True, "num_freed": len(scroll_ids)}
+        scroll_id = body["scroll_id"]
+        if scroll_id not in self.scrolls:
+            raise ElasticError(404, "search_context_missing_exception", scroll_id)
+        hits, size = self.scrolls[scroll_id]
+        self.scrolls[scroll_id] = (hits[size:], size)
+        return {
+            "_scroll_id": scroll_id,
+            "took": 0,
+            "timed_out": False,
+            "_shards": SHARDS,
+            "hits": {
+                "total": {"value": len(hits), "relation": "eq"},
+                "hits": hits[:size],
+            },
+        }
+
+    def msearch(self, body: bytes) -> dict:
+
+        lines = [json.loads(i) for i in body.splitlines() if i.strip()]
+        responses = []
+        for header, query in zip(lines[::2], lines[1::2]):
+            try:
+                responses.append(
+                    {**self.search(header["index"], query, {}), "status": 200}
+                )
+            except ElasticError as e:
+                responses.append(e.body)
+        return {"took": 0, "responses": responses}
+
+
+class MemoryNode(BaseNode):
+    """Transport node serving requests from the process wide ``store``."""
+
+    store = MemoryStore()
+
+    def perform_request(
+        self, method, target, body=None, headers=None, request_timeout=None
+    ) -> NodeApiResponse:
+
+        start = time.perf_counter()
+        try:
+            status, response = self.store.handle(method, target, body)
+        except ElasticError as e:
+            status, response = e.status, e.body
+        meta = ApiResponseMeta(
+            status=status,
+            http_version="1.1",
+            headers=HttpHeaders(
+                {
+                    "content-type": "application/json",
+                    "x-elastic-product": "Elasticsearch",
+                }
+            ),
+            duration=time.perf_counter() - start,
+            node=self.config,
+        )
+        data = b"" if method == "HEAD" else json.dumps(response).encode()
+        return NodeApiResponse(meta, data)
+
+    def close(self) -> None:
+        pass
+
+
+def memory_client() -> Elasticsearch:
+
+    return Elasticsearch("http://memory:9200", node_class=MemoryNode)
@@ -0,0 +1,104 @@
+"""Time-to-first-token benchmark for the prompt layout.
+
+Compares the legacy layout (retrieved context interpolated into ``system``)
+with the current one (constant ``system`` prefix, context and question in
+``prompt``) against the same Ollama-compatible server::
+
+    python -m benchmarks.prompt_prefix_ttft --url http://llm-host:11434 \\
+        --model qwen3:32b --requests 20
+
+Contexts are taken from ``dev_data/index_test_data.json`` so every request
+has a different context, as in production. Both layouts are sent
+interleaved, so server load drifts affect them equally.
+"""
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+import requests
+
+from benchmarks.stats import percentile
+from src.llm.prompts import DOCUMENT_SYSTEM_PROMPT, build_user_prompt
+
+DEV_DATA = Path(__file__).resolve().parent.parent / "dev_data" / "index_test_data.json"
+QUESTION = "Какие ограничения действуют в санитарно-защитной зоне?"
+
+
+def legacy_layout(message: str, context: str) -> tuple[str, str]:
+
+    system = DOCUMENT_SYSTEM_PROMPT + f"\nКонтекст для ответа: {context}"
+    return system, f"ВОПРОС ПОЛЬЗОВАТЕЛЯ: {message}"
+
+
+def prefix_layout(message: str, context: str) -> tuple[str, str]:
+
+    return DOCUMENT_SYSTEM_PROMPT, build_user_prompt(message, context)
+
+
+def measure(url: str, model: str, system: str, prompt: str) -> dict[str, float]:
+
+    data = {
+        "model": model,
+        "system": system,
+        "prompt": prompt,
+        "stream": True,
+        "think": False,
+        "options": {"temperature": 0.0, "num_predict": 16},
+    }
+    start = time.perf_counter()
+    ttft = None
+    result = {}
+    with requests.post(
+        f"{url}/api/generate", json=data, stream=True, timeout=(5, 600)
+    ) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if ttft is None and (chunk.get("response") or chunk.get("thinking")):
+                ttft = time.perf_counter() - start
+            if chunk.get("done"):
+                result["prompt_eval_count"] = chunk.get("prompt_eval_count", 0)
+                result["prompt_eval_ms"] = chunk.get("prompt_eval_duration", 0) / 1e6
+    result["ttft_ms"] = (ttft or time.perf_counter() - start) * 1000
+    return result
+
+
+def summary(name: str, results: list[dict[str, float]]) -> None:
+
+    ttft = [r["ttft_ms"] for r in results]
+    evaluated = statistics.mean(r.get("prompt_eval_count", 0) for r in results)
+    print(
+        f"{name:<8} ttft p50={statistics.median(ttft):8.1f} ms "
+        f"p95={percentile(ttft, 95):8.1f} ms "
+        f"mean prompt tokens evaluated={evaluated:7.1f}"
+    )
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True, help="LLM server base url")
+    parser.add_argument("--model", required=True, help="LLM model name")
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = json.loads(DEV_DATA.read_text(encoding="utf-8"))
+    contexts = [rows[i % len(rows)]["text"][: 2000 + i] for i in range(args.requests)]
+    # warm up the model so loading time is not counted
+    measure(args.url, args.model, *prefix_layout(QUESTION, contexts[0]))
+
+    legacy, prefix = [], []
+    for context in contexts:
+        legacy.append(measure(args.url, args.model, *legacy_layout(QUESTION, context)))
+        prefix.append(measure(args.url, args.model, *prefix_layout(QUESTION, context)))
+    summary("legacy", legacy)
+    summary("prefix", prefix)
+
+
+if __name__ == "__main__":
+    main()
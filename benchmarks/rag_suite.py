@@ -0,0 +1,429 @@
+"""Ingestion throughput, query latency and retrieval quality on ``dev_data``.
+
+Loads ``dev_data/test_common_json_to_load.json`` into a general mode and
+``dev_data/index_test_data.json`` into an analyze mode scenario index through
+``ElasticService``, then runs every ``IduLLMService`` answer path against
+them and reports docs/sec, p50/p95/p99 latency and recall@k::
+
+    python -m benchmarks.rag_suite --requests 50 --llm-ttft-ms 300
+    python -m benchmarks.rag_suite --elastic-url http://localhost:9200 --json out.json
+
+Elasticsearch is replaced with the in-process stand-in unless
+``--elastic-url`` is given (use a local cluster, the benchmark indexes are
+created and deleted). Vectorizer and LLM are stub servers with the given
+latency and generation speed, or real servers with ``--vectorizer-host``
+and ``--llm-host``. ``--rerank-top-n`` enables the rerank stage (served by
+the stub vectorizer unless ``--reranker-host`` is given).
+
+Recall@k uses labeled questions: with ``--labels`` a json list of
+``{"question", "mode": "general" | "analyze", "relevant": [row numbers]}``,
+otherwise one question per zone type of the dataset, relevant rows are the
+rows of that zone. Recall@k is the share of relevant rows (at most ``k``)
+among the rows of the top ``k`` distinct retrieved rows.
+"""
+
+import argparse
+import ast
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import AsyncIterator
+
+from benchmarks.memory_elastic import memory_client
+from benchmarks.stats import format_latency, latency_summary
+from benchmarks.stub_servers import StubSettings, stub_servers
+from src.common.constants.index_mapper import index_mapper, reverse_index_mapper
+from src.common.geo.feature_collection_shaper import FeatureCollectionShaper
+from src.elastic.elastic_service import ElasticService
+from src.idu_llm.dto.base_request_dto import BaseLlmRequest
+from src.idu_llm.dto.batch_request_dto import BatchLlmRequest
+from src.idu_llm.dto.scenario_request_dto import ScenarioRequestDTO
+from src.idu_llm.idu_llm_service import IduLLMService
+from src.llm.llm_service import LlmService
+from src.reranker.reranker_service import RerankerService
+from src.vectorizer.vectorizer_service import VectorizerService
+
+DEV_DATA = Path(__file__).resolve().parent.parent / "dev_data"
+GENERAL_DATA = DEV_DATA / "test_common_json_to_load.json"
+ANALYZE_DATA = DEV_DATA / "index_test_data.json"
+# display names registered for the run only, scenario requests are validated
+# against the project index name
+BENCH_DISPLAY_NAME = "Бенчмарк"
+PROJECT_INDEX = ("project", "Информация проекта")
+
+
+class BenchmarkConfig:
+    """Config values for the run, missing keys raise ``ValueError`` like
+    ``iduconfig.Config``."""
+
+    def __init__(self, values: dict[str, str]):
+
+        self.values = values
+
+    def get(self, key: str) -> str:
+
+        if key not in self.values:
+            raise ValueError(f"{key} is not set")
+        return self.values[key]
+
+    def set(self, key: str, value: str) -> None:
+
+        self.values[key] = value
+
+
+def load_rows(path: Path) -> list[dict]:
+
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def zone_type(row: dict) -> str | None:
+
+    try:
+        return ast.literal_eval(row["text"]).get("buffer_type-name")
+    except (ValueError, SyntaxError):
+        return None
+
+
+def derive_labels(rows: list[dict], mode: str) -> list[dict]:
+    """One question per zone type, relevant rows are the rows of the zone."""
+
+    zones: dict[str, list[int]] = {}
+    for row_num, row in enumerate(rows):
+        if zone := zone_type(row):
+            zones.setdefault(zone, []).append(row_num)
+    return [
+        {
+            "question": f"Какие ограничения действуют в зоне «{zone}»?",
+            "mode": mode,
+            "relevant": row_nums,
+        }
+        for zone, row_nums in zones.items()
+    ]
+
+
+def recall_at_k(retrieved: list[int], relevant: list[int], k: int) -> float:
+
+    top = list(dict.fromkeys(retrieved))[:k]
+    return len(set(top) & set(relevant)) / min(len(relevant), k)
+
+
+class RagSuite:
+
+    def __init__(self, args: argparse.Namespace, config: BenchmarkConfig):
+
+        self.args = args
+        self.config = config
+        self.vectorizer_service = VectorizerService(config)
+        self.llm_service = LlmService(config)
+        self.elastic_service = ElasticService(
+            config,
+            self.vectorizer_service,
+            self.llm_service,
+            index_mapper,
+            reverse_index_mapper,
+            client=memory_client() if args.elastic_url is None else None,
+        )
+        self.idu_llm_service = IduLLMService(
+            self.llm_service,
+            self.elastic_service,
+            self.vectorizer_service,
+            FeatureCollectionShaper.from_config(config),
+            reranker=RerankerService.from_config(config),
+        )
+        self.general_index = f"{args.scenario_id}&general"
+        self.analyze_index = f"{args.scenario_id}&analyze"
+        self.rows = {
+            "general": load_rows(GENERAL_DATA),
+            "analyze": load_rows(ANALYZE_DATA),
+        }
+
+    async def ingest(self) -> dict:
+
+        results = {}
+        for mode, index_name in (
+            ("general", self.general_index),
+            ("analyze", self.analyze_index),
+        ):
+            await self.elastic_service.create_scenario_index(index_name)
+            start = time.perf_counter()
+            if mode == "general":
+                await self.elastic_service.upload_common_scenario(
+                    index_name, self.rows[mode], self.args.num_questions
+                )
+            else:
+                await self.elastic_service.upload_analyze_scenario(
+                    index_name,
+                    self.rows[mode],
+                    self.args.num_questions,
+                    self.args.question_mode,
+                )
+            self.elastic_service.client.indices.refresh(index=index_name)
+            elapsed = time.perf_counter() - start
+            docs = self.elastic_service.client.count(index=index_name)["count"]
+            results[mode] = {
+                "rows": len(self.rows[mode]),
+                "docs": docs,
+                "seconds": elapsed,
+                "docs_per_sec": docs / elapsed,
+                "rows_per_sec": len(self.rows[mode]) / elapsed,
+            }
+        return results
+
+    async def recall(self, labels: list[dict]) -> dict:
+        """Mean recall@k of labeled questions by dataset."""
+
+        max_k = max(self.args.k)
+        # several documents (one per question) are indexed for every row
+        size = max_k * self.args.num_questions
+        bodies = {
+            mode: {row.get("text"): row_num for row_num, row in enumerate(rows)}
+            for mode, rows in self.rows.items()
+        }
+        recalls: dict[str, dict[int, list[float]]] = {}
+        for label in labels:
+            mode = label["mode"]
+            embedding = await self.vectorizer_service.embed_async(label["question"])
+            body = self.elastic_service.get_scenario_search_body(embedding)
+            body["knn"].update(k=size, num_candidates=max(size, 100))
+            body["size"] = size
+            hits = self.elastic_service.client.search(
+                index=self.general_index if mode == "general" else self.analyze_index,
+                body=body,
+            )["hits"]["hits"]
+            retrieved = [
+                bodies[mode][hit["_source"]["body"]]
+                for hit in hits
+                if hit["_source"].get("body") in bodies[mode]
+            ]
+            for k in self.args.k:
+                recalls.setdefault(mode, {}).setdefault(k, []).append(
+                    recall_at_k(retrieved, label["relevant"], k)
+                )
+        return {
+            mode: {
+                f"recall@{k}": sum(values) / len(values) for k, values in by_k.items()
+            }
+            for mode, by_k in recalls.items()
+        }
+
+    @staticmethod
+    async def consume(chunks: AsyncIterator) -> float | None:
+        """Drain a stream response, returns time to the first text chunk."""
+
+        start = time.perf_counter()
+        ttft = None
+        async for chunk in chunks:
+            is_text = (isinstance(chunk, str) and chunk) or (
+                isinstance(chunk, dict) and chunk.get("type") == "text"
+            )
+            if ttft is None and is_text:
+                ttft = (time.perf_counter() - start) * 1000
+        return ttft
+
+    async def run_path(self, name: str, questions: list[str]) -> dict:
+
+        latencies, ttfts = [], []
+        for i in range(self.args.requests):
+            question = questions[i % len(questions)]
+            start = time.perf_counter()
+            ttft = None
+            match name:
+                case "documents":
+                    await self.idu_llm_service.generate_response(
+                        BaseLlmRequest(
+                            user_request=question, index_name=BENCH_DISPLAY_NAME
+                        )
+                    )
+                case "documents_stream":
+                    ttft = await self.consume(
+                        self.idu_llm_service.generate_simple_stream_response(
+                            BaseLlmRequest(
+                                user_request=question, index_name=BENCH_DISPLAY_NAME
+                            )
+                        )
+                    )
+                case "scenario_general" | "scenario_analyze":
+                    ttft = await self.consume(
+                        self.idu_llm_service.generate_scenario_stream_response(
+                            ScenarioRequestDTO(
+                                user_request=question,
+                                index_name=PROJECT_INDEX[1],
+                                scenario_id=self.args.scenario_id,
+                                mode=(
+                                    "Анализ территории проекта"
+                                    if name == "scenario_general"
+                                    else "Анализ по объектам проекта"
+                                ),
+                            )
+                        )
+                    )
+            latencies.append((time.perf_counter() - start) * 1000)
+            if ttft is not None:
+                ttfts.append(ttft)
+        result = {"latency_ms": latency_summary(latencies)}
+        print(format_latency(name, latencies))
+        if ttfts:
+            result["ttft_ms"] = latency_summary(ttfts)
+            print(format_latency(f"{name} ttft", ttfts))
+        return result
+
+    async def run_batch(self, questions: list[str]) -> dict:
+        """Completion latency of every question of one batch request."""
+
+        start = time.perf_counter()
+        latencies = []
+        request = BatchLlmRequest(
+            questions=[
+                questions[i % len(questions)] for i in range(self.args.requests)
+            ],
+            index_name=BENCH_DISPLAY_NAME,
+        )
+        async for _ in self.idu_llm_service.generate_batch_responses(request):
+            latencies.append((time.perf_counter() - start) * 1000)
+        elapsed = time.perf_counter() - start
+        print(format_latency("batch", latencies))
+        return {
+            "latency_ms": latency_summary(latencies),
+            "questions_per_sec": len(latencies) / elapsed,
+        }
+
+    async def run(self, labels: list[dict] | None) -> dict:
+
+        results = {"ingest": await self.ingest()}
+        for mode, result in results["ingest"].items():
+            print(
+                f"ingest {mode:<13} {result['docs']} docs from {result['rows']} rows "
+                f"in {result['seconds']:.2f} s: {result['docs_per_sec']:.1f} docs/sec"
+            )
+        labels = labels or (
+            derive_labels(self.rows["general"], "general")
+            + derive_labels(self.rows["analyze"], "analyze")
+        )
+        results["recall"] = await self.recall(labels)
+        for mode, recalls in results["recall"].items():
+            print(
+                f"{mode:<20} "
+                + " ".join(f"{name}={value:.3f}" for name, value in recalls.items())
+            )
+        questions = [label["question"] for label in labels]
+        results["paths"] = {
+            name: await self.run_path(name, questions)
+            for name in (
+                "documents",
+                "documents_stream",
+                "scenario_general",
+                "scenario_analyze",
+            )
+        }
+        results["paths"]["batch"] = await self.run_batch(questions)
+        return results
+
+    async def cleanup(self) -> None:
+
+        for index_name in (self.general_index, self.analyze_index):
+            await self.elastic_service.delete_index(index_name)
+
+
+def build_config(
+    args: argparse.Namespace, vectorizer: str, llm: str
+) -> BenchmarkConfig:
+
+    host, _, port = (
+        (args.elastic_url or "http://memory:9200").split("//")[-1].partition(":")
+    )
+    reranker = {}
+    if args.rerank_top_n:
+        reranker = {
+            "RERANKER_HOSTS": args.reranker_host or vectorizer,
+            "RERANKER_TOP_N": str(args.rerank_top_n),
+        }
+    return BenchmarkConfig(
+        {
+            "ELASTIC_HOST": host,
+            "ELASTIC_PORT": port or "9200",
+            "VECTORIZER_HOSTS": vectorizer,
+            "VECTORIZER_MODEL": args.vectorizer_model,
+            "VECTORIZER_RETRIES": "1",
+            "LLM_HOSTS": llm,
+            "LLM_MODEL": args.llm_model,
+            "LLM_RETRIES": "1",
+            "ELASTIC_K": str(max(args.k)),
+            "NUM_CANDIDATES": "100",
+            "MIN_SCORE": "0",
+            "SCENARIO_K": str(max(args.k)),
+            "SCENARIO_NUM_K": "100",
+            "ELASTIC_DOCUMENT_INDEX": "general",
+            **reranker,
+        }
+    )
+
+
+def parse_args() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--elastic-url", default=None, help="Local elastic, in-process if not set"
+    )
+    parser.add_argument("--vectorizer-host", help="host:port of a real vectorizer")
+    parser.add_argument("--llm-host", help="host:port of a real LLM server")
+    parser.add_argument("--vectorizer-model", default="stub")
+    parser.add_argument("--llm-model", default="stub")
+    parser.add_argument("--llm-ttft-ms", type=float, default=0)
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=0)
+    parser.add_argument("--embed-latency-ms", type=float, default=0)
+    parser.add_argument(
+        "--rerank-top-n", type=int, default=0, help="Rerank stage top n, 0 for none"
+    )
+    parser.add_argument("--reranker-host", help="host:port of a real reranker")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per path")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--num-questions", type=int, default=5)
+    parser.add_argument("--question-mode", choices=["llm", "template"], default="llm")
+    parser.add_argument("--scenario-id", type=int, default=990001)
+    parser.add_argument("--labels", type=Path, help="Labeled questions json")
+    parser.add_argument("--json", type=Path, help="Write results json to the file")
+    return parser.parse_args()
+
+
+async def run(args: argparse.Namespace, vectorizer: str, llm: str) -> dict:
+
+    suite = RagSuite(args, build_config(args, vectorizer, llm))
+    registered = {
+        BENCH_DISPLAY_NAME: suite.general_index,
+        PROJECT_INDEX[1]: PROJECT_INDEX[0],
+    }
+    for display_name, name in registered.items():
+        index_mapper.setdefault(name, display_name)
+        reverse_index_mapper.setdefault(display_name, name)
+    labels = (
+        json.loads(args.labels.read_text(encoding="utf-8")) if args.labels else None
+    )
+    try:
+        return await suite.run(labels)
+    finally:
+        await suite.cleanup()
+
+
+def main():
+
+    args = parse_args()
+    settings = StubSettings(
+        llm_ttft_ms=args.llm_ttft_ms,
+        llm_tokens_per_sec=args.llm_tokens_per_sec,
+        embed_latency_ms=args.embed_latency_ms,
+    )
+    with stub_servers(settings) as (vectorizer, llm):
+        results = asyncio.run(
+            run(
+                args,
+                args.vectorizer_host or f"127.0.0.1:{vectorizer.server_port}",
+                args.llm_host or f"127.0.0.1:{llm.server_port}",
+            )
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
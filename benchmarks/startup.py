@@ -0,0 +1,78 @@
+"""Worker startup time: importing the app in fresh interpreters.
+
+Every run starts a new interpreter (as a new gunicorn worker does) and
+measures ``import src.app``, then the slowest imports of one run are listed
+from ``python -X importtime``::
+
+    python -m benchmarks.startup --runs 10 --top 15
+
+Importing the app must not read config or connect to anything, services are
+built in the app lifespan, which logs its own ``Startup finished in`` line
+with the time spent building services and checking indexes.
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.stats import format_latency
+
+ROOT = Path(__file__).resolve().parent.parent
+MEASURE = (
+    "import time; started = time.perf_counter(); import {module}; "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+def measure_import(module: str) -> float:
+    """Import time of the module in a new interpreter in ms."""
+
+    result = subprocess.run(
+        [sys.executable, "-c", MEASURE.format(module=module)],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module: str, top: int) -> list[tuple[int, str]]:
+    """Modules with the largest cumulative import time in us."""
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        imports.append((int(cumulative), name.rstrip()))
+    imports.sort(reverse=True)
+    return imports[:top]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="src.app")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    times = [measure_import(args.module) for _ in range(args.runs)]
+    print(format_latency(f"import {args.module}", times))
+    print("slowest imports (cumulative):")
+    for cumulative, name in slowest_imports(args.module, args.top):
+        print(f"  {cumulative / 1000:8.1f} ms {name}")
+
+
+if __name__ == "__main__":
+    main()
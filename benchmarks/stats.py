@@ -0,0 +1,35 @@
+"""Latency statistics shared by the benchmarks."""
+
+import math
+import statistics
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile, ``q`` in ``[0, 100]``."""
+
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def latency_summary(values: list[float]) -> dict[str, float]:
+
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values) if values else math.nan,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+    }
+
+
+def format_latency(name: str, values: list[float], unit: str = "ms") -> str:
+
+    summary = latency_summary(values)
+    return (
+        f"{name:<20} n={summary['count']:<5} mean={summary['mean']:9.1f} {unit} "
+        f"p50={summary['p50']:9.1f} {unit} p95={summary['p95']:9.1f} {unit} "
+        f"p99={summary['p99']:9.1f} {unit}"
+    )
@@ -0,0 +1,298 @@
+"""Stub vectorizer and LLM servers for benchmarks and load tests without GPU
+hosts.
+
+The vectorizer serves ``/v1/embeddings`` with deterministic hashed
+bag-of-words vectors, so texts sharing words are close and retrieval
+quality can be compared between runs. Batches larger than
+``--max-batch-size`` are rejected with 413 like the real server. It also
+serves ``/v1/rerank`` scoring documents by the same vectors. The LLM
+serves Ollama-style ``/api/generate`` (NDJSON when streaming): the answer
+is built from the words of the prompt, which makes generated questions
+relevant to the described text::
+
+    python -m benchmarks.stub_servers --llm-port 11434 --vectorizer-port 8001 \\
+        --llm-ttft-ms 300 --llm-tokens-per-sec 40 --embed-latency-ms 20
+
+Point the app to them with ``LLM_HOSTS=127.0.0.1:11434`` and
+``VECTORIZER_HOSTS=127.0.0.1:8001``. Answers take ``--llm-ttft-ms`` to the
+first token and then ``--llm-tokens-per-sec``, embedding requests take
+``--embed-latency-ms`` plus ``--embed-item-latency-ms`` per input.
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+@dataclass
+class StubSettings:
+
+    llm_ttft_ms: float = 0
+    # 0 sends all tokens at once
+    llm_tokens_per_sec: float = 0
+    llm_max_tokens: int = 256
+    embed_latency_ms: float = 0
+    embed_item_latency_ms: float = 0
+    # 0 for unlimited batches
+    max_batch_size: int = 0
+    dims: int = 4096
+
+
+def embed_text(text: str, dims: int) -> list[float]:
+    """Hashed bag of word stems, L2 normalized."""
+
+    vector = np.zeros(dims, dtype=np.float32)
+    for word in WORD_PATTERN.findall(text.lower()):
+        # crude stemming so word forms of the same word match
+        digest = hashlib.blake2b(word[:6].encode(), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        vector[value % dims] += 1 if value >> 63 else -1
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    else:
+        vector[0] = 1
+    return vector.tolist()
+
+
+def generate_tokens(prompt: str, max_tokens: int = 256) -> list[str]:
+    """Lines of prompt words from its end, where the text to answer on or to
+    ask questions about is placed, split to word tokens."""
+
+    words = WORD_PATTERN.findall(prompt)[-max_tokens:]
+    lines = [" ".join(words[i : i + 8]) + "?" for i in range(0, len(words), 8)]
+    lines.reverse()
+    return re.split(r"(?<=\s)", "\n".join(lines))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    settings: StubSettings
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self) -> dict:
+
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, body: dict, status: int = 200) -> None:
+
+        data = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+
+        if self.path in ("/health", "/api/version"):
+            self.send_json({"status": "ok", "version": "stub"})
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+
+class VectorizerHandler(StubHandler):
+
+    def do_POST(self):
+
+        if self.path == "/v1/rerank":
+            self.rerank()
+            return
+        if self.path != "/v1/embeddings":
+            self.send_json({"error": "not found"}, 404)
+            return
+        data = self.read_json()
+        inputs = data["input"] if isinstance(data["input"], list) else [data["input"]]
+        if self.settings.max_batch_size and len(inputs) > self.settings.max_batch_size:
+            self.send_json(
+                {"error": f"batch size {len(inputs)} > {self.settings.max_batch_size}"},
+                413,
+            )
+            return
+        time.sleep(
+            (
+                self.settings.embed_latency_ms
+                + self.settings.embed_item_latency_ms * len(inputs)
+            )
+            / 1000
+        )
+        self.send_json(
+            {
+                "object": "list",
+                "model": data.get("model"),
+                "data": [
+                    {
+                        "object": "embedding",
+                        "index": i,
+                        "embedding": embed_text(text, self.settings.dims),
+                    }
+                    for i, text in enumerate(inputs)
+                ],
+            }
+        )
+
+    def rerank(self):
+        """Jina/Cohere style rerank response, documents scored by the cosine
+        similarity of their stub vectors to the query."""
+
+        data = self.read_json()
+        time.sleep(
+            (
+                self.settings.embed_latency_ms
+                + self.settings.embed_item_latency_ms * len(data["documents"])
+            )
+            / 1000
+        )
+        query = np.asarray(embed_text(data["query"], self.settings.dims))
+        results = [
+            {
+                "index": i,
+                "relevance_score": float(
+                    query @ np.asarray(embed_text(document, self.settings.dims))
+                ),
+            }
+            for i, document in enumerate(data["documents"])
+        ]
+        results.sort(key=lambda i: i["relevance_score"], reverse=True)
+        self.send_json({"model": data.get("model"), "results": results})
+
+
+class LlmHandler(StubHandler):
+
+    def do_POST(self):
+
+        if self.path != "/api/generate":
+            self.send_json({"error": "not found"}, 404)
+            return
+        data = self.read_json()
+        num_predict = (data.get("options") or {}).get("num_predict") or 256
+        tokens = generate_tokens(
+            data.get("prompt", ""), min(num_predict, self.settings.llm_max_tokens)
+        )
+        interval = (
+            1 / self.settings.llm_tokens_per_sec
+            if self.settings.llm_tokens_per_sec
+            else 0
+        )
+        start = time.perf_counter()
+        time.sleep(self.settings.llm_ttft_ms / 1000)
+        if not data.get("stream", True):
+            time.sleep(interval * len(tokens))
+            self.send_json(
+                {
+                    "model": data.get("model"),
+                    "response": "".join(tokens),
+                    "done": True,
+                    **self.get_stats(tokens, start),
+                }
+            )
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(interval)
+            self.write_chunk({"response": token, "done": False})
+        self.write_chunk(
+            {"response": "", "done": True, **self.get_stats(tokens, start)}
+        )
+        self.wfile.write(b"0\r\n\r\n")
+
+    def get_stats(self, tokens: list[str], start: float) -> dict:
+        """Ollama timing fields of the final chunk, durations in ns."""
+
+        return {
+            "prompt_eval_count": 0,
+            "prompt_eval_duration": int(self.settings.llm_ttft_ms * 1e6),
+            "eval_count": len(tokens),
+            "total_duration": int((time.perf_counter() - start) * 1e9),
+        }
+
+    def write_chunk(self, body: dict) -> None:
+
+        data = json.dumps(body, ensure_ascii=False).encode() + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def serve(
+    handler: type[StubHandler], settings: StubSettings, port: int = 0
+) -> ThreadingHTTPServer:
+    """Start the stub server in a daemon thread, ``port=0`` takes a free one."""
+
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", port), type(handler.__name__, (handler,), {"settings": settings})
+    )
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@contextmanager
+def stub_servers(
+    settings: StubSettings,
+) -> Iterator[tuple[ThreadingHTTPServer, ThreadingHTTPServer]]:
+    """Vectorizer and LLM stub servers on free ports."""
+
+    vectorizer = serve(VectorizerHandler, settings)
+    llm = serve(LlmHandler, settings)
+    try:
+        yield vectorizer, llm
+    finally:
+        vectorizer.shutdown()
+        llm.shutdown()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llm-port", type=int, default=11434)
+    parser.add_argument("--vectorizer-port", type=int, default=8001)
+    parser.add_argument("--llm-ttft-ms", type=float, default=0)
+    parser.add_argument(
+        "--llm-tokens-per-sec", type=float, default=0, help="0 for no delay"
+    )
+    parser.add_argument("--llm-max-tokens", type=int, default=256)
+    parser.add_argument("--embed-latency-ms", type=float, default=0)
+    parser.add_argument("--embed-item-latency-ms", type=float, default=0)
+    parser.add_argument("--max-batch-size", type=int, default=0, help="0 for unlimited")
+    parser.add_argument("--dims", type=int, default=4096)
+    args = parser.parse_args()
+
+    settings = StubSettings(
+        llm_ttft_ms=args.llm_ttft_ms,
+        llm_tokens_per_sec=args.llm_tokens_per_sec,
+        llm_max_tokens=args.llm_max_tokens,
+        embed_latency_ms=args.embed_latency_ms,
+        embed_item_latency_ms=args.embed_item_latency_ms,
+        max_batch_size=args.max_batch_size,
+        dims=args.dims,
+    )
+    serve(VectorizerHandler, settings, args.vectorizer_port)
+    serve(LlmHandler, settings, args.llm_port)
+    print(
+        f"vectorizer on 127.0.0.1:{args.vectorizer_port}, "
+        f"llm on 127.0.0.1:{args.llm_port}"
+    )
+    threading.Event().wait()
+
+
+if __name__ == "__main__":
+    main()
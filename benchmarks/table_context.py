@@ -0,0 +1,95 @@
+"""Table context benchmark: slicing a materialized block list for every table
+(previous implementation) against the streaming sliding window::
+
+    python -m benchmarks.table_context --tables 5000 --context 5
+
+Blocks are generated directly, so only the context building is measured.
+The legacy forward slice included the table itself; for the comparison it
+is shifted by one block, which makes both produce the same contexts.
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Iterator
+
+from src.elastic.doc_parser import DocBlock, attach_table_context
+
+
+def make_blocks(tables: int, paragraphs_between: int) -> Iterator[DocBlock]:
+
+    for i in range(tables):
+        for j in range(paragraphs_between):
+            yield DocBlock(
+                f"Пункт {i}.{j}. Параметры разрешенного использования.", "text"
+            )
+        yield DocBlock(f"| зона | параметр |\n| --- | --- |\n| Ж{i} | {i} |", "table")
+
+
+def legacy_contexts(blocks, size: int) -> list[tuple[str, str, str]]:
+
+    dock_blocks = [(block.text, block.kind) for block in blocks]
+    result = []
+    for index, entity in enumerate(dock_blocks):
+        if entity[1] == "table":
+            result.append(
+                (
+                    "\n".join(
+                        [
+                            i[0]
+                            for i in dock_blocks[max(index - size, 0) : index]
+                            if i[1] == "text"
+                        ]
+                    ),
+                    entity[0],
+                    "\n".join(
+                        [
+                            i[0]
+                            for i in dock_blocks[index + 1 : index + 1 + size]
+                            if i[1] == "text"
+                        ]
+                    ),
+                )
+            )
+    return result
+
+
+def window_contexts(blocks, size: int) -> list[tuple[str, str, str]]:
+
+    return [
+        (block.before, block.text, block.after)
+        for block in attach_table_context(blocks, size)
+        if block.kind == "table"
+    ]
+
+
+def measure(name: str, func, args) -> list:
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(make_blocks(args.tables, args.paragraphs), args.context)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<8} {elapsed:8.3f} s  {len(result):6d} tables  "
+        f"peak {peak / 2**20:7.1f} MiB"
+    )
+    return result
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tables", type=int, default=5000)
+    parser.add_argument("--paragraphs", type=int, default=3)
+    parser.add_argument("--context", type=int, default=5)
+    args = parser.parse_args()
+
+    legacy = measure("legacy", legacy_contexts, args)
+    window = measure("window", window_contexts, args)
+    print(f"same contexts: {legacy == window}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Concurrent websocket chat load against a running app.
+
+Run the stub servers, start one app worker pointed to them and drive
+``/ws/generate`` with growing numbers of concurrent chat sessions::
+
+    python -m benchmarks.stub_servers --llm-ttft-ms 300 --llm-tokens-per-sec 40
+    LLM_HOSTS=127.0.0.1:11434 VECTORIZER_HOSTS=127.0.0.1:8001 \\
+        uvicorn src.app:app --port 8000
+    python -m benchmarks.ws_load --url ws://localhost:8000/ws/generate \\
+        --concurrency 1 8 32 64 --duration 30 --ttft-slo-ms 2000
+
+Every session opens a connection, sends one request and reads the answer
+until the server closes the stream, then starts over. For each concurrency
+level the time to first text chunk, total answer time, the largest gap
+between chunks of an answer and errors are reported. Meanwhile a probe
+requests ``--probe-url`` every ``--probe-interval`` seconds: the app answers
+it on the event loop, so probe latency growing with load means the loop is
+blocked by synchronous work. The last level with no errors and p95 time to
+first chunk within ``--ttft-slo-ms`` is reported as sustained.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from websockets.asyncio.client import connect
+
+from benchmarks.stats import format_latency, latency_summary, percentile
+
+QUESTIONS = [
+    "Какие ограничения действуют в санитарно-защитной зоне?",
+    "Какие стадии проекта существуют?",
+    "Что можно строить в придорожной полосе?",
+    "Какие документы нужны на предпроектной стадии?",
+]
+
+
+@dataclass
+class LevelResult:
+
+    ttft_ms: list[float] = field(default_factory=list)
+    total_ms: list[float] = field(default_factory=list)
+    max_gap_ms: list[float] = field(default_factory=list)
+    probe_ms: list[float] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+
+
+async def chat(url: str, request: dict, timeout: float) -> tuple[float, float, float]:
+    """One chat session, returns time to first text chunk, total time and the
+    largest gap between chunks in ms."""
+
+    start = time.perf_counter()
+    ttft = None
+    last = start
+    max_gap = 0.0
+    async with asyncio.timeout(timeout):
+        async with connect(url, max_size=None) as websocket:
+            await websocket.send(json.dumps(request, ensure_ascii=False))
+            async for message in websocket:
+                now = time.perf_counter()
+                max_gap = max(max_gap, now - last)
+                last = now
+                if isinstance(message, bytes):
+                    continue
+                chunk = json.loads(message)
+                if not isinstance(chunk, dict):
+                    continue
+                if chunk.get("http_code") or chunk.get("status") == "unavailable":
+                    raise RuntimeError(json.dumps(chunk, ensure_ascii=False)[:200])
+                if ttft is None and chunk.get("type") == "text":
+                    ttft = now - start
+    total = time.perf_counter() - start
+    if ttft is None:
+        raise RuntimeError("No text in answer")
+    return ttft * 1000, total * 1000, max_gap * 1000
+
+
+async def session(
+    args: argparse.Namespace, number: int, deadline: float, result: LevelResult
+) -> None:
+
+    sent = 0
+    while time.perf_counter() < deadline:
+        request = {
+            **args.request,
+            "user_request": QUESTIONS[(number + sent) % len(QUESTIONS)],
+        }
+        sent += 1
+        try:
+            ttft, total, max_gap = await chat(args.url, request, args.timeout)
+        except Exception as e:
+            result.errors.append(repr(e))
+            continue
+        result.ttft_ms.append(ttft)
+        result.total_ms.append(total)
+        result.max_gap_ms.append(max_gap)
+
+
+async def probe(args: argparse.Namespace, deadline: float, result: LevelResult):
+
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(
+                requests.get, args.probe_url, allow_redirects=False, timeout=30
+            )
+            result.probe_ms.append((time.perf_counter() - start) * 1000)
+        except requests.RequestException as e:
+            result.errors.append(f"probe: {e!r}")
+        await asyncio.sleep(args.probe_interval)
+
+
+async def run_level(args: argparse.Namespace, concurrency: int) -> LevelResult:
+
+    result = LevelResult()
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(
+        probe(args, deadline, result),
+        *[session(args, i, deadline, result) for i in range(concurrency)],
+    )
+    return result
+
+
+def report(concurrency: int, result: LevelResult, duration: float) -> dict:
+
+    completed = len(result.total_ms)
+    print(
+        f"concurrency {concurrency}: {completed} answers "
+        f"({completed / duration:.2f}/s), {len(result.errors)} errors"
+    )
+    for name, values in (
+        ("ttft", result.ttft_ms),
+        ("total", result.total_ms),
+        ("max chunk gap", result.max_gap_ms),
+        ("probe", result.probe_ms),
+    ):
+        print("  " + format_latency(name, values))
+    for error in sorted(set(result.errors))[:3]:
+        print(f"  error: {error}")
+    return {
+        "concurrency": concurrency,
+        "answers": completed,
+        "answers_per_sec": completed / duration,
+        "errors": len(result.errors),
+        "ttft_ms": latency_summary(result.ttft_ms),
+        "total_ms": latency_summary(result.total_ms),
+        "max_gap_ms": latency_summary(result.max_gap_ms),
+        "probe_ms": latency_summary(result.probe_ms),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="ws://localhost:8000/ws/generate")
+    parser.add_argument(
+        "--request",
+        type=json.loads,
+        default={"index_name": "Общее"},
+        help="Request json, user_request is filled from built-in questions",
+    )
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per level")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--ttft-slo-ms", type=float, default=2000)
+    parser.add_argument(
+        "--probe-url", help="Http url answered on the event loop, app root by default"
+    )
+    parser.add_argument("--probe-interval", type=float, default=0.1)
+    parser.add_argument("--json", help="Write results json to the file")
+    args = parser.parse_args()
+    if args.probe_url is None:
+        url = urlsplit(args.url)
+        scheme = "https" if url.scheme == "wss" else "http"
+        args.probe_url = urlunsplit((scheme, url.netloc, "/", "", ""))
+    return args
+
+
+def main():
+
+    args = parse_args()
+    results = []
+    sustained = None
+    for concurrency in args.concurrency:
+        result = asyncio.run(run_level(args, concurrency))
+        results.append(report(concurrency, result, args.duration))
+        if not result.errors and (percentile(result.ttft_ms, 95) <= args.ttft_slo_ms):
+            sustained = concurrency
+    print(
+        f"sustained concurrency (no errors, p95 ttft <= {args.ttft_slo_ms:.0f} ms): "
+        f"{sustained if sustained is not None else 'none'}"
+    )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"levels": results, "sustained": sustained}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
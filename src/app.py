@@ -1,12 +1,20 @@
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
+from loguru import logger
 
 from src.__version__ import APP_VERSION
 from src.common.exceptions.exception_handler import ExceptionHandlerMiddleware
-from src.dependencies import elastic_client
+from src.dependencies import (
+    get_elastic_service,
+    get_idu_llm_service,
+    get_layer_encoder,
+    get_logs_service,
+    get_reranker,
+)
 from src.elastic.elastic_controller import elastic_router
 from src.idu_llm.idu_llm_controller import idu_llm_router
 from src.logs.logs_router import logs_router
@@ -14,8 +22,35 @@ from src.logs.logs_router import logs_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    started = time.perf_counter()
+    get_logs_service()
+    # services are built before serving, so requests never race to build them
+    idu_llm_client = get_idu_llm_service()
+    get_layer_encoder()
+    elastic_client = get_elastic_service()
+    reranker = get_reranker()
+    pools = [
+        idu_llm_client.llm_service.pool,
+        idu_llm_client.vectorizer_model.pool,
+        *([reranker.pool] if reranker is not None else []),
+    ]
+    services_built = time.perf_counter()
     await elastic_client.check_indexes()
+    indexes_checked = time.perf_counter()
+    elastic_client.index_registry.start_refresh()
+    elastic_client.index_mapper_store.start_refresh()
+    for pool in pools:
+        pool.start_health_checks()
+    logger.info(
+        f"Startup finished in {time.perf_counter() - started:.3f}s: "
+        f"services {services_built - started:.3f}s, "
+        f"index checks {indexes_checked - services_built:.3f}s"
+    )
     yield
+    elastic_client.index_registry.stop_refresh()
+    elastic_client.index_mapper_store.stop_refresh()
+    for pool in pools:
+        pool.stop_health_checks()
 
 
 app = FastAPI(lifespan=lifespan, root_path="/api/v1", version=APP_VERSION)
@@ -0,0 +1,90 @@
+"""Batch question answering for offline evaluation and bulk FAQ generation.
+
+Answers questions from a file with the same retrieval and prompts as the
+``/batch/generate`` endpoint and writes one json result per line::
+
+    python -m src.cli.batch_generate questions.txt --index Общее
+    python -m src.cli.batch_generate questions.json --scenario-id 1830 --output answers.ndjson
+
+Questions are read from ``.json`` files as a list of strings, from other
+files as one question per line. Results are written in completion order,
+``index`` is the position of the question in the file.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from src.dependencies import get_elastic_service, get_idu_llm_service
+from src.idu_llm.dto.batch_request_dto import BatchLlmRequest
+from src.idu_llm.idu_llm_service import IduLLMService
+
+
+def read_questions(path: Path) -> list[str]:
+
+    text = path.read_text(encoding="utf-8")
+    if path.suffix == ".json":
+        return [str(i) for i in json.loads(text)]
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def parse_args() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(
+        description="Answer questions from a file and write NDJSON results"
+    )
+    parser.add_argument("questions", type=Path, help="Questions .txt or .json file")
+    parser.add_argument("--index", default="Общее", help="Index display name")
+    parser.add_argument("--scenario-id", type=int, default=None)
+    parser.add_argument(
+        "--mode",
+        choices=["Анализ территории проекта", "Анализ по объектам проекта"],
+        default="Анализ территории проекта",
+    )
+    parser.add_argument(
+        "--federated",
+        nargs="*",
+        default=[],
+        help="Additional indexes searched together with the target index",
+    )
+    parser.add_argument("--profile", default=None)
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument(
+        "--output", type=Path, default=None, help="Output file, stdout if not set"
+    )
+    return parser.parse_args()
+
+
+async def run(args: argparse.Namespace, idu_llm_service: IduLLMService) -> None:
+
+    request = BatchLlmRequest(
+        questions=read_questions(args.questions),
+        index_name=args.index,
+        scenario_id=args.scenario_id,
+        mode=args.mode,
+        federated_indexes=args.federated,
+        profile=args.profile,
+        concurrency=args.concurrency,
+    )
+    await idu_llm_service.resolve_indexes(request)
+    output = args.output.open("w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        async for result in idu_llm_service.generate_batch_responses(request):
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+    finally:
+        if args.output:
+            output.close()
+
+
+def main():
+
+    args = parse_args()
+    get_elastic_service().index_mapper_store.load()
+    asyncio.run(run(args, get_idu_llm_service()))
+
+
+if __name__ == "__main__":
+    main()
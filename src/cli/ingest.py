@@ -0,0 +1,373 @@
+"""Offline ingestion of documents and scenario data into elastic indexes.
+
+Builds the same documents as the upload endpoints, but reads files from disk
+and runs as a batch job outside the http server::
+
+    python -m src.cli.ingest regulations/ --index general --workers 4
+    python -m src.cli.ingest dev_data/test_common_json_to_load.json --index 1830&general
+    python -m src.cli.ingest data/ --dry-run --output-dir bulk/
+
+Supported files:
+    * ``.docx``, ``.pdf``, ``.odt``, ``.txt``, ``.md`` - document chunks,
+      ``doc_name`` is the file name without suffix;
+    * ``.json`` - scenario rows as sent to ``/llm/scenario/upload_data``, rows
+      with ``feature_collection`` go to general mode, rows with ``location``
+      to analyze mode;
+    * ``.geojson`` - layer stored as a general mode scenario row, described by
+      a sidecar ``.txt`` file with the same name (not ingested as a document).
+
+Without ``--index`` files are loaded to the index named after their parent
+directory. Completed files are stored in the checkpoint file and skipped on
+restart. With ``--rebuild`` all files are loaded to new index versions which
+replace the current ones only if every file of the index was ingested and
+the new version is not empty. In dry-run mode elastic is not touched and the
+documents are written as bulk NDJSON files to the output directory.
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from elasticsearch.helpers import bulk
+from iduconfig import Config
+from loguru import logger
+
+from src.common.constants.index_mapper import index_mapper, reverse_index_mapper
+from src.elastic.doc_parser import parser_registry
+from src.elastic.elastic_service import ElasticService
+from src.llm.llm_service import LlmService
+from src.vectorizer.vectorizer_service import VectorizerService
+
+SUPPORTED_SUFFIXES = parser_registry.suffixes + (".json", ".geojson")
+
+
+class IngestFile:
+
+    def __init__(self, path: Path, index_name: str):
+
+        self.path = path
+        self.index_name = index_name
+        stat = path.stat()
+        self.key = f"{path.resolve()}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+class Checkpoint:
+    """Json file with completed files, written after every file so an
+    interrupted run can be resumed."""
+
+    def __init__(self, path: Path):
+
+        self.path = path
+        self.completed = (
+            json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+        )
+        self._lock = threading.Lock()
+
+    def is_done(self, file: IngestFile) -> bool:
+
+        return file.key in self.completed
+
+    def mark_done(self, file: IngestFile, docs_num: int) -> None:
+
+        with self._lock:
+            self.completed[file.key] = {"index": file.index_name, "docs": docs_num}
+            tmp_path = self.path.with_suffix(".tmp")
+            tmp_path.write_text(
+                json.dumps(self.completed, ensure_ascii=False, indent=2),
+                encoding="utf-8",
+            )
+            tmp_path.replace(self.path)
+
+
+class IngestRunner:
+
+    def __init__(self, elastic_service: ElasticService, args: argparse.Namespace):
+
+        self.elastic_service = elastic_service
+        self.args = args
+        self.last_ids: dict[str, int] = {}
+        # physical index to write to by index name, new versions on rebuild
+        self.targets: dict[str, str] = {}
+        self._ids_lock = threading.Lock()
+
+    def collect_files(self) -> list[IngestFile]:
+
+        files = []
+        for path in map(Path, self.args.paths):
+            candidates = sorted(path.rglob("*")) if path.is_dir() else [path]
+            for candidate in candidates:
+                if candidate.suffix.lower() not in SUPPORTED_SUFFIXES:
+                    continue
+                if (
+                    candidate.suffix.lower() == ".txt"
+                    and candidate.with_suffix(".geojson").exists()
+                ):
+                    continue
+                index_name = self.args.index or candidate.parent.name
+                files.append(IngestFile(candidate, index_name))
+        return files
+
+    @staticmethod
+    def is_scenario_index(index_name: str) -> bool:
+
+        return "&" in index_name and not index_name.startswith("moscow")
+
+    async def prepare_indexes(self, files: list[IngestFile]) -> None:
+
+        if not self.args.dry_run:
+            # stored index names, so new indexes are registered like uploads do
+            await asyncio.to_thread(self.elastic_service.index_mapper_store.load)
+        for index_name in sorted({file.index_name for file in files}):
+            if self.args.dry_run:
+                self.last_ids[index_name] = 0
+                continue
+            if self.args.rebuild:
+                self.targets[index_name] = (
+                    self.elastic_service.index_versions.create_version(
+                        index_name,
+                        (
+                            self.elastic_service.get_scenario_index_body(index_name)
+                            if self.is_scenario_index(index_name)
+                            else self.elastic_service.get_index_body()
+                        ),
+                    )
+                )
+                self.last_ids[index_name] = 0
+                continue
+            if not self.elastic_service.client.indices.exists(index=index_name):
+                if self.is_scenario_index(index_name):
+                    await self.elastic_service.create_scenario_index(index_name)
+                else:
+                    await self.elastic_service.create_index(
+                        index_mapper.get(index_name, index_name), index_name
+                    )
+            self.last_ids[index_name] = await self.elastic_service.get_last_index(
+                index_name
+            )
+
+    async def build_docs(self, file: IngestFile) -> list[dict]:
+
+        suffix = file.path.suffix.lower()
+        if suffix in parser_registry.suffixes:
+            docs, _ = await self.elastic_service.build_document_docs(
+                str(file.path),
+                file.path.stem,
+                file.index_name,
+                0,
+                self.args.table_context_size,
+                self.args.text_questions,
+                self.args.table_questions,
+                self.args.chunk_size,
+                self.args.chunk_overlap,
+            )
+            return docs
+        if suffix == ".geojson":
+            description_path = file.path.with_suffix(".txt")
+            if not description_path.exists():
+                raise FileNotFoundError(
+                    f"Layer description {description_path} not found"
+                )
+            rows = [
+                {
+                    "text": description_path.read_text(encoding="utf-8"),
+                    "feature_collection": json.loads(
+                        file.path.read_text(encoding="utf-8")
+                    ),
+                }
+            ]
+        else:
+            rows = json.loads(file.path.read_text(encoding="utf-8"))
+        if rows and "feature_collection" in rows[0]:
+            return await self.elastic_service.build_common_scenario_docs(
+                file.index_name, rows, self.args.scenario_questions or 20
+            )
+        return await self.elastic_service.build_analyze_scenario_docs(
+            file.index_name,
+            rows,
+            self.args.scenario_questions or 5,
+            self.args.question_mode,
+        )
+
+    def allocate_ids(self, index_name: str, docs: list[dict]) -> None:
+        """Renumber documents, files built in parallel for one index must not
+        share ids."""
+
+        with self._ids_lock:
+            last_id = self.last_ids[index_name]
+            for doc in docs:
+                last_id += 1
+                doc["_id"] = str(last_id)
+                doc["num_id"] = last_id
+            self.last_ids[index_name] = last_id
+
+    def write_ndjson(self, file: IngestFile, docs: list[dict]) -> None:
+
+        output_path = (
+            Path(self.args.output_dir) / file.index_name / f"{file.path.stem}.ndjson"
+        )
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            for doc in docs:
+                action = {"index": {"_index": file.index_name, "_id": doc["_id"]}}
+                source = {k: v for k, v in doc.items() if not k.startswith("_")}
+                f.write(json.dumps(action, ensure_ascii=False) + "\n")
+                f.write(json.dumps(source, ensure_ascii=False) + "\n")
+
+    def process(self, file: IngestFile) -> int:
+
+        docs = asyncio.run(self.build_docs(file))
+        self.allocate_ids(file.index_name, docs)
+        if self.args.dry_run:
+            self.write_ndjson(file, docs)
+        elif docs:
+            target = self.targets.get(file.index_name, file.index_name)
+            # documents are built for the alias, the per action ``_index``
+            # would override the new version on rebuild
+            for doc in docs:
+                doc["_index"] = target
+            bulk(
+                self.elastic_service.client,
+                docs,
+                index=target,
+                request_timeout=1200,
+            )
+        return len(docs)
+
+    def finish_rebuild(self, failed_indexes: set[str]) -> None:
+        """Switch aliases to the rebuilt versions, empty versions and
+        versions of indexes with failed files are deleted and the current
+        ones stay searchable."""
+
+        client = self.elastic_service.client
+        versions = self.elastic_service.index_versions
+        for index_name, target in self.targets.items():
+            if index_name in failed_indexes:
+                versions.abort(target)
+                continue
+            client.indices.refresh(index=target)
+            if not client.count(index=target)["count"]:
+                logger.error(f"Rebuilt index {target} is empty, keeping {index_name}")
+                versions.abort(target)
+                continue
+            versions.swap(index_name, target)
+            versions.cleanup(index_name)
+            if (
+                not self.is_scenario_index(index_name)
+                and index_name not in index_mapper
+            ):
+                self.elastic_service.index_mapper_store.update({index_name: index_name})
+
+    def run(self) -> dict:
+
+        checkpoint = Checkpoint(Path(self.args.checkpoint))
+        files = self.collect_files()
+        pending = (
+            files
+            if self.args.rebuild
+            else [file for file in files if not checkpoint.is_done(file)]
+        )
+        summary = {
+            "files": len(files),
+            "skipped": len(files) - len(pending),
+            "done": 0,
+            "failed": 0,
+            "docs": 0,
+        }
+        asyncio.run(self.prepare_indexes(pending))
+        failed_indexes = set()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.workers) as executor:
+            futures = {executor.submit(self.process, file): file for file in pending}
+            for future in as_completed(futures):
+                file = futures[future]
+                try:
+                    docs_num = future.result()
+                except Exception as e:
+                    logger.exception(e)
+                    logger.error(f"Failed to ingest {file.path}")
+                    summary["failed"] += 1
+                    failed_indexes.add(file.index_name)
+                    continue
+                checkpoint.mark_done(file, docs_num)
+                summary["done"] += 1
+                summary["docs"] += docs_num
+                logger.info(
+                    f"Ingested {file.path} to {file.index_name}: {docs_num} docs"
+                )
+        if self.targets:
+            self.finish_rebuild(failed_indexes)
+        elapsed = time.perf_counter() - start
+        summary["seconds"] = round(elapsed, 2)
+        summary["docs_per_second"] = (
+            round(summary["docs"] / elapsed, 2) if elapsed else 0
+        )
+        summary["files_per_minute"] = (
+            round(summary["done"] * 60 / elapsed, 2) if elapsed else 0
+        )
+        return summary
+
+
+def parse_args() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(
+        description="Ingest documents, json and geojson files into elastic indexes"
+    )
+    parser.add_argument("paths", nargs="+", help="Files or directories to ingest")
+    parser.add_argument(
+        "--index", help="Target index, defaults to the parent directory name"
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--checkpoint", default="ingest_checkpoint.json")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Write bulk NDJSON files instead of indexing",
+    )
+    parser.add_argument("--output-dir", default="bulk")
+    parser.add_argument("--table-context-size", type=int, default=5)
+    parser.add_argument("--text-questions", type=int, default=10)
+    parser.add_argument("--table-questions", type=int, default=10)
+    parser.add_argument(
+        "--chunk-size", type=int, default=512, help="Max text chunk size in tokens"
+    )
+    parser.add_argument("--chunk-overlap", type=int, default=64)
+    parser.add_argument(
+        "--scenario-questions",
+        type=int,
+        default=None,
+        help="Questions per scenario row, 20 for general and 5 for analyze mode by default",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Load all files to new index versions and switch to them when done",
+    )
+    parser.add_argument(
+        "--question-mode",
+        choices=["llm", "template"],
+        default="llm",
+        help="Generate analyze mode scenario questions with LLM or from templates",
+    )
+    return parser.parse_args()
+
+
+def main():
+
+    args = parse_args()
+    config = Config()
+    vectorizer_service = VectorizerService(config)
+    llm_service = LlmService(config)
+    elastic_service = ElasticService(
+        config, vectorizer_service, llm_service, index_mapper, reverse_index_mapper
+    )
+    summary = IngestRunner(elastic_service, args).run()
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import asyncio
+import random
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, TypeVar
+
+import requests
+from loguru import logger
+
+from src.common.config.config import Config, get_optional
+from src.common.exceptions.upstream_unavailable_error import UpstreamUnavailableError
+from src.common.resilience.circuit_breaker import CircuitBreaker
+
+T = TypeVar("T")
+
+
+class BackendUnavailableError(UpstreamUnavailableError):
+    """No backend of the pool could serve the request."""
+
+
+class Backend:
+
+    def __init__(self, url: str, weight: float, circuit_breaker: CircuitBreaker):
+
+        self.url = url
+        self.weight = weight
+        self.circuit_breaker = circuit_breaker
+        self.outstanding = 0
+        self.healthy = True
+
+    def to_dict(self) -> dict:
+
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "outstanding": self.outstanding,
+            "healthy": self.healthy,
+            "circuit": self.circuit_breaker.state,
+        }
+
+
+class BackendPool:
+    """Pool of interchangeable http backends (LLM or vectorizer servers).
+
+    Requests are routed to the backend with the least outstanding requests
+    (``least_outstanding``) or randomly by weight (``weighted``). Backends
+    failing health checks or with an open circuit are skipped; failed calls
+    are retried on the next backend.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        backends: list[tuple[str, float]],
+        strategy: str = "least_outstanding",
+        health_path: str | None = None,
+        health_interval: float = 10.0,
+        failure_threshold: int = 3,
+        recovery_timeout: float = 30.0,
+        request_kwargs: dict | None = None,
+        timeout: tuple[float, float] = (5.0, 300.0),
+    ):
+
+        if not backends:
+            raise ValueError(f"No backends configured for {name} pool")
+        if strategy not in ("least_outstanding", "weighted"):
+            raise ValueError(f"Unknown balancing strategy {strategy}")
+        self.name = name
+        self.backends = [
+            Backend(url, weight, CircuitBreaker(failure_threshold, recovery_timeout))
+            for url, weight in backends
+        ]
+        self.strategy = strategy
+        self.health_path = health_path
+        self.health_interval = health_interval
+        self.request_kwargs = request_kwargs or {}
+        # (connect, read) timeouts for requests to backends
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._health_task: asyncio.Task | None = None
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Config,
+        prefix: str,
+        default_health_path: str,
+        request_kwargs: dict | None = None,
+    ) -> "BackendPool":
+        """Build pool from ``{prefix}_HOSTS`` config value: comma separated
+        ``host:port`` items with optional ``*weight`` suffix, e.g.
+        ``gpu1:11434*2,gpu2:11434``. Falls back to single ``{prefix}_HOST`` and
+        ``{prefix}_PORT`` values."""
+
+        hosts = get_optional(config, f"{prefix}_HOSTS")
+        if not hosts:
+            host = get_optional(config, f"{prefix}_HOST")
+            port = get_optional(config, f"{prefix}_PORT")
+            if not (host and port):
+                raise ValueError(
+                    f"{prefix}_HOSTS or both {prefix}_HOST and {prefix}_PORT "
+                    f"should be set, got {prefix}_HOST={host}, {prefix}_PORT={port}"
+                )
+            hosts = f"{host}:{port}"
+        backends = []
+        for item in hosts.split(","):
+            address, _, weight = item.strip().partition("*")
+            backends.append((f"http://{address}", float(weight or 1)))
+        return cls(
+            prefix.lower(),
+            backends,
+            strategy=get_optional(config, f"{prefix}_BALANCING") or "least_outstanding",
+            health_path=get_optional(config, f"{prefix}_HEALTH_PATH")
+            or default_health_path,
+            health_interval=float(
+                get_optional(config, f"{prefix}_HEALTH_INTERVAL") or 10
+            ),
+            failure_threshold=int(
+                get_optional(config, f"{prefix}_FAILURE_THRESHOLD") or 3
+            ),
+            recovery_timeout=float(
+                get_optional(config, f"{prefix}_RECOVERY_TIMEOUT") or 30
+            ),
+            request_kwargs=request_kwargs,
+            timeout=(
+                float(get_optional(config, f"{prefix}_CONNECT_TIMEOUT") or 5),
+                float(get_optional(config, f"{prefix}_READ_TIMEOUT") or 300),
+            ),
+        )
+
+    def select(self, exclude: set[str] | None = None) -> Backend:
+
+        exclude = exclude or set()
+        candidates = [b for b in self.backends if b.url not in exclude]
+        # unhealthy backends are still tried when nothing else is left, health
+        # checks may lag behind the actual state
+        healthy = [b for b in candidates if b.healthy] or candidates
+        with self._lock:
+            if self.strategy == "least_outstanding":
+                ordered = sorted(
+                    healthy, key=lambda b: (b.outstanding / b.weight, random.random())
+                )
+            else:
+                # weighted random order (Efraimidis-Spirakis)
+                ordered = sorted(
+                    healthy,
+                    key=lambda b: random.random() ** (1 / b.weight),
+                    reverse=True,
+                )
+            for backend in ordered:
+                if backend.circuit_breaker.allow_request():
+                    backend.outstanding += 1
+                    return backend
+        raise BackendUnavailableError(
+            self.name, f"No available {self.name} backends", retryable=False
+        )
+
+    def release(self, backend: Backend, success: bool) -> None:
+
+        with self._lock:
+            backend.outstanding -= 1
+        if success:
+            backend.circuit_breaker.record_success()
+        else:
+            backend.circuit_breaker.record_failure()
+            logger.warning(
+                f"{self.name} backend {backend.url} failed, circuit {backend.circuit_breaker.state}"
+            )
+
+    @staticmethod
+    def is_backend_failure(error: Exception) -> bool:
+        """Connection problems and 5xx responses are backend failures, other
+        errors (e.g. 4xx for a bad request) are not retried elsewhere."""
+
+        if isinstance(error, requests.HTTPError):
+            return error.response is None or error.response.status_code >= 500
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    @contextmanager
+    def acquire(self, exclude: set[str] | None = None) -> Iterator[Backend]:
+
+        backend = self.select(exclude)
+        success = True
+        try:
+            yield backend
+        except Exception as e:
+            success = not self.is_backend_failure(e)
+            raise
+        finally:
+            # also on GeneratorExit, when a stream consumer stops early
+            self.release(backend, success)
+
+    def call(self, func: Callable[[str], T]) -> T:
+        """Call ``func`` with backend base url, failing over to other backends
+        on backend failures."""
+
+        with self.session(func) as result:
+            return result
+
+    @contextmanager
+    def session(self, func: Callable[[str], T]) -> Iterator[T]:
+        """Like ``call``, but keeps the backend acquired until the context exits,
+        e.g. while a streamed response is read. Failover happens only while
+        ``func`` opens the response."""
+
+        tried = set()
+        last_error = None
+        while len(tried) < len(self.backends):
+            try:
+                backend = self.select(tried)
+            except BackendUnavailableError:
+                break
+            tried.add(backend.url)
+            try:
+                result = func(backend.url)
+            except Exception as e:
+                failure = self.is_backend_failure(e)
+                self.release(backend, not failure)
+                if not failure:
+                    raise
+                last_error = e
+                continue
+            success = True
+            try:
+                yield result
+            except Exception as e:
+                success = not self.is_backend_failure(e)
+                raise
+            finally:
+                # also on GeneratorExit, when a stream consumer stops early
+                self.release(backend, success)
+            return
+        if last_error is None:
+            raise BackendUnavailableError(
+                self.name, f"No available {self.name} backends", retryable=False
+            )
+        raise BackendUnavailableError(
+            self.name, f"All {self.name} backends failed: {last_error!r}"
+        ) from last_error
+
+    def check_health(self) -> None:
+
+        for backend in self.backends:
+            try:
+                response = requests.get(
+                    f"{backend.url}{self.health_path}",
+                    timeout=self.timeout[0],
+                    **self.request_kwargs,
+                )
+                healthy = response.status_code == 200
+            except Exception:
+                healthy = False
+            if healthy != backend.healthy:
+                logger.info(
+                    f"{self.name} backend {backend.url} is {'up' if healthy else 'down'}"
+                )
+            backend.healthy = healthy
+
+    async def run_health_checks(self) -> None:
+
+        while True:
+            await asyncio.to_thread(self.check_health)
+            await asyncio.sleep(self.health_interval)
+
+    def start_health_checks(self) -> None:
+
+        if self._health_task is None and self.health_path:
+            self._health_task = asyncio.create_task(self.run_health_checks())
+
+    def stop_health_checks(self) -> None:
+
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+
+    def status(self) -> list[dict]:
+
+        return [backend.to_dict() for backend in self.backends]
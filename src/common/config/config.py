@@ -18,3 +18,13 @@ class Config:
     def set(key: str, val: str) -> None:
         os.environ[key] = val
         return
+
+
+def get_optional(config, key: str) -> str | None:
+    """Value of an optional config variable, ``None`` if it is not set.
+    ``iduconfig.Config.get`` raises ``ValueError`` for missing variables."""
+
+    try:
+        return config.get(key) or None
+    except ValueError:
+        return None
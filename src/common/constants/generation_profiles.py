@@ -0,0 +1,14 @@
+# Built-in LLM generation profiles. Can be extended or overridden with the
+# LLM_GENERATION_PROFILES config value (json: {"name": {profile fields}}).
+generation_profiles = {
+    "fast": {"think": False, "num_predict": 1024, "temperature": 0.3},
+    "default": {"think": True, "num_predict": 4096, "temperature": 0.5},
+    "deep": {"think": True, "num_predict": 8192, "temperature": 0.5},
+}
+
+# Profile targets for scenario modes, used as keys in LLM_INDEX_PROFILES config
+# value (json: {"<index name or scenario target>": "<profile name>"}) alongside
+# plain document index names.
+SCENARIO_GENERAL_TARGET = "scenario_general"
+SCENARIO_ANALYZE_TARGET = "scenario_analyze"
+SCENARIO_OBJECT_TARGET = "scenario_object"
@@ -3,6 +3,10 @@
 # retrieved. Managed through the dedicated /llm/test/transport endpoints.
 TEST_TRANSPORT_INDEX = "test_transport"
 
+# Metadata index with the shared index_mapper document, not listed as a
+# searchable index.
+INDEX_MAPPER_INDEX = "idu_index_mapper"
+
 index_mapper = {
     "general": "Общее",
     "investment": "Инвестиционная стадия",
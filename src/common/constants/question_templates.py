@@ -0,0 +1,27 @@
+# Built-in question templates for structured scenario objects. Keys are object
+# types (``physical_object_type`` of the row properties), ``default`` templates
+# follow the type specific ones. Can be extended or overridden with the
+# QUESTION_TEMPLATES config value (json: {"object type": ["template", ...]}).
+# Templates are str.format strings on object fields, a template is skipped
+# when any of its fields is missing for the object. Available fields are
+# scalar row properties by their names and ``object_type``, ``physical_objects``,
+# ``services``, ``floors`` collected from nested Urban API objects.
+question_templates = {
+    "default": [
+        "Что находится на территории объекта {object_type}?",
+        "Какие ограничения действуют в зоне «{buffer_type-name}»?",
+        "На какие объекты влияет зона «{buffer_type-name}»?",
+        "Можно ли разместить {physical_objects} рядом с объектом {object_type}?",
+        "Какие сервисы ({services}) расположены у объекта {object_type}?",
+        "Где расположен {physical_objects} в {floors} этажей?",
+        "Какие нормы действуют для объекта {object_type}?",
+    ],
+    "Промышленная территория": [
+        "Какая санитарно-защитная зона у промышленной территории?",
+        "Можно ли строить {physical_objects} рядом с промышленной территорией?",
+    ],
+    "Кладбище": [
+        "Какая санитарно-защитная зона у кладбища?",
+        "Можно ли строить {physical_objects} рядом с кладбищем?",
+    ],
+}
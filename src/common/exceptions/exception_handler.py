@@ -7,6 +7,8 @@ from loguru import logger
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
+from .upstream_unavailable_error import UpstreamUnavailableError
+
 
 class ExceptionHandlerMiddleware(
     BaseHTTPMiddleware
@@ -80,6 +82,17 @@ class ExceptionHandlerMiddleware(
                     request_info["body"] = str(await request.body())
                 except:
                     request_info["body"] = "Could not read request body"
+            if isinstance(e, UpstreamUnavailableError):
+                logger.warning(e)
+                return JSONResponse(
+                    status_code=503,
+                    content={
+                        "message": f"{e.service} service unavailable",
+                        "error_type": e.__class__.__name__,
+                        "request": request_info,
+                        "detail": str(e),
+                    },
+                )
             if isinstance(e, HTTPException):
                 return JSONResponse(
                     status_code=e.status_code,
@@ -0,0 +1,14 @@
+class UpstreamUnavailableError(ConnectionError):
+    """Upstream service (LLM, vectorizer) can't serve requests right now.
+
+    Attributes:
+        service (str): Upstream service name.
+        retryable (bool): Whether repeating the call may succeed. False when
+            the request was rejected without a call because circuits are open.
+    """
+
+    def __init__(self, service: str, message: str, retryable: bool = True):
+
+        super().__init__(message)
+        self.service = service
+        self.retryable = retryable
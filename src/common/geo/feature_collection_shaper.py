@@ -0,0 +1,134 @@
+import json
+
+from loguru import logger
+
+from src.common.config.config import Config, get_optional
+
+# web mercator tile size in pixels
+TILE_SIZE = 256
+
+
+class FeatureCollectionShaper:
+    """Prepares FeatureCollections for the map before sending them to the
+    client: geometries are simplified to about one pixel at the map zoom,
+    coordinates are rounded, empty and not listed properties are dropped and
+    features over the payload size limit are cut off. Originals stay in
+    elastic and are returned by the geometry endpoint by ``source`` ids."""
+
+    def __init__(
+        self,
+        zoom: int = 14,
+        precision: int = 6,
+        max_bytes: int = 2_000_000,
+        properties: list[str] | None = None,
+    ):
+
+        self.zoom = zoom
+        self.precision = precision
+        self.max_bytes = max_bytes
+        # properties to keep, all non-empty properties are kept if not set
+        self.properties = set(properties) if properties else None
+
+    @classmethod
+    def from_config(cls, config: Config) -> "FeatureCollectionShaper":
+
+        properties = get_optional(config, "FEATURE_COLLECTION_PROPERTIES")
+        return cls(
+            zoom=int(get_optional(config, "FEATURE_COLLECTION_ZOOM") or 14),
+            precision=int(get_optional(config, "FEATURE_COLLECTION_PRECISION") or 6),
+            max_bytes=int(
+                get_optional(config, "FEATURE_COLLECTION_MAX_BYTES") or 2_000_000
+            ),
+            properties=(
+                [i.strip() for i in properties.split(",") if i.strip()]
+                if properties
+                else None
+            ),
+        )
+
+    @staticmethod
+    def get_tolerance(zoom: int) -> float:
+        """Size of one pixel in degrees at the zoom level on the equator."""
+
+        return 360 / (TILE_SIZE * 2**zoom)
+
+    def shape_geometry(self, geometry: dict | None, tolerance: float) -> dict | None:
+
+        # imported on the first layer, not with the app
+        import numpy as np
+        import shapely
+        from shapely.geometry import mapping, shape
+
+        if not geometry:
+            return None
+        try:
+            geom = shape(geometry)
+        except Exception as e:
+            logger.warning(f"Skipped invalid geometry: {e!r}")
+            return None
+        if geom.is_empty:
+            return None
+        if geom.geom_type not in ("Point", "MultiPoint"):
+            geom = geom.simplify(tolerance, preserve_topology=True)
+        geom = shapely.transform(geom, lambda coords: np.round(coords, self.precision))
+        return mapping(geom)
+
+    def shape_properties(self, properties: dict | None) -> dict:
+
+        return {
+            key: value
+            for key, value in (properties or {}).items()
+            if value not in (None, "", [], {})
+            and not key.startswith("_")
+            and (self.properties is None or key in self.properties)
+        }
+
+    def shape(
+        self,
+        feature_collection: dict,
+        zoom: int | None = None,
+        source: dict | None = None,
+    ) -> dict:
+        """Shape FeatureCollection for the map.
+
+        Args:
+            feature_collection (dict): GeoJSON FeatureCollection.
+            zoom (int | None): map zoom, configured zoom is used if not set.
+            source (dict | None): index, physical index (``version``) and id
+                of the elastic document with the original layer, added to the
+                collection as ``source``.
+        Returns:
+            dict: FeatureCollection with ``truncated`` and ``total_features``
+                members when features were cut off by the size limit.
+        """
+
+        tolerance = self.get_tolerance(zoom if zoom is not None else self.zoom)
+        features = []
+        # "{"type":"FeatureCollection","features":[]}" and separators
+        size = 64
+        total = len(feature_collection.get("features", []))
+        for feature in feature_collection.get("features", []):
+            geometry = self.shape_geometry(feature.get("geometry"), tolerance)
+            if geometry is None:
+                continue
+            shaped = {
+                "type": "Feature",
+                "geometry": geometry,
+                "properties": self.shape_properties(feature.get("properties")),
+            }
+            if "id" in feature:
+                shaped["id"] = feature["id"]
+            size += len(json.dumps(shaped, ensure_ascii=False).encode()) + 1
+            if size > self.max_bytes:
+                break
+            features.append(shaped)
+
+        result = {"type": "FeatureCollection", "features": features}
+        if "name" in feature_collection:
+            result["name"] = feature_collection["name"]
+        if source:
+            result["source"] = source
+        if len(features) < total:
+            result["truncated"] = size > self.max_bytes
+            result["total_features"] = total
+        return result
@@ -0,0 +1,87 @@
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from src.common.config.config import Config, get_optional
+
+
+class LayerEncoder:
+    """Gzip encoding of map layers for binary websocket frames.
+
+    Encoded layers with a ``source`` document id (see
+    ``FeatureCollectionShaper``) are kept in an LRU cache limited by total
+    size, so a popular layer is compressed once per zoom level and ``ttl``.
+    Keys include the physical index, ids of a rebuilt version start over.
+    ``invalidate`` only clears the cache of its worker, so ``from_config``
+    bounds ``ttl`` by the index registry refresh interval: other workers
+    serve layers of a deleted and re-created index no longer than they see
+    the deleted index in the registry.
+    """
+
+    def __init__(
+        self, level: int = 6, cache_max_bytes: int = 64 * 2**20, ttl: float = 600
+    ):
+
+        self.level = level
+        self.cache_max_bytes = cache_max_bytes
+        self.ttl = ttl
+        self._cache: OrderedDict[tuple, tuple[float, bytes]] = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Config) -> "LayerEncoder":
+
+        return cls(
+            level=int(get_optional(config, "LAYER_GZIP_LEVEL") or 6),
+            cache_max_bytes=int(
+                get_optional(config, "LAYER_CACHE_MAX_BYTES") or 64 * 2**20
+            ),
+            ttl=min(
+                float(get_optional(config, "LAYER_CACHE_TTL") or 600),
+                float(get_optional(config, "ELASTIC_INDEX_REFRESH_INTERVAL") or 60),
+            ),
+        )
+
+    @staticmethod
+    def get_key(layer: dict, zoom: int | None) -> tuple | None:
+
+        source = layer.get("source") or {}
+        if "doc_id" not in source:
+            return None
+        return source.get("index"), source.get("version"), source["doc_id"], zoom
+
+    def invalidate(self, index_name: str) -> None:
+        """Drop cached layers of the index, e.g. after its documents were
+        deleted and ids can be reused in the same physical index."""
+
+        with self._lock:
+            for key in [i for i in self._cache if i[0] == index_name]:
+                self._cache_bytes -= len(self._cache.pop(key)[1])
+
+    def encode(self, layer: dict, zoom: int | None = None) -> bytes:
+        """Compact json of the layer compressed with gzip."""
+
+        key = self.get_key(layer, zoom)
+        if key is not None:
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached and time.monotonic() - cached[0] < self.ttl:
+                    self._cache.move_to_end(key)
+                    return cached[1]
+        data = gzip.compress(
+            json.dumps(layer, ensure_ascii=False, separators=(",", ":")).encode(),
+            compresslevel=self.level,
+        )
+        if key is not None and len(data) <= self.cache_max_bytes:
+            with self._lock:
+                if key in self._cache:
+                    self._cache_bytes -= len(self._cache.pop(key)[1])
+                self._cache[key] = (time.monotonic(), data)
+                self._cache_bytes += len(data)
+                while self._cache_bytes > self.cache_max_bytes:
+                    _, (_, evicted) = self._cache.popitem(last=False)
+                    self._cache_bytes -= len(evicted)
+        return data
@@ -5,18 +5,30 @@ from typing import Any
 from loguru import logger
 
 
-def add_logger(target: Any):
+def add_logger(target: Any, **kwargs):
 
     logger.add(
         target,
         level="INFO",
         format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {name}:{function}:{line} | {message}",
+        **kwargs,
     )
 
 
-def init_logs(logs_path: Path):
+def init_logs(
+    logs_path: Path,
+    rotation: str | None = None,
+    retention: str | int | None = None,
+    compression: str | None = None,
+):
+    """Log to stdout and ``logs_path``. The file is rotated by size or time
+    (``rotation``, e.g. ``"100 MB"`` or ``"00:00"``), rotated files are kept
+    by count or age (``retention``, e.g. ``10`` or ``"7 days"``) and
+    compressed (``compression``, e.g. ``"gz"``)."""
 
     logger.remove()
     add_logger(sys.stdout)
-    add_logger(logs_path)
+    add_logger(
+        logs_path, rotation=rotation, retention=retention, compression=compression
+    )
     logger.info("Initialized logs")
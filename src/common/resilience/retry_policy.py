@@ -0,0 +1,69 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, TypeVar
+
+import requests
+from loguru import logger
+
+from src.common.config.config import Config, get_optional
+from src.common.exceptions.upstream_unavailable_error import UpstreamUnavailableError
+
+T = TypeVar("T")
+
+
+class RetryPolicy:
+    """Retries of idempotent upstream calls with exponential backoff and full
+    jitter, so retries of many concurrent callers don't arrive in waves."""
+
+    def __init__(
+        self, attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0
+    ):
+
+        self.attempts = max(attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_config(cls, config: Config, prefix: str) -> "RetryPolicy":
+
+        return cls(
+            attempts=int(get_optional(config, f"{prefix}_RETRIES") or 3),
+            base_delay=float(get_optional(config, f"{prefix}_RETRY_BASE_DELAY") or 0.5),
+            max_delay=float(get_optional(config, f"{prefix}_RETRY_MAX_DELAY") or 8),
+        )
+
+    @staticmethod
+    def is_retryable(error: Exception) -> bool:
+
+        if isinstance(error, UpstreamUnavailableError):
+            return error.retryable
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def get_delay(self, attempt: int) -> float:
+
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def call(self, func: Callable[[], T]) -> T:
+
+        for attempt in range(self.attempts):
+            try:
+                return func()
+            except Exception as e:
+                if attempt + 1 == self.attempts or not self.is_retryable(e):
+                    raise
+                delay = self.get_delay(attempt)
+                logger.warning(f"Retrying in {delay:.2f}s after error: {e!r}")
+                time.sleep(delay)
+
+    async def call_async(self, func: Callable[[], Awaitable[T]]) -> T:
+
+        for attempt in range(self.attempts):
+            try:
+                return await func()
+            except Exception as e:
+                if attempt + 1 == self.attempts or not self.is_retryable(e):
+                    raise
+                delay = self.get_delay(attempt)
+                logger.warning(f"Retrying in {delay:.2f}s after error: {e!r}")
+                await asyncio.sleep(delay)
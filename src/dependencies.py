@@ -1,24 +1,108 @@
+"""Application services.
+
+Services are built on first use and shared by the process, so importing the
+app (or a cli) does not read config or connect anywhere. Routes get them
+with ``Depends``, the app lifespan builds them before serving requests.
+"""
+
+from functools import lru_cache
 from pathlib import Path
+from typing import Annotated
 
+from fastapi import Depends
 from iduconfig import Config
 
+from src.common.config.config import get_optional
 from src.common.constants.index_mapper import index_mapper, reverse_index_mapper
-from src.common.exceptions.http_exception import http_exception
+from src.common.geo.feature_collection_shaper import FeatureCollectionShaper
+from src.common.geo.layer_encoder import LayerEncoder
 from src.common.logging.init_logs import init_logs
 from src.elastic.elastic_service import ElasticService
 from src.idu_llm.idu_llm_service import IduLLMService
 from src.llm.llm_service import LlmService
 from src.logs.logs_service import LogsService
+from src.reranker.reranker_service import RerankerService
 from src.vectorizer.vectorizer_service import VectorizerService
 
-# TODO remove to dependencies injection
-config = Config()
-log_path = Path().resolve().absolute() / ".log"
-init_logs(log_path)
-logs_service = LogsService(log_path)
-model = VectorizerService(config)
-llm_service = LlmService(config)
-elastic_client = ElasticService(
-    config, model, llm_service, index_mapper, reverse_index_mapper
-)
-idu_llm_client = IduLLMService(llm_service, elastic_client, model)
+
+@lru_cache
+def get_config() -> Config:
+
+    return Config()
+
+
+@lru_cache
+def get_logs_service() -> LogsService:
+    """Logs service, initializes file logging on first call."""
+
+    config = get_config()
+    log_path = Path().resolve().absolute() / ".log"
+    retention = get_optional(config, "LOG_RETENTION")
+    init_logs(
+        log_path,
+        rotation=get_optional(config, "LOG_ROTATION"),
+        retention=int(retention) if retention and retention.isdigit() else retention,
+        compression=get_optional(config, "LOG_COMPRESSION"),
+    )
+    return LogsService(log_path)
+
+
+@lru_cache
+def get_vectorizer_service() -> VectorizerService:
+
+    return VectorizerService(get_config())
+
+
+@lru_cache
+def get_llm_service() -> LlmService:
+
+    return LlmService(get_config())
+
+
+@lru_cache
+def get_elastic_service() -> ElasticService:
+
+    return ElasticService(
+        get_config(),
+        get_vectorizer_service(),
+        get_llm_service(),
+        index_mapper,
+        reverse_index_mapper,
+    )
+
+
+@lru_cache
+def get_layer_encoder() -> LayerEncoder:
+
+    return LayerEncoder.from_config(get_config())
+
+
+@lru_cache
+def get_reranker() -> RerankerService | None:
+
+    return RerankerService.from_config(get_config())
+
+
+@lru_cache
+def get_idu_llm_service() -> IduLLMService:
+
+    config = get_config()
+    return IduLLMService(
+        get_llm_service(),
+        get_elastic_service(),
+        get_vectorizer_service(),
+        FeatureCollectionShaper.from_config(config),
+        batch_concurrency=int(get_optional(config, "BATCH_LLM_CONCURRENCY") or 4),
+        batch_embed_size=int(get_optional(config, "BATCH_EMBED_SIZE") or 32),
+        reranker=get_reranker(),
+    )
+
+
+ConfigDep = Annotated[Config, Depends(get_config)]
+LogsServiceDep = Annotated[LogsService, Depends(get_logs_service)]
+VectorizerServiceDep = Annotated[VectorizerService, Depends(get_vectorizer_service)]
+LlmServiceDep = Annotated[LlmService, Depends(get_llm_service)]
+ElasticServiceDep = Annotated[ElasticService, Depends(get_elastic_service)]
+LayerEncoderDep = Annotated[LayerEncoder, Depends(get_layer_encoder)]
+RerankerDep = Annotated[RerankerService | None, Depends(get_reranker)]
+IduLLMServiceDep = Annotated[IduLLMService, Depends(get_idu_llm_service)]
@@ -1,3 +1,14 @@
+from .base_parser import BaseParser, DocBlock
+from .chunker import Chunk, StructureChunker
 from .doc_parser import DocParser
+from .odt_parser import OdtParser
+from .parser_registry import ParserRegistry
+from .pdf_parser import PdfParser
+from .table_context import attach_table_context
+from .text_parser import TextParser
 
 doc_parser = DocParser()
+
+parser_registry = ParserRegistry()
+for parser in (DocParser, PdfParser, OdtParser, TextParser):
+    parser_registry.register(parser)
@@ -0,0 +1,38 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterator
+
+
+@dataclass
+class DocBlock:
+    """Document block. ``heading_level`` is set for heading paragraphs (1 is
+    the top level), ``is_list`` for numbered or bulleted list items,
+    ``before`` and ``after`` hold the text context of tables."""
+
+    text: str
+    kind: str
+    heading_level: int | None = None
+    is_list: bool = False
+    before: str = ""
+    after: str = ""
+
+
+class BaseParser(ABC):
+    """Document parser producing the same block stream as ``DocParser``."""
+
+    suffixes: tuple[str, ...] = ()
+
+    @staticmethod
+    @abstractmethod
+    def iter_blocks(source: str | Path | IO[bytes]) -> Iterator[DocBlock]:
+        """Yield document blocks in order."""
+
+    @classmethod
+    def iter_contexts_for_vectorization(
+        cls, source: str | Path | IO[bytes]
+    ) -> Iterator[tuple[str, str]]:
+        """Yield document blocks in order as ``(text, kind)`` pairs."""
+
+        for block in cls.iter_blocks(source):
+            yield block.text, block.kind
@@ -0,0 +1,164 @@
+import math
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from .base_parser import DocBlock
+
+# rough chars per token ratio for size estimation, no tokenizer required
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+
+    return max(math.ceil(len(text) / CHARS_PER_TOKEN), 1)
+
+
+@dataclass
+class Chunk:
+    """Text chunk to vectorize. For tables ``text`` is the table and
+    ``before``/``after`` hold the surrounding paragraphs."""
+
+    text: str
+    kind: str
+    heading_path: list[str]
+    before: str = ""
+    after: str = ""
+
+    @property
+    def body(self) -> str:
+        """Chunk text prefixed with its section headings."""
+
+        if not self.heading_path or self.kind != "text":
+            return self.text
+        return " / ".join(self.heading_path) + "\n" + self.text
+
+
+@dataclass
+class ChunkStats:
+
+    blocks: int = 0
+    tables: int = 0
+    chunks: int = 0
+    tokens: list[int] = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+
+        return {
+            "blocks": self.blocks,
+            "tables": self.tables,
+            "chunks": self.chunks,
+            "min_tokens": min(self.tokens, default=0),
+            "avg_tokens": (
+                round(sum(self.tokens) / len(self.tokens)) if self.tokens else 0
+            ),
+            "max_tokens": max(self.tokens, default=0),
+            "reduction": round(self.blocks / self.chunks, 2) if self.chunks else 0,
+        }
+
+
+class StructureChunker:
+    """Groups paragraphs into chunks by document sections.
+
+    Heading paragraphs close the current chunk and form the heading path of
+    the following ones. Paragraphs of a section are merged until
+    ``max_tokens``, the next chunk repeats the last paragraphs up to
+    ``overlap_tokens``. List items stay with the preceding paragraph while the
+    chunk is under twice the size limit. Tables are separate chunks.
+    """
+
+    def __init__(self, max_tokens: int = 512, overlap_tokens: int = 64):
+
+        self.max_tokens = max_tokens
+        self.overlap_tokens = min(overlap_tokens, max_tokens // 2)
+        self.stats = ChunkStats()
+
+    def chunk(self, blocks: Iterable[DocBlock]) -> Iterator[Chunk]:
+
+        self.stats = ChunkStats()
+        headings: list[tuple[int, str]] = []
+        buffer: list[str] = []
+        buffer_tokens = 0
+        has_new_text = False
+
+        def flush() -> Iterator[Chunk]:
+            if has_new_text:
+                yield self.make_chunk(
+                    "\n".join(buffer), "text", [text for _, text in headings]
+                )
+
+        for block in blocks:
+            self.stats.blocks += 1
+            if block.kind == "table":
+                self.stats.tables += 1
+                yield from flush()
+                buffer, buffer_tokens, has_new_text = [], 0, False
+                yield self.make_chunk(
+                    block.text,
+                    "table",
+                    [text for _, text in headings],
+                    block.before,
+                    block.after,
+                )
+                continue
+            if block.heading_level is not None:
+                yield from flush()
+                buffer, buffer_tokens, has_new_text = [], 0, False
+                while headings and headings[-1][0] >= block.heading_level:
+                    headings.pop()
+                headings.append((block.heading_level, block.text))
+                continue
+
+            for part in self.split_long(block.text):
+                tokens = estimate_tokens(part)
+                size = buffer_tokens + tokens
+                if (
+                    buffer
+                    and size > self.max_tokens
+                    and (not block.is_list or size > 2 * self.max_tokens)
+                ):
+                    yield from flush()
+                    buffer, buffer_tokens = self.overlap(buffer)
+                has_new_text = True
+                buffer.append(part)
+                buffer_tokens += tokens
+        yield from flush()
+
+    def make_chunk(
+        self,
+        text: str,
+        kind: str,
+        heading_path: list[str],
+        before: str = "",
+        after: str = "",
+    ) -> Chunk:
+
+        chunk = Chunk(text, kind, heading_path, before, after)
+        self.stats.chunks += 1
+        self.stats.tokens.append(estimate_tokens(chunk.body))
+        return chunk
+
+    def overlap(self, buffer: list[str]) -> tuple[list[str], int]:
+
+        tail, tokens = [], 0
+        for text in reversed(buffer):
+            text_tokens = estimate_tokens(text)
+            if tokens + text_tokens > self.overlap_tokens:
+                break
+            tail.insert(0, text)
+            tokens += text_tokens
+        return tail, tokens
+
+    def split_long(self, text: str) -> list[str]:
+        """Split paragraph longer than the chunk size by words."""
+
+        if estimate_tokens(text) <= self.max_tokens:
+            return [text]
+        parts, current = [], []
+        for word in text.split():
+            current.append(word)
+            if estimate_tokens(" ".join(current)) >= self.max_tokens:
+                parts.append(" ".join(current))
+                current = []
+        if current:
+            parts.append(" ".join(current))
+        return parts
@@ -1,33 +1,204 @@
-import pandas as pd
-from docx import Document
-from docx.table import Table
-from docx.text.paragraph import Paragraph
+import re
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterator
 
+from lxml import etree
 
-class DocParser:
+from .base_parser import BaseParser, DocBlock
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+BODY = f"{W}body"
+PARAGRAPH = f"{W}p"
+TABLE = f"{W}tbl"
+ROW = f"{W}tr"
+CELL = f"{W}tc"
+VAL = f"{W}val"
+STYLE = f"{W}style"
+STYLE_ID = f"{W}styleId"
+HEADING_NAME = re.compile(r"^(heading|заголовок)\s*(\d)$", re.IGNORECASE)
+# run elements contributing to paragraph text, as in python-docx
+TEXT_TAGS = {f"{W}t": None, f"{W}tab": "\t", f"{W}br": "\n", f"{W}cr": "\n"}
+
+
+@dataclass
+class ParagraphStyle:
+
+    outline_level: int | None = None
+    is_list: bool = False
+    based_on: str | None = None
+
+
+class DocParser(BaseParser):
+    """Streaming docx parser. Walks ``word/document.xml`` with lxml iterparse,
+    so only the current top-level paragraph or table is kept in memory."""
+
+    suffixes = (".docx",)
 
     @staticmethod
-    def iter_contexts_for_vectorization(parent: Document):
-
-        for child in parent.element.body.iterchildren():
-            if child.tag.endswith("}p"):
-                para = Paragraph(child, parent)
-                if para.text != "":
-                    yield para.text, "text"
-            elif child.tag.endswith("}tbl"):
-                table = Table(child, parent)
-                columns = []
-                col_counter = 0
-                for i in [cell.text for cell in table.rows[0].cells if cell]:
-                    if i:
-                        columns.append(i)
-                    else:
-                        columns.append(f"Без_названия_{col_counter}")
-                        col_counter += 1
-
-                yield str(
-                    pd.DataFrame(
-                        [[cell.text for cell in row.cells] for row in table.rows[1:]],
-                        columns=columns,
-                    ).to_dict("list")
-                ), "table"
+    def read_styles(archive: zipfile.ZipFile) -> dict[str, ParagraphStyle]:
+        """Paragraph styles outline level and numbering, resolved through
+        ``basedOn`` inheritance."""
+
+        if "word/styles.xml" not in archive.namelist():
+            return {}
+        styles = {}
+        root = etree.fromstring(archive.read("word/styles.xml"))
+        for style in root.iterchildren(STYLE):
+            style_id = style.get(STYLE_ID)
+            outline = style.find(f"{W}pPr/{W}outlineLvl")
+            name = style.find(f"{W}name")
+            based_on = style.find(f"{W}basedOn")
+            name_match = (
+                HEADING_NAME.match(name.get(VAL, "")) if name is not None else None
+            )
+            if outline is not None:
+                outline_level = int(outline.get(VAL)) + 1
+            elif name_match:
+                outline_level = int(name_match.group(2))
+            elif name is not None and name.get(VAL, "").lower() == "title":
+                outline_level = 1
+            else:
+                outline_level = None
+            styles[style_id] = ParagraphStyle(
+                outline_level,
+                style.find(f"{W}pPr/{W}numPr") is not None,
+                based_on.get(VAL) if based_on is not None else None,
+            )
+        for style in styles.values():
+            parent_id, depth = style.based_on, 0
+            while parent_id in styles and depth < 10:
+                parent = styles[parent_id]
+                if style.outline_level is None:
+                    style.outline_level = parent.outline_level
+                style.is_list = style.is_list or parent.is_list
+                parent_id, depth = parent.based_on, depth + 1
+        return styles
+
+    @staticmethod
+    def paragraph_block(
+        paragraph: etree._Element, styles: dict[str, ParagraphStyle]
+    ) -> DocBlock:
+
+        style_element = paragraph.find(f"{W}pPr/{W}pStyle")
+        style = (
+            styles.get(style_element.get(VAL), ParagraphStyle())
+            if style_element is not None
+            else ParagraphStyle()
+        )
+        outline = paragraph.find(f"{W}pPr/{W}outlineLvl")
+        outline_level = (
+            int(outline.get(VAL)) + 1 if outline is not None else style.outline_level
+        )
+        # outline level 10 (9 in xml) is body text
+        heading_level = outline_level if outline_level and outline_level < 10 else None
+        is_list = paragraph.find(f"{W}pPr/{W}numPr") is not None or style.is_list
+        return DocBlock(
+            DocParser.paragraph_text(paragraph),
+            "text",
+            heading_level,
+            is_list and heading_level is None,
+        )
+
+    @staticmethod
+    def iter_blocks(source: str | Path | IO[bytes]) -> Iterator[DocBlock]:
+        """Yield document blocks in order with heading and list structure.
+
+        Args:
+            source (str | Path | IO[bytes]): docx file path or file-like object.
+        """
+
+        with zipfile.ZipFile(source) as archive, archive.open(
+            "word/document.xml"
+        ) as document_xml:
+            styles = DocParser.read_styles(archive)
+            for _, element in etree.iterparse(
+                document_xml, events=("end",), tag=(PARAGRAPH, TABLE)
+            ):
+                parent = element.getparent()
+                # nested paragraphs and tables are handled with their table
+                if parent is None or parent.tag != BODY:
+                    continue
+                if element.tag == PARAGRAPH:
+                    block = DocParser.paragraph_block(element, styles)
+                    if block.text != "":
+                        yield block
+                else:
+                    yield DocBlock(
+                        DocParser.table_to_markdown(DocParser.table_rows(element)),
+                        "table",
+                    )
+                element.clear()
+                while element.getprevious() is not None:
+                    del parent[0]
+
+    @staticmethod
+    def paragraph_text(paragraph: etree._Element) -> str:
+
+        parts = []
+        for element in paragraph.iter(*TEXT_TAGS):
+            replacement = TEXT_TAGS[element.tag]
+            parts.append((element.text or "") if replacement is None else replacement)
+        return "".join(parts)
+
+    @staticmethod
+    def cell_text(cell: etree._Element) -> str:
+
+        return " ".join(
+            text for text in map(DocParser.paragraph_text, cell.iter(PARAGRAPH)) if text
+        )
+
+    @staticmethod
+    def table_rows(table: etree._Element) -> list[list[str]]:
+        """Table as a grid of cell texts. Horizontally merged cells (gridSpan)
+        are repeated in every grid column they span, vertically merged cells
+        (vMerge continuation) repeat the value of the cell above."""
+
+        rows = []
+        for row in table.iterchildren(ROW):
+            values = []
+            grid_before = row.find(f"{W}trPr/{W}gridBefore")
+            if grid_before is not None:
+                values += [""] * int(grid_before.get(VAL, 0))
+            for cell in row.iterchildren(CELL):
+                span_element = cell.find(f"{W}tcPr/{W}gridSpan")
+                span = int(span_element.get(VAL, 1)) if span_element is not None else 1
+                merge = cell.find(f"{W}tcPr/{W}vMerge")
+                column = len(values)
+                if (
+                    merge is not None
+                    and merge.get(VAL, "continue") == "continue"
+                    and rows
+                    and column < len(rows[-1])
+                ):
+                    text = rows[-1][column]
+                else:
+                    text = DocParser.cell_text(cell)
+                values += [text] * span
+            rows.append(values)
+        return rows
+
+    @staticmethod
+    def table_to_markdown(rows: list[list[str]]) -> str:
+
+        if not rows:
+            return ""
+        width = max(len(row) for row in rows)
+        header = []
+        unnamed_counter = 0
+        for value in rows[0] + [""] * (width - len(rows[0])):
+            if value:
+                header.append(value)
+            else:
+                header.append(f"Без_названия_{unnamed_counter}")
+                unnamed_counter += 1
+
+        def to_line(values: list[str]) -> str:
+            cells = [value.replace("|", "\\|") for value in values]
+            cells += [""] * (width - len(cells))
+            return "| " + " | ".join(cells) + " |"
+
+        lines = [to_line(header), "|" + " --- |" * width]
+        lines += [to_line(row) for row in rows[1:]]
+        return "\n".join(lines)
@@ -0,0 +1,132 @@
+import zipfile
+from pathlib import Path
+from typing import IO, Iterator
+
+from lxml import etree
+
+from .base_parser import BaseParser, DocBlock
+from .doc_parser import DocParser
+
+TEXT = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+TABLE_NS = "{urn:oasis:names:tc:opendocument:xmlns:table:1.0}"
+PARAGRAPH = f"{TEXT}p"
+HEADING = f"{TEXT}h"
+LIST_ITEM = f"{TEXT}list-item"
+NOTE = f"{TEXT}note"
+OUTLINE_LEVEL = f"{TEXT}outline-level"
+TABLE = f"{TABLE_NS}table"
+ROW = f"{TABLE_NS}table-row"
+CELL = f"{TABLE_NS}table-cell"
+COVERED_CELL = f"{TABLE_NS}covered-table-cell"
+COLUMNS_REPEATED = f"{TABLE_NS}number-columns-repeated"
+COLUMNS_SPANNED = f"{TABLE_NS}number-columns-spanned"
+ROWS_REPEATED = f"{TABLE_NS}number-rows-repeated"
+# editors pad tables with huge repeat counts of empty cells and rows
+MAX_REPEAT = 256
+SPECIAL_TEXT = {f"{TEXT}tab": "\t", f"{TEXT}line-break": "\n"}
+
+
+class OdtParser(BaseParser):
+    """Streaming odt parser. Walks ``content.xml`` with lxml iterparse like
+    ``DocParser``, headings are taken from ``text:h`` outline levels, list
+    items from ``text:list-item`` and tables are rendered as markdown."""
+
+    suffixes = (".odt",)
+
+    @staticmethod
+    def iter_blocks(source: str | Path | IO[bytes]) -> Iterator[DocBlock]:
+
+        with zipfile.ZipFile(source) as archive, archive.open(
+            "content.xml"
+        ) as content_xml:
+            for _, element in etree.iterparse(
+                content_xml, events=("end",), tag=(PARAGRAPH, HEADING, TABLE)
+            ):
+                ancestors = {ancestor.tag for ancestor in element.iterancestors()}
+                # cell paragraphs and nested tables are handled with their
+                # table, footnotes are skipped
+                if CELL in ancestors or COVERED_CELL in ancestors or NOTE in ancestors:
+                    continue
+                if element.tag == TABLE:
+                    rows = OdtParser.table_rows(element)
+                    if rows:
+                        yield DocBlock(DocParser.table_to_markdown(rows), "table")
+                else:
+                    text = OdtParser.element_text(element)
+                    if text.strip() != "":
+                        heading_level = (
+                            int(element.get(OUTLINE_LEVEL, 1))
+                            if element.tag == HEADING
+                            else None
+                        )
+                        yield DocBlock(
+                            text,
+                            "text",
+                            heading_level,
+                            heading_level is None and LIST_ITEM in ancestors,
+                        )
+                parent = element.getparent()
+                element.clear()
+                while element.getprevious() is not None:
+                    del parent[0]
+
+    @staticmethod
+    def element_text(element: etree._Element) -> str:
+
+        parts = []
+
+        def walk(node: etree._Element) -> None:
+            if node.tag == f"{TEXT}s":
+                parts.append(" " * int(node.get(f"{TEXT}c", 1)))
+            elif node.tag in SPECIAL_TEXT:
+                parts.append(SPECIAL_TEXT[node.tag])
+            elif node.tag != NOTE:
+                parts.append(node.text or "")
+                for child in node:
+                    walk(child)
+                    parts.append(child.tail or "")
+
+        walk(element)
+        return "".join(parts)
+
+    @staticmethod
+    def cell_text(cell: etree._Element) -> str:
+
+        return " ".join(
+            text
+            for text in map(OdtParser.element_text, cell.iter(PARAGRAPH, HEADING))
+            if text
+        )
+
+    @staticmethod
+    def table_rows(table: etree._Element) -> list[list[str]]:
+        """Table as a grid of cell texts. Spanned cells are repeated in every
+        column they cover, cells covered from above repeat the value of the
+        cell in the previous row."""
+
+        rows = []
+        for row in table.iter(ROW):
+            if next(row.iterancestors(TABLE)) is not table:
+                continue
+            values = []
+            covered_by_span = 0
+            for cell in row:
+                repeat = min(int(cell.get(COLUMNS_REPEATED, 1)), MAX_REPEAT)
+                if cell.tag == CELL:
+                    span = int(cell.get(COLUMNS_SPANNED, 1))
+                    values += [OdtParser.cell_text(cell)] * span * repeat
+                    covered_by_span = span - 1
+                elif cell.tag == COVERED_CELL:
+                    for _ in range(repeat):
+                        if covered_by_span:
+                            covered_by_span -= 1
+                            continue
+                        column = len(values)
+                        values.append(
+                            rows[-1][column] if rows and column < len(rows[-1]) else ""
+                        )
+            while values and values[-1] == "":
+                values.pop()
+            if values:
+                rows += [values] * min(int(row.get(ROWS_REPEATED, 1)), MAX_REPEAT)
+        return rows
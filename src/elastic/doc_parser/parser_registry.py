@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from src.common.exceptions.http_exception import http_exception
+
+from .base_parser import BaseParser
+
+
+class ParserRegistry:
+    """Document parsers by file suffix."""
+
+    def __init__(self, default_suffix: str = ".docx"):
+
+        self.parsers: dict[str, type[BaseParser]] = {}
+        # files uploaded without a name are treated as docx, as before
+        self.default_suffix = default_suffix
+
+    def register(self, parser: type[BaseParser]) -> None:
+
+        for suffix in parser.suffixes:
+            self.parsers[suffix] = parser
+
+    @property
+    def suffixes(self) -> tuple[str, ...]:
+
+        return tuple(self.parsers)
+
+    def get(self, file_name: str | None) -> type[BaseParser]:
+
+        suffix = Path(file_name or "").suffix.lower() or self.default_suffix
+        if suffix not in self.parsers:
+            raise http_exception(
+                400,
+                "Unsupported document format",
+                _input={"file_name": file_name},
+                _detail={"supported_formats": list(self.parsers)},
+            )
+        return self.parsers[suffix]
@@ -0,0 +1,95 @@
+import re
+from pathlib import Path
+from typing import IO, Iterator
+
+from pypdf import PdfReader
+
+from .base_parser import BaseParser, DocBlock
+
+PAGE_NUMBER = re.compile(r"^[-–—\s]*\d{1,4}[-–—\s]*$")
+PARAGRAPH_END = re.compile(r"[.!?;:]$")
+
+
+class PdfParser(BaseParser):
+    """Parser for pdf documents with a text layer. Text is extracted page by
+    page and only the current paragraph is kept, paragraphs broken by a page
+    end are continued on the next page. Lines are joined into paragraphs up
+    to a line ending a sentence; headings are recognized by the document
+    outline. Tables are extracted as plain text. A bare number is dropped as
+    a page number only as the first or the last line of a page, so numeric
+    table cells are kept."""
+
+    suffixes = (".pdf",)
+
+    @staticmethod
+    def iter_blocks(source: str | Path | IO[bytes]) -> Iterator[DocBlock]:
+
+        if isinstance(source, (str, Path)):
+            with open(source, "rb") as f:
+                yield from PdfParser.iter_blocks(f)
+            return
+
+        reader = PdfReader(source)
+        headings = PdfParser.outline_levels(reader)
+        lines: list[str] = []
+        for page in reader.pages:
+            for line in PdfParser.page_lines(page.extract_text() or ""):
+                level = headings.get(line.lower())
+                if level is not None:
+                    if lines:
+                        yield DocBlock(PdfParser.join_lines(lines), "text")
+                        lines = []
+                    yield DocBlock(line, "text", heading_level=level)
+                    continue
+                lines.append(line)
+                if PARAGRAPH_END.search(line):
+                    yield DocBlock(PdfParser.join_lines(lines), "text")
+                    lines = []
+        if lines:
+            yield DocBlock(PdfParser.join_lines(lines), "text")
+
+    @staticmethod
+    def page_lines(text: str) -> list[str]:
+        """Non-empty whitespace-normalized lines of a page without the page
+        number in the header or footer."""
+
+        lines = [
+            line for line in (" ".join(i.split()) for i in text.splitlines()) if line
+        ]
+        if lines and PAGE_NUMBER.match(lines[-1]):
+            lines.pop()
+        if lines and PAGE_NUMBER.match(lines[0]):
+            lines.pop(0)
+        return lines
+
+    @staticmethod
+    def outline_levels(reader: PdfReader) -> dict[str, int]:
+        """Lowercased outline (bookmark) titles with their nesting level."""
+
+        levels = {}
+
+        def walk(items: list, level: int) -> None:
+            for item in items:
+                if isinstance(item, list):
+                    walk(item, level + 1)
+                elif getattr(item, "title", None):
+                    levels.setdefault(" ".join(item.title.split()).lower(), level)
+
+        try:
+            walk(reader.outline, 1)
+        except Exception:
+            # broken outlines are common and not worth failing the document
+            return {}
+        return levels
+
+    @staticmethod
+    def join_lines(lines: list[str]) -> str:
+        """Join lines of a paragraph, undoing hyphenation at line ends."""
+
+        text = lines[0]
+        for line in lines[1:]:
+            if text.endswith("-") and line[:1].islower():
+                text = text[:-1] + line
+            else:
+                text += " " + line
+        return text
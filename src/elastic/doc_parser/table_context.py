@@ -0,0 +1,34 @@
+from collections import deque
+from typing import Iterable, Iterator
+
+from .base_parser import DocBlock
+
+
+def attach_table_context(blocks: Iterable[DocBlock], size: int) -> Iterator[DocBlock]:
+    """Fill ``before`` and ``after`` of table blocks with the text of up to
+    ``size`` neighbouring blocks on each side, passing blocks through lazily.
+
+    Only ``size`` previous and ``size`` following blocks are buffered, so the
+    document is never materialized and every table costs ``O(size)``.
+    """
+
+    if size <= 0:
+        yield from blocks
+        return
+    behind: deque[DocBlock] = deque(maxlen=size)
+    ahead: deque[DocBlock] = deque()
+
+    def release() -> DocBlock:
+        block = ahead.popleft()
+        if block.kind == "table":
+            block.before = "\n".join(i.text for i in behind if i.kind == "text")
+            block.after = "\n".join(i.text for i in ahead if i.kind == "text")
+        behind.append(block)
+        return block
+
+    for block in blocks:
+        ahead.append(block)
+        if len(ahead) > size:
+            yield release()
+    while ahead:
+        yield release()
@@ -0,0 +1,55 @@
+import io
+import re
+from pathlib import Path
+from typing import IO, Iterator
+
+from .base_parser import BaseParser, DocBlock
+
+MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*$")
+LIST_ITEM = re.compile(r"^\s*([-*+•]|\d+[.)])\s+")
+TABLE_LINE = re.compile(r"^\s*\|")
+
+
+class TextParser(BaseParser):
+    """Parser for plain text and markdown files, read line by line.
+    Paragraphs are separated by blank lines, markdown ``#`` headings, list
+    items and ``|`` tables are recognized."""
+
+    suffixes = (".txt", ".md")
+
+    @staticmethod
+    def iter_blocks(source: str | Path | IO[bytes]) -> Iterator[DocBlock]:
+
+        if isinstance(source, (str, Path)):
+            with open(source, "rb") as f:
+                yield from TextParser.iter_blocks(f)
+            return
+
+        lines: list[str] = []
+        kind = "text"
+
+        def flush() -> Iterator[DocBlock]:
+            if lines:
+                text = "\n".join(lines) if kind == "table" else " ".join(lines)
+                yield DocBlock(text, kind)
+
+        for line in io.TextIOWrapper(source, encoding="utf-8-sig", errors="replace"):
+            line = line.rstrip()
+            heading = MARKDOWN_HEADING.match(line)
+            line_kind = "table" if TABLE_LINE.match(line) else "text"
+            if not line.strip() or heading or LIST_ITEM.match(line):
+                yield from flush()
+                lines = []
+            elif line_kind != kind:
+                yield from flush()
+                lines = []
+            kind = line_kind
+            if heading:
+                yield DocBlock(
+                    heading.group(2), "text", heading_level=len(heading.group(1))
+                )
+            elif LIST_ITEM.match(line):
+                yield DocBlock(line.strip(), "text", is_list=True)
+            elif line.strip():
+                lines.append(line.strip() if kind == "text" else line)
+        yield from flush()
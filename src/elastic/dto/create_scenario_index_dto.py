@@ -14,7 +14,7 @@ class CreateScenarioIndexDTO(BaseModel):
     def get_mode_index(self) -> str:
 
         match self.mode:
-            case "Анализ oбъекта":
+            case "Анализ объекта":
                 return "analyze"
             case "Анализ по объектам проекта":
                 return "analyze"
@@ -0,0 +1,98 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field, model_validator
+
+from src.common.exceptions.http_exception import http_exception
+
+
+class GeoFilterDTO(BaseModel):
+    """Area filter on scenario objects ``location``. Exactly one of ``bbox``,
+    ``polygon`` or ``point`` with ``radius`` should be set, coordinates are
+    in EPSG:4326 lon, lat order."""
+
+    bbox: list[float] | None = Field(
+        default=None,
+        min_length=4,
+        max_length=4,
+        examples=[[30.25, 59.9, 30.35, 59.95]],
+        description="Bounding box as [min_lon, min_lat, max_lon, max_lat]",
+    )
+    polygon: list[list[float]] | None = Field(
+        default=None,
+        examples=[[[30.25, 59.9], [30.35, 59.9], [30.3, 59.95]]],
+        description="Polygon ring as list of [lon, lat] points",
+    )
+    point: list[float] | None = Field(
+        default=None,
+        min_length=2,
+        max_length=2,
+        examples=[[30.3, 59.93]],
+        description="Circle center as [lon, lat], requires radius",
+    )
+    radius: float | None = Field(
+        default=None, gt=0, examples=[500], description="Circle radius in meters"
+    )
+    relation: Literal["intersects", "within"] = Field(
+        default="intersects",
+        examples=["intersects"],
+        description="Spatial relation of object geometry to the area",
+    )
+
+    @model_validator(mode="after")
+    def validate_shape(self):
+
+        shapes = [i for i in (self.bbox, self.polygon, self.point) if i is not None]
+        if len(shapes) != 1:
+            raise http_exception(
+                400,
+                "Geo filter should contain exactly one of bbox, polygon or point",
+                _input=self.model_dump(exclude_none=True),
+                _detail={"shapes_number": len(shapes)},
+            )
+        if self.point is not None and self.radius is None:
+            raise http_exception(
+                400,
+                "Point geo filter requires radius",
+                _input=self.model_dump(exclude_none=True),
+                _detail={"example": {"point": [30.3, 59.93], "radius": 500}},
+            )
+        if self.bbox is not None and (
+            self.bbox[0] > self.bbox[2] or self.bbox[1] > self.bbox[3]
+        ):
+            raise http_exception(
+                400,
+                "Bbox should be [min_lon, min_lat, max_lon, max_lat]",
+                _input=self.bbox,
+                _detail={"example": [30.25, 59.9, 30.35, 59.95]},
+            )
+        if self.polygon is not None:
+            if len(self.polygon) < 3 or any(len(i) != 2 for i in self.polygon):
+                raise http_exception(
+                    400,
+                    "Polygon should contain at least 3 [lon, lat] points",
+                    _input=self.polygon,
+                    _detail={"points_number": len(self.polygon)},
+                )
+            if self.polygon[0] != self.polygon[-1]:
+                self.polygon.append(self.polygon[0])
+        return self
+
+    def to_query(self, field: str = "location") -> dict:
+        """Elasticsearch query clause for the filter."""
+
+        if self.point is not None:
+            return {
+                "geo_distance": {
+                    "distance": f"{self.radius}m",
+                    field: {"lon": self.point[0], "lat": self.point[1]},
+                }
+            }
+        if self.bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = self.bbox
+            shape = {
+                "type": "envelope",
+                "coordinates": [[min_lon, max_lat], [max_lon, min_lat]],
+            }
+        else:
+            shape = {"type": "polygon", "coordinates": [self.polygon]}
+        return {"geo_shape": {field: {"shape": shape, "relation": self.relation}}}
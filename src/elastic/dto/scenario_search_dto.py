@@ -2,7 +2,10 @@ from typing import Literal
 
 from pydantic import Field
 
+from src.common.exceptions.http_exception import http_exception
+
 from .elastic_search_dto import ElasticSearchDTO
+from .geo_filter_dto import GeoFilterDTO
 
 
 class ScenarioSearchDTO(ElasticSearchDTO):
@@ -17,11 +20,30 @@ class ScenarioSearchDTO(ElasticSearchDTO):
         examples=[1474596],
         description="Object ID from Scenario to retrieve data on",
     )
+    bbox: str | None = Field(
+        default=None,
+        examples=["30.25,59.9,30.35,59.95"],
+        description="Area filter bbox as 'min_lon,min_lat,max_lon,max_lat'",
+    )
+    polygon: str | None = Field(
+        default=None,
+        examples=["30.25 59.9,30.35 59.9,30.3 59.95"],
+        description="Area filter polygon as comma separated 'lon lat' points",
+    )
+    lon: float | None = Field(
+        default=None, examples=[30.3], description="Area filter circle center lon"
+    )
+    lat: float | None = Field(
+        default=None, examples=[59.93], description="Area filter circle center lat"
+    )
+    radius: float | None = Field(
+        default=None, examples=[500], description="Area filter circle radius in meters"
+    )
 
     def get_mode_index(self) -> str:
 
         match self.mode:
-            case "Анализ oбъекта":
+            case "Анализ объекта":
                 return "analyze"
             case "Анализ по объектам проекта":
                 return "analyze"
@@ -33,3 +55,50 @@ class ScenarioSearchDTO(ElasticSearchDTO):
     def get_index_name(self, scenario_id: int) -> str:
 
         return f"{scenario_id}&{self.get_mode_index()}"
+
+    def get_geo_filter(self) -> dict | None:
+
+        if not (
+            self.bbox
+            or self.polygon
+            or self.lon is not None
+            or self.lat is not None
+            or self.radius
+        ):
+            return None
+        # general mode indexes have no ``location`` field to filter on
+        if self.get_mode_index() != "analyze":
+            raise http_exception(
+                400,
+                "Geo filter is available only for objects analyses modes",
+                _input={"mode": self.mode},
+                _detail={
+                    "available_modes": ["Анализ объекта", "Анализ по объектам проекта"]
+                },
+            )
+        if (self.lon is None) != (self.lat is None):
+            raise http_exception(
+                400,
+                "Geo filter circle center requires both lon and lat",
+                _input={"lon": self.lon, "lat": self.lat},
+                _detail={"example": {"lon": 30.3, "lat": 59.93, "radius": 500}},
+            )
+        try:
+            geo_filter = GeoFilterDTO(
+                bbox=[float(i) for i in self.bbox.split(",")] if self.bbox else None,
+                polygon=(
+                    [[float(j) for j in i.split()] for i in self.polygon.split(",")]
+                    if self.polygon
+                    else None
+                ),
+                point=[self.lon, self.lat] if self.lon is not None else None,
+                radius=self.radius,
+            )
+        except ValueError as e:
+            raise http_exception(
+                400,
+                "Failed to parse geo filter",
+                _input={"bbox": self.bbox, "polygon": self.polygon},
+                _detail={"error": repr(e)},
+            )
+        return geo_filter.to_query()
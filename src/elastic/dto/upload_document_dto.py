@@ -18,6 +18,23 @@ class UploadDocumentDTO(BaseModel):
     table_questions_num: int = Field(
         default=10, examples=[10], description="number of questions for table"
     )
+    chunk_size: int = Field(
+        default=512,
+        examples=[512],
+        description="max size of text chunk in tokens, short paragraphs of one "
+        "section are merged up to this size",
+    )
+    chunk_overlap: int = Field(
+        default=64,
+        examples=[64],
+        description="number of tokens repeated from the previous chunk",
+    )
+    rebuild: bool = Field(
+        default=False,
+        examples=[False],
+        description="replace index content with the document, the new index "
+        "version becomes searchable only when the upload is finished",
+    )
 
     @field_validator("index_name", mode="before")
     @classmethod
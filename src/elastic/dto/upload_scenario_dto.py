@@ -1,6 +1,8 @@
 from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+from src.common.exceptions.http_exception import http_exception
 
 
 class UploadScenarioDTO(BaseModel):
@@ -12,11 +14,35 @@ class UploadScenarioDTO(BaseModel):
         "Анализ объекта", "Анализ территории проекта", "Анализ по объектам проекта"
     ] = Field(examples=["Анализ территории проекта"], description="Index mode type")
     data: list[dict] = Field(description="Data to load to index from Urban API")
+    question_mode: Literal["llm", "template"] = Field(
+        default="llm",
+        examples=["template"],
+        description="Generate object questions with LLM or from templates on object "
+        "properties, templates are available for objects analyses modes only",
+    )
+    rebuild: bool = Field(
+        default=False,
+        examples=[True],
+        description="Replace index content with the data, the new index version "
+        "becomes searchable only when the upload is finished",
+    )
+
+    @model_validator(mode="after")
+    def validate_question_mode(self):
+
+        if self.question_mode == "template" and self.get_mode_index() != "analyze":
+            raise http_exception(
+                400,
+                "Template questions are available only for objects analyses modes",
+                _input={"mode": self.mode, "question_mode": self.question_mode},
+                _detail={"available_question_modes": ["llm"]},
+            )
+        return self
 
     def get_mode_index(self) -> str:
 
         match self.mode:
-            case "Анализ oбъекта":
+            case "Анализ объекта":
                 return "analyze"
             case "Анализ по объектам проекта":
                 return "analyze"
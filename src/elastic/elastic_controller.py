@@ -1,19 +1,25 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Body, Depends, Query, UploadFile
-from telebot.apihelper import answer_web_app_query
 
 from src.common.constants.index_mapper import TEST_TRANSPORT_INDEX
-from src.dependencies import config, elastic_client
+from src.dependencies import (
+    ConfigDep,
+    ElasticServiceDep,
+    LayerEncoderDep,
+    LlmServiceDep,
+    RerankerDep,
+    VectorizerServiceDep,
+)
 from src.elastic.dto.create_scenario_index_dto import CreateScenarioIndexDTO
 from src.elastic.dto.elastic_search_dto import ElasticSearchDTO
 from src.elastic.dto.scenario_search_dto import ScenarioSearchDTO
 from src.elastic.dto.upload_document_dto import UploadDocumentDTO
-from src.elastic.dto.upload_test_index_dto import UploadTestIndexDTO
 from src.elastic.dto.upload_scenario_dto import (
     UploadCustomScenarioDTO,
     UploadScenarioDTO,
 )
+from src.elastic.dto.upload_test_index_dto import UploadTestIndexDTO
 
 elastic_router = APIRouter()
 tag = ["LLM Controller"]
@@ -21,12 +27,12 @@ cfg_tag = ["Config Controller"]
 
 
 @elastic_router.get("/llm/indexes", tags=tag)
-async def get_available_indexes():
+async def get_available_indexes(elastic_client: ElasticServiceDep):
     return await elastic_client.get_available_indexes()
 
 
 @elastic_router.post("/llm/indexes", tags=tag)
-async def create_index(index_name: str, en: str):
+async def create_index(index_name: str, en: str, elastic_client: ElasticServiceDep):
     return await elastic_client.create_index(index_name, en)
 
 
@@ -34,19 +40,20 @@ async def create_index(index_name: str, en: str):
 async def create_scenario_index(
     scenario_id: int,
     dto: Annotated[CreateScenarioIndexDTO, Depends(CreateScenarioIndexDTO)],
+    elastic_client: ElasticServiceDep,
 ):
 
     return await elastic_client.create_scenario_index(dto.get_index_name(scenario_id))
 
 
 @elastic_router.get("/llm/all_indexes_eng", tags=tag)
-async def get_all_indexes():
+async def get_all_indexes(elastic_client: ElasticServiceDep):
 
     return await elastic_client.get_all_indexes()
 
 
 @elastic_router.get("/llm/scenario/indexes/{scenario_id}", tags=tag)
-async def get_scenario_indexes(scenario_id: int):
+async def get_scenario_indexes(scenario_id: int, elastic_client: ElasticServiceDep):
 
     return await elastic_client.get_available_scenario_indexes(scenario_id)
 
@@ -58,13 +65,14 @@ async def get_scenario_modes() -> list[str]:
 
 
 @elastic_router.put("/llm/index_map", tags=tag)
-async def update_index_map(map: dict[str, str]):
+async def update_index_map(map: dict[str, str], elastic_client: ElasticServiceDep):
     return await elastic_client.update_index_mapping(map)
 
 
 @elastic_router.post("/llm/scenario/custom_scenario/data", tags=tag)
 async def upload_custom_scenario_data_to_index(
     dto: Annotated[UploadCustomScenarioDTO, Depends(UploadCustomScenarioDTO)],
+    elastic_client: ElasticServiceDep,
 ):
 
     res = await elastic_client.upload_common_scenario(dto.index_en_name, dto.data)
@@ -75,22 +83,31 @@ async def upload_custom_scenario_data_to_index(
 @elastic_router.post("/llm/scenario/upload_data", tags=tag)
 async def upload_data_to_scenario_index(
     dto: Annotated[UploadScenarioDTO, Depends(UploadScenarioDTO)],
+    elastic_client: ElasticServiceDep,
 ):
 
     if dto.mode == "Анализ территории проекта":
         return await elastic_client.upload_common_scenario(
-            f"{dto.scenario_id}&{dto.get_mode_index()}", dto.data
+            f"{dto.scenario_id}&{dto.get_mode_index()}", dto.data, rebuild=dto.rebuild
         )
     else:
         return await elastic_client.upload_analyze_scenario(
-            f"{dto.scenario_id}&{dto.get_mode_index()}", dto.data
+            f"{dto.scenario_id}&{dto.get_mode_index()}",
+            dto.data,
+            question_mode=dto.question_mode,
+            rebuild=dto.rebuild,
         )
 
 
 @elastic_router.post("/llm/upload_document", tags=tag)
 async def upload_document(
-    file: UploadFile, dto: Annotated[UploadDocumentDTO, Depends(UploadDocumentDTO)]
+    file: UploadFile,
+    dto: Annotated[UploadDocumentDTO, Depends(UploadDocumentDTO)],
+    elastic_client: ElasticServiceDep,
 ):
+    """Upload docx, pdf (with text layer), odt, txt or md document, the
+    format is taken from the file name."""
+
     return await elastic_client.upload_to_index(
         await file.read(),
         dto.doc_name,
@@ -98,6 +115,10 @@ async def upload_document(
         dto.table_context_size,
         dto.text_questions_num,
         dto.table_questions_num,
+        dto.chunk_size,
+        dto.chunk_overlap,
+        file.filename,
+        dto.rebuild,
     )
 
 
@@ -106,6 +127,7 @@ async def load_test_transport_index(
     docx_file: UploadFile,
     geojson_file: UploadFile,
     dto: Annotated[UploadTestIndexDTO, Depends(UploadTestIndexDTO)],
+    elastic_client: ElasticServiceDep,
 ):
     """Load the test transport docx and geojson isochrone layer into the
     dedicated ``test_transport`` index (scenario-style RAG that can return the
@@ -121,45 +143,90 @@ async def load_test_transport_index(
         dto.text_questions_num,
         dto.table_questions_num,
         dto.geojson_questions_num,
+        dto.chunk_size,
+        dto.chunk_overlap,
+        docx_file.filename,
     )
     return res
 
 
 @elastic_router.delete("/llm/delete_documents/{index_name}", tags=tag)
-async def delete_document(index_name: str):
-    return await elastic_client.delete_documents_from_index(index_name)
+async def delete_document(
+    index_name: str,
+    elastic_client: ElasticServiceDep,
+    layer_encoder: LayerEncoderDep,
+):
+    result = await elastic_client.delete_documents_from_index(index_name)
+    layer_encoder.invalidate(index_name)
+    return result
 
 
 @elastic_router.delete("/llm/delete_index/{index_name}", tags=tag)
-async def delete_documents(index_name: str):
-    return await elastic_client.delete_index(index_name)
+async def delete_documents(
+    index_name: str,
+    elastic_client: ElasticServiceDep,
+    layer_encoder: LayerEncoderDep,
+):
+    result = await elastic_client.delete_index(index_name)
+    layer_encoder.invalidate(index_name)
+    return result
 
 
 @elastic_router.get("/llm/search", tags=tag)
-async def search(dto: Annotated[ElasticSearchDTO, Depends(ElasticSearchDTO)]):
-    return await elastic_client.search(elastic_client.encode(dto.prompt))
+async def search(
+    dto: Annotated[ElasticSearchDTO, Depends(ElasticSearchDTO)],
+    elastic_client: ElasticServiceDep,
+):
+    return await elastic_client.search(await elastic_client.encode(dto.prompt))
 
 
 @elastic_router.get("/llm/search/scenario/{scenario_id}")
 async def search_scenario(
-    scenario_id: int, dto: Annotated[ScenarioSearchDTO, Depends(ScenarioSearchDTO)]
+    scenario_id: int,
+    dto: Annotated[ScenarioSearchDTO, Depends(ScenarioSearchDTO)],
+    elastic_client: ElasticServiceDep,
 ):
 
+    # invalid filters are rejected before the prompt is embedded
+    geo_filter = dto.get_geo_filter()
     return await elastic_client.search_scenario(
-        elastic_client.encode(dto.prompt),
+        await elastic_client.encode(dto.prompt),
         dto.get_index_name(scenario_id),
         dto.object_id,
+        geo_filter,
     )
 
 
+@elastic_router.get("/llm/geometry/{index_name}/{doc_id}", tags=tag)
+async def get_source_geometry(
+    index_name: str, doc_id: str, elastic_client: ElasticServiceDep
+):
+    """Original (not simplified) geometry for a feature or layer sent to the
+    map, ids are taken from the FeatureCollection ``source`` and feature
+    ``id``."""
+
+    return await elastic_client.get_source_geometry(index_name, doc_id)
+
+
 @elastic_router.put("/cfg/configure", tags=cfg_tag)
 async def configure(
     body: Annotated[dict, Body()],
+    config: ConfigDep,
 ):
     for k, v in body.items():
         config.set(k, v)
 
 
 @elastic_router.get("/cfg", tags=cfg_tag)
-async def get_env(key: Annotated[str, Query()]):
+async def get_env(key: Annotated[str, Query()], config: ConfigDep):
     return config.get(key)
+
+
+@elastic_router.get("/cfg/backends", tags=cfg_tag)
+async def get_backends_status(
+    llm_service: LlmServiceDep, model: VectorizerServiceDep, reranker: RerankerDep
+):
+    backends = {"llm": llm_service.pool.status(), "vectorizer": model.pool.status()}
+    if reranker is not None:
+        backends["reranker"] = reranker.pool.status()
+    return backends
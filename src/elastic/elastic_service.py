@@ -1,21 +1,33 @@
+import asyncio
 import io
 import json
+from typing import IO, TYPE_CHECKING, Awaitable, Callable, Iterator, TypeVar
 
-from docx import Document
 from elastic_transport import ObjectApiResponse
-from elasticsearch import Elasticsearch
-from elasticsearch.helpers import BulkIndexError, bulk
+from elasticsearch import Elasticsearch, NotFoundError
+from elasticsearch.helpers import bulk
 from fastapi import HTTPException
 from loguru import logger
-from tqdm import tqdm
 
-from src.common.config.config import Config
+from src.common.config.config import Config, get_optional
 from src.common.constants.index_mapper import TEST_TRANSPORT_INDEX
-from src.dependencies import http_exception
+from src.common.exceptions.http_exception import http_exception
+from src.common.exceptions.upstream_unavailable_error import UpstreamUnavailableError
 from src.llm.llm_service import LlmService
 from src.vectorizer.vectorizer_service import VectorizerService
 
-from .doc_parser import doc_parser
+from .index_mapper_store import IndexMapperStore
+from .index_registry import SCENARIO_INDEX_PATTERN, IndexRegistry
+from .index_versions import IndexVersionManager
+
+if TYPE_CHECKING:
+    # document parsers (pypdf, lxml) are imported on first upload, numpy and
+    # shapely with the local vector index or on first scenario upload
+    from .doc_parser import Chunk
+    from .local_vector_index import LocalVectorIndex
+    from .scenario_ingest_pipeline import ScenarioIngestPipeline
+
+T = TypeVar("T")
 
 
 class ElasticService:
@@ -26,8 +38,9 @@ class ElasticService:
         llm_service: LlmService,
         index_mapper: dict[str, str],
         reverse_index_mapper: dict[str, str],
+        client: Elasticsearch | None = None,
     ):
-        self.client = Elasticsearch(
+        self.client = client or Elasticsearch(
             hosts=[f"http://{config.get('ELASTIC_HOST')}:{config.get('ELASTIC_PORT')}"]
         )
         self.config = config
@@ -35,27 +48,91 @@ class ElasticService:
         self.llm_service = llm_service
         self.index_mapper = index_mapper
         self.reverse_index_mapper = reverse_index_mapper
+        self.index_mapper_store = IndexMapperStore(
+            self.client,
+            index_mapper,
+            reverse_index_mapper,
+            float(get_optional(config, "INDEX_MAPPER_REFRESH_INTERVAL") or 10),
+        )
+        self.index_registry = IndexRegistry(
+            self.client,
+            float(get_optional(config, "ELASTIC_INDEX_REFRESH_INTERVAL") or 60),
+        )
+        self.index_versions = IndexVersionManager(
+            self.client, int(get_optional(config, "ELASTIC_KEEP_VERSIONS") or 0)
+        )
+        self._scenario_pipeline: "ScenarioIngestPipeline | None" = None
+        self.local_index: "LocalVectorIndex | None" = None
+        if (get_optional(config, "LOCAL_VECTOR_INDEX") or "").lower() == "true":
+            from .local_vector_index import LocalVectorIndex
+
+            self.local_index = LocalVectorIndex.from_config(config, self.client)
+        # searches per msearch request, large batches are split into several
+        self.msearch_size = int(get_optional(config, "ELASTIC_MSEARCH_SIZE") or 100)
+
+    @property
+    def scenario_pipeline(self) -> "ScenarioIngestPipeline":
+        """Scenario ingestion pipeline, built on the first scenario upload."""
+
+        if self._scenario_pipeline is None:
+            from .scenario_ingest_pipeline import ScenarioIngestPipeline
+
+            self._scenario_pipeline = ScenarioIngestPipeline.from_config(
+                self.config, self.client, self.llm_service, self.vectorizer_service
+            )
+        return self._scenario_pipeline
 
     async def check_indexes(self):
+        # independent requests, run concurrently to shorten worker startup
+        await asyncio.gather(
+            asyncio.to_thread(self.index_mapper_store.load),
+            asyncio.to_thread(self.index_registry.refresh),
+        )
         for index in self.index_mapper.keys():
-            if not self.client.indices.exists(index=index):
+            if not self.index_registry.exists_live(index):
                 if index == TEST_TRANSPORT_INDEX:
                     await self.create_test_index(index)
                 else:
                     await self.create_index(self.index_mapper[index], index)
 
     async def update_index_mapper(self, en: str, ru: str):
-        self.index_mapper[en] = ru
-        self.reverse_index_mapper[ru] = en
+        self.index_mapper_store.update({en: ru})
+
+    async def resolve_index_name(self, value: str) -> str:
+        """Elastic index name of a request index, as mapped by the request
+        validator. Names unknown to the local mapper could be added by another
+        worker since the last mapper refresh, the mapper is refreshed once
+        before they are rejected."""
+
+        if value in self.index_mapper:
+            return value
+        if name := self.reverse_index_mapper.get(value):
+            return name
+        if await asyncio.to_thread(self.index_mapper_store.refresh):
+            if name := self.reverse_index_mapper.get(value):
+                return name
+        raise http_exception(
+            400,
+            "No matching elastic index found",
+            _input=value,
+            _detail={"available_indexes": list(self.reverse_index_mapper.keys())},
+        )
+
+    async def resolve_federated_indexes(self, values: list[str]) -> list[str]:
+        """Elastic index names for federated search, scenario index names are
+        taken as is."""
+
+        names = []
+        for value in values:
+            if not SCENARIO_INDEX_PATTERN.match(value):
+                value = await self.resolve_index_name(value)
+            if value not in names:
+                names.append(value)
+        return names
 
     async def get_all_indexes(self) -> list[str]:
 
-        all_indices = self.client.indices.get_alias(index="*")
-        return [
-            index
-            for index in all_indices
-            if not index.startswith(".") and not index.startswith("_")
-        ]
+        return self.index_registry.get_indexes()
 
     async def get_available_indexes(self) -> list[str]:
 
@@ -70,17 +147,15 @@ class ElasticService:
 
     async def get_available_scenario_indexes(self, scenario_id: int) -> list[str]:
 
-        index_list = await self.get_all_indexes()
-        return [i for i in index_list if str(scenario_id) in i]
+        return self.index_registry.get_scenario_indexes(scenario_id)
 
     async def update_index_mapping(
         self,
         index_map: dict[str, str],
     ) -> str:
 
-        # ToDo Add mapping
         try:
-            self.index_mapper.update(index_map)
+            self.index_mapper_store.update(index_map)
             return "Index mapper updated."
         except Exception as e:
             logger.error(e)
@@ -93,6 +168,33 @@ class ElasticService:
                 },
             )
 
+    @staticmethod
+    def get_index_body() -> dict:
+
+        return {
+            "mappings": {
+                "properties": {
+                    "body_vector": {
+                        "type": "dense_vector",
+                        "dims": 4096,
+                        "index": True,
+                        "similarity": "cosine",
+                    },
+                    "body": {"type": "text"},
+                    "num_id": {"type": "long"},
+                    "doc_name": {
+                        "type": "text",
+                        "fields": {
+                            "keywords": {
+                                "type": "keyword",
+                            }
+                        },
+                    },
+                    "heading_path": {"type": "keyword"},
+                }
+            }
+        }
+
     async def create_index(self, index_name: str, en: str):
 
         if self.client.indices.exists(index=en):
@@ -104,35 +206,12 @@ class ElasticService:
             )
 
         try:
-            resp = self.client.indices.create(
-                index=en,
-                body={
-                    "mappings": {
-                        "properties": {
-                            "body_vector": {
-                                "type": "dense_vector",
-                                "dims": 4096,
-                                "index": True,
-                                "similarity": "cosine",
-                            },
-                            "body": {"type": "text"},
-                            "num_id": {"type": "long"},
-                            "doc_name": {
-                                "type": "text",
-                                "fields": {
-                                    "keywords": {
-                                        "type": "keyword",
-                                    }
-                                },
-                            },
-                        }
-                    }
-                },
-            )
+            version_index = self.index_versions.create(en, self.get_index_body())
+            self.index_registry.refresh()
 
-            self.index_mapper[en] = index_name
+            self.index_mapper_store.update({en: index_name})
 
-            return resp.raw
+            return {"acknowledged": True, "index": en, "version_index": version_index}
 
         except Exception as e:
             raise http_exception(
@@ -142,15 +221,9 @@ class ElasticService:
                 _detail={"error": e.__str__()},
             )
 
-    async def create_scenario_index(self, index_name: str):
+    @staticmethod
+    def get_scenario_index_body(index_name: str) -> dict:
 
-        if self.client.indices.exists(index=index_name):
-            raise http_exception(
-                400,
-                "Index already exists.",
-                _input={"index": index_name},
-                _detail={"existing)_indexes": list(self.index_mapper.keys())},
-            )
         body = {
             "mappings": {
                 "properties": {
@@ -176,15 +249,30 @@ class ElasticService:
                     "properties": {"type": "object", "enabled": True},
                 }
             )
+        return body
+
+    async def create_scenario_index(self, index_name: str):
+
+        if self.client.indices.exists(index=index_name):
+            raise http_exception(
+                400,
+                "Index already exists.",
+                _input={"index": index_name},
+                _detail={"existing)_indexes": list(self.index_mapper.keys())},
+            )
 
         try:
 
-            resp = self.client.indices.create(
-                index=index_name,
-                body=body,
+            version_index = self.index_versions.create(
+                index_name, self.get_scenario_index_body(index_name)
             )
+            self.index_registry.refresh()
 
-            return resp.raw
+            return {
+                "acknowledged": True,
+                "index": index_name,
+                "version_index": version_index,
+            }
 
         except Exception as e:
             raise http_exception(
@@ -194,20 +282,14 @@ class ElasticService:
                 _detail={"error": repr(e)},
             )
 
-    async def create_test_index(self, index_name: str):
-        """Create the test index that stores docx text chunks alongside an
-        optional geojson layer (``feature_collection``). The layer is kept in
-        ``_source`` only (``enabled: False``) so a large FeatureCollection does
-        not trigger a mapping explosion."""
+    @staticmethod
+    def get_test_index_body() -> dict:
+        """Test index stores docx text chunks alongside an optional geojson
+        layer (``feature_collection``). The layer is kept in ``_source`` only
+        (``enabled: False``) so a large FeatureCollection does not trigger a
+        mapping explosion."""
 
-        if self.client.indices.exists(index=index_name):
-            raise http_exception(
-                400,
-                "Index already exists.",
-                _input={"index": index_name},
-                _detail={"existing_indexes": list(self.index_mapper.keys())},
-            )
-        body = {
+        return {
             "mappings": {
                 "properties": {
                     "body_vector": {
@@ -222,13 +304,31 @@ class ElasticService:
                         "type": "text",
                         "fields": {"keywords": {"type": "keyword"}},
                     },
+                    "heading_path": {"type": "keyword"},
                     "feature_collection": {"type": "object", "enabled": False},
                 }
             }
         }
+
+    async def create_test_index(self, index_name: str):
+
+        if self.client.indices.exists(index=index_name):
+            raise http_exception(
+                400,
+                "Index already exists.",
+                _input={"index": index_name},
+                _detail={"existing_indexes": list(self.index_mapper.keys())},
+            )
         try:
-            resp = self.client.indices.create(index=index_name, body=body)
-            return resp.raw
+            version_index = self.index_versions.create(
+                index_name, self.get_test_index_body()
+            )
+            self.index_registry.refresh()
+            return {
+                "acknowledged": True,
+                "index": index_name,
+                "version_index": version_index,
+            }
         except Exception as e:
             raise http_exception(
                 500,
@@ -248,11 +348,15 @@ class ElasticService:
         text_questions_num: int,
         table_questions_num: int,
         geojson_questions_num: int,
+        chunk_size: int = 512,
+        chunk_overlap: int = 64,
+        docx_file_name: str | None = None,
     ):
-        """Load a docx document (plain text/table chunks) and a geojson layer
-        (chunks carrying the whole FeatureCollection) into the test index."""
+        """Load a document (plain text/table chunks, docx or any other format
+        by ``docx_file_name`` suffix) and a geojson layer (chunks carrying the
+        whole FeatureCollection) into the test index."""
 
-        if not self.client.indices.exists(index=index_name):
+        if not self.index_registry.exists_live(index_name):
             await self.create_test_index(index_name)
 
         documents = []
@@ -261,45 +365,34 @@ class ElasticService:
             f"Started uploading test transport data to index {index_name} from id {last_id}"
         )
 
+        from tqdm import tqdm
+
         # --- docx: plain text/table chunks, no feature_collection ---
-        full_doc = Document(io.BytesIO(docx_file))
-        dock_blocks = [i for i in doc_parser.iter_contexts_for_vectorization(full_doc)]
-        for index, entity in tqdm(
-            enumerate(dock_blocks), total=len(dock_blocks), desc="Processing docx"
-        ):
-            if entity[1] == "text":
+        chunks = self.chunk_document(
+            io.BytesIO(docx_file),
+            docx_file_name,
+            table_context_size,
+            chunk_size,
+            chunk_overlap,
+        )
+        for chunk in tqdm(chunks, desc="Processing docx"):
+            if chunk.kind == "text":
                 docs, last_id = await self.create_paragraph_to_upload(
-                    entity[0], text_questions_num, last_id, doc_name
+                    chunk.body,
+                    text_questions_num,
+                    last_id,
+                    doc_name,
+                    chunk.heading_path,
                 )
-                documents += docs
-            elif entity[1] == "table":
-                try:
-                    table_with_context = (
-                        "\n".join(
-                            [
-                                i[0]
-                                for i in dock_blocks[
-                                    max(index - table_context_size, 0) : index
-                                ]
-                                if i[1] == "text"
-                            ]
-                        ),
-                        entity[0],
-                        "\n".join(
-                            [
-                                i[0]
-                                for i in dock_blocks[index : index + table_context_size]
-                                if i[1] == "text"
-                            ]
-                        ),
-                    )
-                except Exception as e:
-                    logger.exception(e)
-                    raise HTTPException(status_code=500, detail=e.__str__())
+            else:
                 docs, last_id = await self.create_table_to_upload(
-                    table_with_context, table_questions_num, last_id, doc_name
+                    (chunk.before, chunk.text, chunk.after),
+                    table_questions_num,
+                    last_id,
+                    doc_name,
+                    chunk.heading_path,
                 )
-                documents += docs
+            documents += docs
 
         # --- geojson: description chunks carrying the whole FeatureCollection ---
         feature_collection = json.loads(geojson_file)
@@ -315,7 +408,7 @@ class ElasticService:
                     "_id": str(last_id),
                     "num_id": last_id,
                     "body": layer_description,
-                    "body_vector": self.encode(question),
+                    "body_vector": await self.encode(question),
                     "doc_name": doc_name,
                     "feature_collection": feature_collection,
                 }
@@ -323,14 +416,13 @@ class ElasticService:
 
         if documents:
             bulk(self.client, documents, index=index_name, request_timeout=1200)
+            self.invalidate_local(index_name)
             logger.info(
                 f"Uploaded {len(documents)} docs to test transport index {index_name}"
             )
         return index_name
 
-    async def search_test(
-        self, embedding: list, index_name: str
-    ) -> list[dict]:
+    async def search_test(self, embedding: list, index_name: str) -> list[dict]:
         """kNN search over the test index returning body text and, where
         present, the attached geojson layer."""
 
@@ -343,14 +435,14 @@ class ElasticService:
             },
             "_source": ["body", "feature_collection"],
         }
-        response = self.client.search(index=index_name, body=query_body)
+        response = self.run_search(index_name, query_body)
         return response["hits"]["hits"]
 
     async def delete_index(self, index_name: str):
 
-        resp = self.client.options(ignore_status=[400, 404]).indices.delete(
-            index=index_name
-        )
+        resp = self.index_versions.delete(index_name)
+        self.index_registry.refresh()
+        self.invalidate_local(index_name)
         return resp.raw
 
     async def delete_documents_from_index(self, index_name: str) -> str:
@@ -358,19 +450,30 @@ class ElasticService:
             self.client.delete_by_query(
                 index=index_name, body={"query": {"match_all": {}}}
             )
+            self.invalidate_local(index_name)
             return f"Successfully deleted all documents from index {index_name}"
         except Exception as e:
             logger.exception(e)
             raise HTTPException(status_code=500, detail=e.__str__())
 
-    async def search(
-        self, embedding: list, index_name: str | None = None
-    ) -> ObjectApiResponse:
+    def run_search(self, index_name: str, body: dict) -> ObjectApiResponse | dict:
+        """Search in the local vector index when it can answer the query,
+        in elastic otherwise."""
 
-        if index_name is None:
-            index_name = self.config.get("ELASTIC_DOCUMENT_INDEX")
+        if self.local_index is not None:
+            response = self.local_index.search(index_name, body)
+            if response is not None:
+                return response
+        return self.client.search(index=index_name, body=body)
 
-        query_body = {
+    def invalidate_local(self, index_name: str) -> None:
+
+        if self.local_index is not None:
+            self.local_index.invalidate(index_name)
+
+    def get_search_body(self, embedding: list) -> dict:
+
+        return {
             "knn": {
                 "field": "body_vector",
                 "query_vector": embedding,
@@ -380,150 +483,313 @@ class ElasticService:
             "_source": ["body"],
             "min_score": float(self.config.get("MIN_SCORE")),
         }
-        return self.client.search(index=index_name, body=query_body)
 
-    async def search_scenario(
-        self, embedding: list, index_name: str, object_id_value: int | None
-    ) -> list[str]:
+    def get_scenario_search_body(
+        self,
+        embedding: list,
+        object_id_value: int | None = None,
+        geo_filter: dict | None = None,
+    ) -> dict:
+        """Scenario index query by object id or by kNN. ``geo_filter`` is an
+        elastic query clause on ``location`` applied as kNN pre-filter, so
+        only objects in the area are scored. Hits are returned without
+        ``body_vector``."""
 
         if object_id_value is not None:
-            query_body = {"query": {"term": {"object_id": object_id_value}}}
-        else:
-            query_body = {
-                "knn": {
-                    "field": "body_vector",
-                    "query_vector": embedding,
-                    "k": int(self.config.get("SCENARIO_K")),
-                    "num_candidates": int(self.config.get("SCENARIO_NUM_K")),
-                },
-            }
+            query = {"term": {"object_id": object_id_value}}
+            if geo_filter is not None:
+                query = {"bool": {"filter": [query, geo_filter]}}
+            return {"query": query, "_source": {"excludes": ["body_vector"]}}
+        query_body = {
+            "knn": {
+                "field": "body_vector",
+                "query_vector": embedding,
+                "k": int(self.config.get("SCENARIO_K")),
+                "num_candidates": int(self.config.get("SCENARIO_NUM_K")),
+            },
+            "_source": {"excludes": ["body_vector"]},
+        }
+        if geo_filter is not None:
+            query_body["knn"]["filter"] = geo_filter
+        return query_body
+
+    async def search(
+        self, embedding: list, index_name: str | None = None
+    ) -> ObjectApiResponse | dict:
+
+        if index_name is None:
+            index_name = self.config.get("ELASTIC_DOCUMENT_INDEX")
+
+        return self.run_search(index_name, self.get_search_body(embedding))
 
-        response = self.client.search(index=index_name, body=query_body)
+    async def search_scenario(
+        self,
+        embedding: list,
+        index_name: str,
+        object_id_value: int | None,
+        geo_filter: dict | None = None,
+    ) -> list[str]:
+
+        response = self.run_search(
+            index_name,
+            self.get_scenario_search_body(embedding, object_id_value, geo_filter),
+        )
         response_list = []
         for i in response["hits"]["hits"]:
             if i not in response_list:
                 response_list.append(i)
         return response_list
 
-    @staticmethod
-    async def create_analyze_scenario_row_to_upload(
-        index_name: str,
-        text: str,
-        doc_id: int,
-        object_id: int,
-        vector: list,
-        location: dict,
-        properties: dict,
-    ):
-
-        return {
-            "_op_type": "index",
-            "_index": index_name,
-            "_id": str(doc_id),
-            "body": text,
-            "body_vector": vector,
-            "num_id": doc_id,
-            "object_id": object_id,
-            "location": location,
-            "properties": properties,
-        }
+    def get_federated_searches(
+        self, embedding: list, index_names: list[str]
+    ) -> list[tuple[str, dict]]:
+        """Default kNN query for every index, scenario queries for scenario
+        indexes."""
 
-    @staticmethod
-    async def create_general_scenario_row_to_upload(
-        index: str,
-        text: str,
-        doc_id: int,
-        vector: list,
-        feature_collection: dict,
-    ):
+        return [
+            (
+                index_name,
+                (
+                    self.get_scenario_search_body(embedding)
+                    if "&" in index_name
+                    else self.get_search_body(embedding)
+                ),
+            )
+            for index_name in index_names
+        ]
 
-        return {
-            "_op_type": "index",
-            "_index": index,
-            "_id": str(doc_id),
-            "num_id": doc_id,
-            "body": text,
-            "body_vector": vector,
-            "feature_collection": feature_collection,
-        }
+    def get_federated_size(self) -> int:
+        """Number of merged federated hits used as context."""
 
-    async def upload_analyze_scenario(
-        self, index_name: str, data_to_upload: list, num_questions: int = 5
-    ):
+        return int(
+            get_optional(self.config, "FEDERATED_K") or self.config.get("ELASTIC_K")
+        )
 
-        num_ids = 0
-        docs_to_upload = []
-        for row in tqdm(
-            data_to_upload, desc=f"Forming docs to elastic index {index_name}"
-        ):
-            text_questions = await self.llm_service.generate_text_description(
-                row["text"], num_questions
+    async def search_federated(
+        self, searches: list[tuple[str, dict]], size: int | None = None
+    ) -> list[dict]:
+        """Run ``(index_name, query_body)`` searches in one msearch request.
+
+        Scores are normalized by the best hit of every index, so indexes
+        with different score ranges are merged fairly. Hits are tagged with
+        the requested index name as ``source_index`` (``_index`` is the
+        physical version) and sorted by ``normalized_score``. Failed index
+        searches are logged and skipped.
+
+        Args:
+            searches (list[tuple[str, dict]]): index names with query bodies.
+            size (int | None): max number of merged hits, all if not set.
+        Returns:
+            list[dict]: merged hits.
+        """
+
+        return (await self.search_federated_batch([searches], size))[0]
+
+    async def search_federated_batch(
+        self, batches: list[list[tuple[str, dict]]], size: int | None = None
+    ) -> list[list[dict]]:
+        """``search_federated`` for several queries, hits are merged per query.
+        Searches the local vector index can answer are not sent to elastic,
+        the rest go in msearch requests of at most ``msearch_size`` searches
+        to stay under the elastic request size limit.
+
+        Args:
+            batches (list[list[tuple[str, dict]]]): searches of every query.
+            size (int | None): max number of merged hits per query.
+        Returns:
+            list[list[dict]]: merged hits of every query.
+        """
+
+        results = [
+            [
+                self.local_index.search(index_name, body) if self.local_index else None
+                for index_name, body in searches
+            ]
+            for searches in batches
+        ]
+        pending = [
+            (index_name, body)
+            for searches, local in zip(batches, results)
+            for (index_name, body), result in zip(searches, local)
+            if result is None
+        ]
+        responses = []
+        for start in range(0, len(pending), self.msearch_size):
+            request = []
+            for index_name, body in pending[start : start + self.msearch_size]:
+                request += [{"index": index_name}, body]
+            responses += self.client.msearch(searches=request)["responses"]
+        if responses:
+            responses = iter(responses)
+            results = [
+                [result or next(responses) for result in local] for local in results
+            ]
+        return [
+            self.merge_federated_hits(
+                [
+                    (index_name, result)
+                    for (index_name, _), result in zip(searches, local)
+                ],
+                size,
             )
-            for question in text_questions:
-                vector = self.encode(question)
-                current_doc = await self.create_analyze_scenario_row_to_upload(
-                    index_name,
-                    row["text"],
-                    num_ids,
-                    row["object_id"],
-                    vector,
-                    json.loads(row["location"]),
-                    row["properties"],
-                )
-                docs_to_upload.append(current_doc)
-                num_ids += 1
+            for searches, local in zip(batches, results)
+        ]
 
-        if docs_to_upload:
-            try:
-                bulk(
-                    self.client, docs_to_upload, index=index_name, request_timeout=1200
+    @staticmethod
+    def merge_federated_hits(
+        results: list[tuple[str, dict]], size: int | None = None
+    ) -> list[dict]:
+
+        hits = []
+        for index_name, result in results:
+            if "error" in result:
+                logger.warning(
+                    f"Federated search in {index_name} failed: {result['error']}"
                 )
-                logger.info(
-                    f"Uploaded {len(docs_to_upload)} docs to elastic index {index_name}"
+                continue
+            index_hits = result["hits"]["hits"]
+            max_score = max((hit["_score"] or 0 for hit in index_hits), default=0)
+            for hit in index_hits:
+                hits.append(
+                    {
+                        **hit,
+                        "source_index": index_name,
+                        "normalized_score": (
+                            (hit["_score"] or 0) / max_score if max_score else 0
+                        ),
+                    }
                 )
-            except BulkIndexError as e:
-                for error in e.errors:
-                    print(error)
-                    raise
-        return index_name
+        hits.sort(key=lambda hit: hit["normalized_score"], reverse=True)
+        return hits[:size] if size else hits
 
-    async def upload_common_scenario(
-        self, index_name: str, data_to_upload: list, num_questions: int = 20
-    ):
+    async def get_source_geometry(self, index_name: str, doc_id: str) -> dict:
+        """Original geometry of a document: stored layer for general mode and
+        test chunks, object feature for analyze mode."""
 
-        num_ids = 0
-        docs_to_upload = []
-        for row in tqdm(
-            data_to_upload, desc=f"Forming docs to elastic index {index_name}"
-        ):
-            text_questions = await self.llm_service.generate_text_description(
-                row["text"], num_questions, True if row["feature_collection"] else False
+        try:
+            response = self.client.get(
+                index=index_name,
+                id=doc_id,
+                source_includes=["location", "properties", "feature_collection"],
             )
-            for question in text_questions:
-                num_ids += 1
-                vector = self.encode(question)
-                current_doc = await self.create_general_scenario_row_to_upload(
-                    index_name,
-                    row["text"],
-                    num_ids,
-                    vector,
-                    row["feature_collection"],
-                )
-                docs_to_upload.append(current_doc)
+        except NotFoundError:
+            raise http_exception(
+                404,
+                "Document not found",
+                _input={"index_name": index_name, "doc_id": doc_id},
+                _detail={},
+            )
+        source = response["_source"]
+        if source.get("feature_collection"):
+            return source["feature_collection"]
+        if source.get("location"):
+            return {
+                "type": "Feature",
+                "id": doc_id,
+                "geometry": source["location"],
+                "properties": source.get("properties") or {},
+            }
+        raise http_exception(
+            404,
+            "Document has no geometry",
+            _input={"index_name": index_name, "doc_id": doc_id},
+            _detail={},
+        )
+
+    async def write_index(
+        self,
+        index_name: str,
+        body: dict,
+        fill: Callable[[str], Awaitable[T]],
+        rebuild: bool = False,
+    ) -> T:
+        """Call ``fill`` with the index to write to: the index itself or, for
+        ``rebuild``, a new version switched in when filling succeeds."""
+
+        existed = self.index_registry.exists_live(index_name)
+        if rebuild:
+            result = await self.index_versions.rebuild(index_name, body, fill)
+        else:
+            result = await fill(index_name)
+        # new alias or index created by elastic on the first write
+        if rebuild or not existed:
+            self.index_registry.refresh()
+        self.invalidate_local(index_name)
+        return result
 
-        if docs_to_upload:
+    async def upload_analyze_scenario(
+        self,
+        index_name: str,
+        data_to_upload: list,
+        num_questions: int = 5,
+        question_mode: str = "llm",
+        rebuild: bool = False,
+    ):
 
-            try:
-                bulk(
-                    self.client, docs_to_upload, index=index_name, request_timeout=1200
-                )
-            except BulkIndexError as e:
-                for error in e.errors:
-                    print(error)
-                return
+        indexed = await self.write_index(
+            index_name,
+            self.get_scenario_index_body(index_name),
+            lambda target: self.scenario_pipeline.index(
+                target,
+                self.scenario_pipeline.iter_analyze_docs(
+                    target, data_to_upload, num_questions, question_mode
+                ),
+            ),
+            rebuild,
+        )
+        logger.info(f"Uploaded {indexed} docs to elastic index {index_name}")
+        return index_name
+
+    async def build_analyze_scenario_docs(
+        self,
+        index_name: str,
+        data_to_upload: list,
+        num_questions: int = 5,
+        question_mode: str = "llm",
+    ) -> list[dict]:
+
+        return [
+            doc
+            async for docs in self.scenario_pipeline.iter_analyze_docs(
+                index_name, data_to_upload, num_questions, question_mode
+            )
+            for doc in docs
+        ]
+
+    async def upload_common_scenario(
+        self,
+        index_name: str,
+        data_to_upload: list,
+        num_questions: int = 20,
+        rebuild: bool = False,
+    ):
 
+        indexed = await self.write_index(
+            index_name,
+            self.get_scenario_index_body(index_name),
+            lambda target: self.scenario_pipeline.index(
+                target,
+                self.scenario_pipeline.iter_common_docs(
+                    target, data_to_upload, num_questions
+                ),
+            ),
+            rebuild,
+        )
+        logger.info(f"Uploaded {indexed} docs to elastic index {index_name}")
         return index_name
 
+    async def build_common_scenario_docs(
+        self, index_name: str, data_to_upload: list, num_questions: int = 20
+    ) -> list[dict]:
+
+        return [
+            doc
+            async for docs in self.scenario_pipeline.iter_common_docs(
+                index_name, data_to_upload, num_questions
+            )
+            for doc in docs
+        ]
+
     async def get_last_index(self, index_name: str) -> int:
         query_body = {"size": 1, "sort": [{"num_id": {"order": "desc"}}]}
         try:
@@ -542,7 +808,7 @@ class ElasticService:
         doc_name: str,
     ) -> dict[str, str | list]:
 
-        vector = self.encode(text)
+        vector = await self.encode(text)
         return {
             "_id": str(doc_id),
             "num_id": doc_id,
@@ -552,7 +818,12 @@ class ElasticService:
         }
 
     async def create_paragraph_to_upload(
-        self, text: str, num_questions: int, last_doc_id: int, doc_name: str
+        self,
+        text: str,
+        num_questions: int,
+        last_doc_id: int,
+        doc_name: str,
+        heading_path: list[str] | None = None,
     ) -> tuple[list[dict[str, str | int]], int]:
 
         docs_to_add = []
@@ -566,7 +837,7 @@ class ElasticService:
                         "_id": str(last_doc_id + i),
                         "num_id": last_doc_id + i,
                         "body": text,
-                        "body_vector": self.encode(text),
+                        "body_vector": await self.encode(text),
                         "doc_name": doc_name,
                     }
                 )
@@ -576,10 +847,13 @@ class ElasticService:
                         "_id": str(last_doc_id + i),
                         "num_id": last_doc_id + i,
                         "body": text,
-                        "body_vector": self.encode(text_questions[i - 1]),
+                        "body_vector": await self.encode(text_questions[i - 1]),
                         "doc_name": doc_name,
                     }
                 )
+        if heading_path:
+            for doc in docs_to_add:
+                doc["heading_path"] = heading_path
         return docs_to_add, last_doc_id + len(text_questions) + 1
 
     async def create_table_to_upload(
@@ -588,6 +862,7 @@ class ElasticService:
         num_questions: int,
         last_doc_id: int,
         doc_name: str,
+        heading_path: list[str] | None = None,
     ) -> tuple[list[dict[str, str | int]], int]:
 
         docs_to_add = []
@@ -602,7 +877,7 @@ class ElasticService:
                         "_id": str(last_doc_id + i),
                         "num_id": last_doc_id + i,
                         "body": text,
-                        "body_vector": self.encode(table_questions[i - 1]),
+                        "body_vector": await self.encode(table_questions[i - 1]),
                         "doc_name": doc_name,
                     }
                 )
@@ -612,11 +887,14 @@ class ElasticService:
                         "_id": str(last_doc_id + i),
                         "num_id": last_doc_id + i,
                         "body": text,
-                        "body_vector": self.encode(table_questions[i - 1]),
+                        "body_vector": await self.encode(table_questions[i - 1]),
                         "doc_name": doc_name,
                     }
                 )
 
+        if heading_path:
+            for doc in docs_to_add:
+                doc["heading_path"] = heading_path
         return docs_to_add, last_doc_id + len(table_questions) + 1
 
     async def upload_to_index(
@@ -627,64 +905,129 @@ class ElasticService:
         table_context_size: int,
         text_questions_num: int,
         table_questions_num: int,
+        chunk_size: int = 512,
+        chunk_overlap: int = 64,
+        file_name: str | None = None,
+        rebuild: bool = False,
     ):
-        if not self.client.indices.exists(index=index_name):
-            await self.create_index(index_name, self.index_mapper[index_name])
+        """Upload document to index, with ``rebuild`` the index content is
+        replaced by the document once it is fully uploaded."""
+
+        async def fill(target: str) -> None:
+            last_id = 0 if rebuild else await self.get_last_index(target)
+            logger.info(
+                f"Started uploading documents to index {target} from id {last_id}"
+            )
+            documents, _ = await self.build_document_docs(
+                io.BytesIO(file),
+                doc_name,
+                index_name,
+                last_id,
+                table_context_size,
+                text_questions_num,
+                table_questions_num,
+                chunk_size,
+                chunk_overlap,
+                file_name,
+            )
+            if documents:
+                bulk(self.client, documents, index=target, request_timeout=1200)
+
+        if not rebuild and not self.index_registry.exists_live(index_name):
+            await self.create_index(
+                self.index_mapper.get(index_name, index_name), index_name
+            )
+        await self.write_index(index_name, self.get_index_body(), fill, rebuild)
+        if rebuild and index_name not in self.index_mapper:
+            self.index_mapper_store.update({index_name: index_name})
+        return index_name
+
+    async def build_document_docs(
+        self,
+        source: str | IO[bytes],
+        doc_name: str,
+        index_name: str,
+        last_id: int,
+        table_context_size: int,
+        text_questions_num: int,
+        table_questions_num: int,
+        chunk_size: int = 512,
+        chunk_overlap: int = 64,
+        file_name: str | None = None,
+    ) -> tuple[list[dict], int]:
+        """Form document chunks with vectors ready for bulk upload.
+
+        Args:
+            source (str | IO[bytes]): document file path or file-like object.
+            last_id (int): id to number documents from.
+            chunk_size (int): max chunk size in tokens.
+            chunk_overlap (int): tokens repeated from the previous chunk.
+            file_name (str | None): name to choose the parser by, defaults to
+                the source path.
+        Returns:
+            tuple[list[dict], int]: documents and last used id.
+        """
+
+        from tqdm import tqdm
+
         documents = []
-        full_doc = Document(io.BytesIO(file))
-        last_id = await self.get_last_index(index_name)
-        logger.info(
-            f"Started uploading documents to index {index_name} from id {last_id}"
+        chunks = self.chunk_document(
+            source,
+            file_name or (source if isinstance(source, str) else None),
+            table_context_size,
+            chunk_size,
+            chunk_overlap,
         )
-        dock_blocks = [i for i in doc_parser.iter_contexts_for_vectorization(full_doc)]
-        for index, entity in tqdm(
-            enumerate(dock_blocks), total=len(dock_blocks), desc="Processing texts"
-        ):
-            if entity[1] == "text":
-                text = entity[0]
+        for chunk in tqdm(chunks, desc="Processing texts"):
+            if chunk.kind == "text":
                 docs, last_id = await self.create_paragraph_to_upload(
-                    text, text_questions_num, last_id, doc_name
+                    chunk.body,
+                    text_questions_num,
+                    last_id,
+                    doc_name,
+                    chunk.heading_path,
                 )
-                documents += docs
-            elif entity[1] == "table":
-                table_data = entity[0]
-                try:
-                    table_with_context = (
-                        "\n".join(
-                            [
-                                i[0]
-                                for i in dock_blocks[
-                                    max(index - table_context_size, 0) : index
-                                ]
-                                if i[1] == "text"
-                            ]
-                        ),
-                        table_data,
-                        "\n".join(
-                            [
-                                i[0]
-                                for i in dock_blocks[index : index + table_context_size]
-                                if i[1] == "text"
-                            ]
-                        ),
-                    )
-                except Exception as e:
-                    logger.exception(e)
-                    raise HTTPException(status_code=500, detail=e.__str__())
+            else:
                 docs, last_id = await self.create_table_to_upload(
-                    table_with_context, table_questions_num, last_id, doc_name
+                    (chunk.before, chunk.text, chunk.after),
+                    table_questions_num,
+                    last_id,
+                    doc_name,
+                    chunk.heading_path,
                 )
-                documents += docs
+            documents += docs
 
         if index_name in ("moscow&758", "moscow&10078"):
             for doc in documents:
                 doc.pop("doc_name")
-        if documents:
-            bulk(self.client, documents, index=index_name, request_timeout=1200)
-        return index_name
+                doc.pop("heading_path", None)
+        return documents, last_id
 
-    def encode(self, document: str) -> list:
+    @staticmethod
+    def chunk_document(
+        source: str | IO[bytes],
+        file_name: str | None,
+        table_context_size: int,
+        chunk_size: int = 512,
+        chunk_overlap: int = 64,
+    ) -> Iterator["Chunk"]:
+        """Split document into section chunks, tables get up to
+        ``table_context_size`` surrounding paragraphs as context. The parser
+        is chosen by ``file_name`` suffix. Chunks are yielded as the document
+        is read, it is never materialized as a whole."""
+
+        from .doc_parser import StructureChunker, attach_table_context, parser_registry
+
+        parser = parser_registry.get(file_name)
+        blocks = attach_table_context(parser.iter_blocks(source), table_context_size)
+        chunker = StructureChunker(chunk_size, chunk_overlap)
+        yield from chunker.chunk(blocks)
+        logger.info(f"Document chunked: {chunker.stats.as_dict()}")
+
+    async def encode(self, document: str) -> list:
         try:
-            return self.vectorizer_service.embed(document)
+            return await self.vectorizer_service.embed_async(document)
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             raise HTTPException(500, str(e))
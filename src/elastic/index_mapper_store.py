@@ -0,0 +1,153 @@
+import asyncio
+import threading
+import time
+
+from elasticsearch import ConflictError, Elasticsearch
+from loguru import logger
+
+from src.common.constants.index_mapper import INDEX_MAPPER_INDEX
+from src.common.exceptions.http_exception import http_exception
+
+MAPPER_DOC_ID = "index_mapper"
+
+
+class IndexMapperStore:
+    """``index_mapper`` shared between workers through a metadata index.
+
+    The mapping is a single document, its ``_seq_no`` is used as version:
+    ``refresh`` fetches only the document metadata and loads the mapping
+    when another worker changed it. Local ``index_mapper`` and
+    ``reverse_index_mapper`` dicts are updated in place, so modules holding
+    them see the changes. Built-in mapper entries are kept unless
+    overridden in the stored document.
+    """
+
+    def __init__(
+        self,
+        client: Elasticsearch,
+        index_mapper: dict[str, str],
+        reverse_index_mapper: dict[str, str],
+        refresh_interval: float = 10,
+        index_name: str = INDEX_MAPPER_INDEX,
+    ):
+
+        self.client = client
+        self.index_mapper = index_mapper
+        self.reverse_index_mapper = reverse_index_mapper
+        self.builtin = dict(index_mapper)
+        self.refresh_interval = refresh_interval
+        self.index_name = index_name
+        self.version: int | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    def ensure_document(self) -> None:
+
+        if not self.client.indices.exists(index=self.index_name):
+            self.client.options(ignore_status=[400]).indices.create(
+                index=self.index_name,
+                body={
+                    "mappings": {
+                        "dynamic": False,
+                        "properties": {"mapping": {"type": "object", "enabled": False}},
+                    }
+                },
+            )
+        self.client.options(ignore_status=[409]).index(
+            index=self.index_name,
+            id=MAPPER_DOC_ID,
+            document={"mapping": self.builtin},
+            op_type="create",
+            refresh=True,
+        )
+
+    def apply(self, mapping: dict[str, str], version: int) -> None:
+
+        mapping = {**self.builtin, **mapping}
+        reverse = {v: k for k, v in mapping.items()}
+        with self._lock:
+            for key in [i for i in self.index_mapper if i not in mapping]:
+                del self.index_mapper[key]
+            for key in [i for i in self.reverse_index_mapper if i not in reverse]:
+                del self.reverse_index_mapper[key]
+            self.index_mapper.update(mapping)
+            self.reverse_index_mapper.update(reverse)
+            self.version = version
+        logger.info(f"Loaded index mapper version {version}: {len(mapping)} indexes")
+
+    def load(self) -> None:
+
+        self.ensure_document()
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False) -> bool:
+        """Load the stored mapping if it changed, returns whether it did.
+        Not forced refreshes are limited to one per second."""
+
+        now = time.monotonic()
+        if not force and now - self._checked_at < 1:
+            return False
+        self._checked_at = now
+        meta = self.client.options(ignore_status=[404]).get(
+            index=self.index_name, id=MAPPER_DOC_ID, source=False
+        )
+        if not meta.body.get("found"):
+            return False
+        if not force and meta["_seq_no"] == self.version:
+            return False
+        doc = self.client.get(index=self.index_name, id=MAPPER_DOC_ID)
+        self.apply(doc["_source"]["mapping"], doc["_seq_no"])
+        return True
+
+    def update(self, mapping: dict[str, str], retries: int = 5) -> None:
+        """Merge ``mapping`` into the stored document with optimistic
+        concurrency control and apply the result locally."""
+
+        for _ in range(retries):
+            doc = self.client.options(ignore_status=[404]).get(
+                index=self.index_name, id=MAPPER_DOC_ID
+            )
+            if not doc.body.get("found"):
+                self.ensure_document()
+                continue
+            stored = {**doc["_source"]["mapping"], **mapping}
+            try:
+                resp = self.client.index(
+                    index=self.index_name,
+                    id=MAPPER_DOC_ID,
+                    document={"mapping": stored},
+                    if_seq_no=doc["_seq_no"],
+                    if_primary_term=doc["_primary_term"],
+                    refresh=True,
+                )
+            except ConflictError:
+                continue
+            self.apply(stored, resp["_seq_no"])
+            return
+        raise http_exception(
+            500,
+            "Failed to update index mapper",
+            _input=mapping,
+            _detail={"error": f"Document changed concurrently {retries} times"},
+        )
+
+    async def run_refresh(self) -> None:
+
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.warning(f"Failed to refresh index mapper: {e!r}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start_refresh(self) -> None:
+
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self.run_refresh())
+
+    def stop_refresh(self) -> None:
+
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
@@ -0,0 +1,149 @@
+import asyncio
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from elasticsearch import Elasticsearch
+from loguru import logger
+
+from src.common.constants.index_mapper import INDEX_MAPPER_INDEX
+
+from .index_versions import IndexVersionManager
+
+SCENARIO_INDEX_PATTERN = re.compile(r"^(?P<scenario_id>\d+)&(?P<mode>analyze|general)$")
+# scenario indexes created before the mode suffix, e.g. ``moscow&758``
+LEGACY_SCENARIO_INDEX_PATTERN = re.compile(r"^moscow&(?P<scenario_id>\d+)$")
+
+
+@dataclass(frozen=True)
+class IndexName:
+    """Index name with scenario id and mode parsed for ``<id>&<mode>``
+    scenario indexes, legacy ``moscow&<id>`` indexes have no mode."""
+
+    name: str
+    scenario_id: int | None = None
+    mode: str | None = None
+
+    @classmethod
+    def parse(cls, name: str) -> "IndexName":
+
+        match = SCENARIO_INDEX_PATTERN.match(name)
+        if match is not None:
+            return cls(name, int(match.group("scenario_id")), match.group("mode"))
+        match = LEGACY_SCENARIO_INDEX_PATTERN.match(name)
+        if match is not None:
+            return cls(name, int(match.group("scenario_id")))
+        return cls(name)
+
+
+class IndexRegistry:
+    """In-process list of searchable indexes (alias names for versioned
+    indexes). Refreshed by a background task every ``refresh_interval``
+    seconds and by ``ElasticService`` after creating or deleting indexes,
+    listings and existence checks are served from memory. Other workers
+    update elastic in between, so create and write paths use
+    ``exists_live``."""
+
+    def __init__(self, client: Elasticsearch, refresh_interval: float = 60):
+
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self._indexes: dict[str, IndexName] = {}
+        self._scenarios: dict[int, list[str]] = {}
+        self._refreshed_at: float | None = None
+        self._lock = threading.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    def refresh(self) -> None:
+
+        all_indices = self.client.indices.get_alias(index="*")
+        alias_names = {
+            alias
+            for info in all_indices.values()
+            for alias in info.get("aliases") or {}
+        }
+        indexes = {}
+        for index, info in all_indices.items():
+            if (
+                index.startswith(".")
+                or index.startswith("_")
+                or index == INDEX_MAPPER_INDEX
+            ):
+                continue
+            aliases = list(info.get("aliases") or {})
+            if aliases:
+                indexes.update({i: IndexName.parse(i) for i in aliases})
+                continue
+            # versions of an existing alias (or of a not yet migrated concrete
+            # index) without alias are rebuilds in progress, other ``*_vN``
+            # names are regular indexes
+            version_of = IndexVersionManager.get_version_alias(index)
+            if version_of is None or (
+                version_of not in alias_names and version_of not in all_indices
+            ):
+                indexes[index] = IndexName.parse(index)
+        scenarios = {}
+        for index in indexes.values():
+            if index.scenario_id is not None:
+                scenarios.setdefault(index.scenario_id, []).append(index.name)
+        with self._lock:
+            self._indexes = indexes
+            self._scenarios = scenarios
+            self._refreshed_at = time.monotonic()
+
+    def ensure_fresh(self) -> None:
+        """Refresh in place when the background refresh is not running
+        (cli, startup) and the list is older than two refresh intervals."""
+
+        if (
+            self._refreshed_at is None
+            or time.monotonic() - self._refreshed_at > 2 * self.refresh_interval
+        ):
+            self.refresh()
+
+    def get_indexes(self) -> list[str]:
+
+        self.ensure_fresh()
+        return list(self._indexes)
+
+    def get_scenario_indexes(self, scenario_id: int) -> list[str]:
+
+        self.ensure_fresh()
+        return list(self._scenarios.get(scenario_id, []))
+
+    def exists(self, index_name: str) -> bool:
+        """Existence by the in-memory list, for read and search paths."""
+
+        self.ensure_fresh()
+        return index_name in self._indexes
+
+    def exists_live(self, index_name: str) -> bool:
+        """Existence checked in elastic, for create and write decisions: the
+        list of this worker is stale when another worker created or deleted
+        the index. The list is refreshed when it disagrees with elastic."""
+
+        exists = bool(self.client.indices.exists(index=index_name))
+        if exists != (index_name in self._indexes):
+            self.refresh()
+        return exists
+
+    async def run_refresh(self) -> None:
+
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.warning(f"Failed to refresh index registry: {e!r}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start_refresh(self) -> None:
+
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self.run_refresh())
+
+    def stop_refresh(self) -> None:
+
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
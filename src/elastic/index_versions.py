@@ -0,0 +1,144 @@
+import re
+from typing import Awaitable, Callable, TypeVar
+
+from elasticsearch import Elasticsearch
+from loguru import logger
+
+T = TypeVar("T")
+
+VERSION_PATTERN = re.compile(r"^(?P<alias>.+)_v(?P<version>\d+)$")
+
+
+class IndexVersionManager:
+    """Versioned physical indexes behind aliases.
+
+    Readers always use the alias (``1830&general``), data is written to
+    ``<alias>_v<N>``. A rebuild fills a new version, moves the alias to it
+    in one ``update_aliases`` call and deletes older versions, so readers
+    never see a partially filled index. Indexes created before versioning
+    (concrete index with the alias name) are replaced by the alias on the
+    first swap.
+    """
+
+    def __init__(self, client: Elasticsearch, keep_versions: int = 0):
+
+        self.client = client
+        # previous versions kept after a swap for rollback
+        self.keep_versions = keep_versions
+
+    @staticmethod
+    def get_version_name(alias: str, version: int) -> str:
+
+        return f"{alias}_v{version}"
+
+    @staticmethod
+    def get_version_alias(index_name: str) -> str | None:
+        """Alias of a ``<alias>_v<N>`` name, ``None`` for other names."""
+
+        match = VERSION_PATTERN.match(index_name)
+        return match.group("alias") if match else None
+
+    def get_versions(self, alias: str) -> dict[int, str]:
+        """Existing physical versions of the alias by version number."""
+
+        indexes = self.client.options(ignore_status=[404]).indices.get(
+            index=f"{alias}_v*", expand_wildcards="open,closed"
+        )
+        versions = {}
+        for index_name in indexes:
+            match = VERSION_PATTERN.match(index_name)
+            if match and match.group("alias") == alias:
+                versions[int(match.group("version"))] = index_name
+        return versions
+
+    def get_current(self, alias: str) -> str | None:
+        """Physical index the alias points to, alias name for a not migrated
+        concrete index, ``None`` if there is no such index."""
+
+        if self.client.indices.exists_alias(name=alias):
+            return next(iter(self.client.indices.get_alias(name=alias)))
+        if self.client.indices.exists(index=alias):
+            return alias
+        return None
+
+    def create_version(self, alias: str, body: dict) -> str:
+        """Create the next physical version, the alias is not moved."""
+
+        versions = self.get_versions(alias)
+        index_name = self.get_version_name(alias, max(versions, default=0) + 1)
+        self.client.indices.create(index=index_name, body=body)
+        logger.info(f"Created index {index_name} for alias {alias}")
+        return index_name
+
+    def swap(self, alias: str, index_name: str) -> None:
+        """Atomically point the alias to ``index_name``."""
+
+        current = self.get_current(alias)
+        actions = []
+        if current == alias:
+            actions.append({"remove_index": {"index": alias}})
+        elif current is not None:
+            actions.append({"remove": {"index": current, "alias": alias}})
+        actions.append({"add": {"index": index_name, "alias": alias}})
+        self.client.indices.update_aliases(actions=actions)
+        logger.info(f"Alias {alias} switched from {current} to {index_name}")
+
+    def cleanup(self, alias: str) -> list[str]:
+        """Delete versions older than the current one above ``keep_versions``."""
+
+        current = self.get_current(alias)
+        old = [
+            index_name
+            for _, index_name in sorted(self.get_versions(alias).items())
+            if index_name != current
+        ]
+        to_delete = old[: max(len(old) - self.keep_versions, 0)]
+        if to_delete:
+            self.client.options(ignore_status=[404]).indices.delete(
+                index=",".join(to_delete)
+            )
+            logger.info(f"Deleted old versions of {alias}: {to_delete}")
+        return to_delete
+
+    def create(self, alias: str, body: dict) -> str:
+        """Create the first version of a new index and alias to it."""
+
+        index_name = self.create_version(alias, body)
+        self.swap(alias, index_name)
+        return index_name
+
+    def abort(self, index_name: str) -> None:
+
+        self.client.options(ignore_status=[404]).indices.delete(index=index_name)
+        logger.warning(f"Rebuild aborted, deleted index {index_name}")
+
+    async def rebuild(
+        self,
+        alias: str,
+        body: dict,
+        fill: Callable[[str], Awaitable[T]],
+    ) -> T:
+        """Fill a new version with ``fill(index_name)`` and switch the alias
+        to it. The new version is deleted if filling fails."""
+
+        index_name = self.create_version(alias, body)
+        try:
+            result = await fill(index_name)
+            self.client.indices.refresh(index=index_name)
+        except BaseException:
+            self.abort(index_name)
+            raise
+        self.swap(alias, index_name)
+        self.cleanup(alias)
+        return result
+
+    def delete(self, alias: str):
+        """Delete the index behind the alias with all its versions."""
+
+        names = set(self.get_versions(alias).values())
+        current = self.get_current(alias)
+        if current is not None:
+            names.add(current)
+        return self.client.options(ignore_status=[400, 404]).indices.delete(
+            index=",".join(sorted(names)) or alias
+        )
@@ -0,0 +1,294 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import scan
+from loguru import logger
+
+from src.common.config.config import Config, get_optional
+
+from .index_versions import VERSION_PATTERN, IndexVersionManager
+
+# int8 vectors are stored as normalized vectors scaled to [-127, 127]
+INT8_SCALE = 127
+
+
+@dataclass
+class VectorSnapshot:
+    """Vectors and sources of one physical index at a document count."""
+
+    physical_index: str
+    count: int
+    ids: list[str]
+    # L2 normalized (n, dims), memory mapped
+    vectors: np.ndarray
+    sources: list[dict]
+    checked_at: float
+
+
+class LocalVectorIndex:
+    """In-process exact kNN for small indexes.
+
+    Vectors of indexes with at most ``max_docs`` documents are stored as
+    ``.npy`` files in ``cache_dir`` and memory mapped, so workers share them
+    through the page cache and reuse them after restart. A snapshot is keyed
+    by the physical index behind the alias and its document count: it is
+    checked every ``refresh_interval`` seconds and reloaded in a background
+    thread when a rebuild switched the alias or documents were added. Writes
+    through ``ElasticService`` invalidate the snapshot at once.
+
+    Only plain kNN queries on ``body_vector`` are answered locally, queries
+    with filters, unknown or large indexes go to elastic. Scores use the
+    elastic cosine formula ``(1 + cos) / 2``, so ``min_score`` and score
+    normalization work the same.
+    """
+
+    def __init__(
+        self,
+        client: Elasticsearch,
+        cache_dir: Path,
+        max_docs: int = 5000,
+        indexes: set[str] | None = None,
+        dtype: str = "float32",
+        refresh_interval: float = 10,
+    ):
+
+        self.client = client
+        self.index_versions = IndexVersionManager(client)
+        self.cache_dir = cache_dir
+        self.max_docs = max_docs
+        # None to serve every small index
+        self.indexes = indexes
+        self.dtype = dtype
+        self.refresh_interval = refresh_interval
+        self._snapshots: dict[str, VectorSnapshot] = {}
+        # indexes found too large: (physical index, count, checked at)
+        self._remote: dict[str, tuple[str, int, float]] = {}
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="local-vectors")
+
+    @classmethod
+    def from_config(
+        cls, config: Config, client: Elasticsearch
+    ) -> "LocalVectorIndex | None":
+        """Local index if ``LOCAL_VECTOR_INDEX`` is enabled."""
+
+        if (get_optional(config, "LOCAL_VECTOR_INDEX") or "").lower() != "true":
+            return None
+        indexes = get_optional(config, "LOCAL_VECTOR_INDEXES")
+        return cls(
+            client,
+            Path(get_optional(config, "LOCAL_VECTOR_DIR") or ".vector_cache"),
+            int(get_optional(config, "LOCAL_VECTOR_MAX_DOCS") or 5000),
+            {i.strip() for i in indexes.split(",")} if indexes else None,
+            get_optional(config, "LOCAL_VECTOR_DTYPE") or "float32",
+            float(get_optional(config, "LOCAL_VECTOR_REFRESH_INTERVAL") or 10),
+        )
+
+    def get_state(self, index_name: str) -> tuple[str, int] | None:
+        """Physical index behind the alias and its document count."""
+
+        physical = self.index_versions.get_current(index_name)
+        if physical is None:
+            return None
+        return physical, self.client.count(index=physical)["count"]
+
+    def get_paths(self, physical_index: str, count: int) -> tuple[Path, Path]:
+
+        stem = self.cache_dir / f"{physical_index}-{count}-{self.dtype}"
+        return stem.with_suffix(".npy"), stem.with_suffix(".json")
+
+    def write_snapshot(self, physical_index: str, count: int) -> None:
+
+        ids, vectors, sources = [], [], []
+        for hit in scan(
+            self.client, index=physical_index, query={"query": {"match_all": {}}}
+        ):
+            source = hit["_source"]
+            vector = source.pop("body_vector", None)
+            if vector is None:
+                continue
+            ids.append(hit["_id"])
+            vectors.append(vector)
+            sources.append(source)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if not vectors:
+            matrix = matrix.reshape(0, 0)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        if self.dtype == "int8":
+            matrix = np.round(matrix * INT8_SCALE).astype(np.int8)
+        vectors_path, sources_path = self.get_paths(physical_index, count)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # written under temporary names, other workers may read the same files
+        tmp = f".{os.getpid()}.tmp"
+        with open(str(vectors_path) + tmp, "wb") as f:
+            np.save(f, matrix)
+        Path(str(sources_path) + tmp).write_text(
+            json.dumps({"ids": ids, "sources": sources}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(str(vectors_path) + tmp, vectors_path)
+        os.replace(str(sources_path) + tmp, sources_path)
+
+    def load(self, index_name: str) -> None:
+
+        state = self.get_state(index_name)
+        if state is None:
+            self.invalidate(index_name)
+            return
+        physical, count = state
+        if count > self.max_docs:
+            with self._lock:
+                self._snapshots.pop(index_name, None)
+                self._remote[index_name] = (physical, count, time.monotonic())
+            return
+        vectors_path, sources_path = self.get_paths(physical, count)
+        if not (vectors_path.exists() and sources_path.exists()):
+            self.write_snapshot(physical, count)
+        data = json.loads(sources_path.read_text(encoding="utf-8"))
+        snapshot = VectorSnapshot(
+            physical,
+            count,
+            data["ids"],
+            np.load(vectors_path, mmap_mode="r"),
+            data["sources"],
+            time.monotonic(),
+        )
+        with self._lock:
+            self._snapshots[index_name] = snapshot
+            self._remote.pop(index_name, None)
+        self.cleanup(index_name, vectors_path.stem)
+        logger.info(f"Loaded {len(snapshot.ids)} vectors of {physical} to local index")
+
+    def cleanup(self, index_name: str, keep: str) -> None:
+        """Delete files of previous versions and counts of the index."""
+
+        for path in self.cache_dir.iterdir():
+            if path.suffix not in (".npy", ".json") or path.stem == keep:
+                continue
+            name = path.stem.rsplit("-", 2)[0]
+            match = VERSION_PATTERN.match(name)
+            if index_name in (name, match and match.group("alias")):
+                path.unlink(missing_ok=True)
+
+    def check(self, index_name: str) -> None:
+        """Reload the snapshot if the index changed since it was loaded."""
+
+        with self._lock:
+            snapshot = self._snapshots.get(index_name)
+        state = self.get_state(index_name)
+        if snapshot is None or state != (snapshot.physical_index, snapshot.count):
+            self.load(index_name)
+        else:
+            snapshot.checked_at = time.monotonic()
+
+    def schedule(self, index_name: str, task) -> None:
+
+        with self._lock:
+            if index_name in self._pending:
+                return
+            self._pending.add(index_name)
+
+        def run():
+            try:
+                task(index_name)
+            except Exception as e:
+                logger.warning(f"Failed to load local vectors of {index_name}: {e!r}")
+            finally:
+                with self._lock:
+                    self._pending.discard(index_name)
+
+        self._executor.submit(run)
+
+    def invalidate(self, index_name: str) -> None:
+
+        with self._lock:
+            self._snapshots.pop(index_name, None)
+            self._remote.pop(index_name, None)
+
+    def get_snapshot(self, index_name: str) -> VectorSnapshot | None:
+        """Snapshot to answer from, loads and checks are scheduled in the
+        background and elastic is used meanwhile."""
+
+        if self.indexes is not None and index_name not in self.indexes:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            snapshot = self._snapshots.get(index_name)
+            remote = self._remote.get(index_name)
+        if remote is not None:
+            if now - remote[2] > self.refresh_interval:
+                self.schedule(index_name, self.load)
+            return None
+        if snapshot is None:
+            self.schedule(index_name, self.load)
+        elif now - snapshot.checked_at > self.refresh_interval:
+            self.schedule(index_name, self.check)
+        return snapshot
+
+    @staticmethod
+    def is_supported(body: dict) -> bool:
+
+        knn = body.get("knn")
+        return (
+            isinstance(knn, dict)
+            and knn.get("field") == "body_vector"
+            and "filter" not in knn
+            and "query" not in body
+        )
+
+    def search(self, index_name: str, body: dict) -> dict | None:
+        """Elastic shaped response for a kNN ``body``, ``None`` if the query
+        should go to elastic. Sources never contain ``body_vector``."""
+
+        if not self.is_supported(body):
+            return None
+        snapshot = self.get_snapshot(index_name)
+        if snapshot is None or not snapshot.ids:
+            return None
+        start = time.perf_counter()
+        knn = body["knn"]
+        query = np.asarray(knn["query_vector"], dtype=np.float32)
+        query /= np.linalg.norm(query) or 1
+        cosine = snapshot.vectors @ query
+        if snapshot.vectors.dtype == np.int8:
+            cosine /= INT8_SCALE
+        # elastic returns at most ``size`` of the ``k`` nearest neighbours
+        k = min(int(knn["k"]), int(body.get("size", 10)), len(snapshot.ids))
+        top = np.argpartition(-cosine, k - 1)[:k] if k > 0 else np.array([], int)
+        top = top[np.argsort(-cosine[top])]
+        scores = (1 + cosine[top]) / 2
+        if "min_score" in body:
+            keep = scores >= float(body["min_score"])
+            top, scores = top[keep], scores[keep]
+        fields = body.get("_source")
+        hits = []
+        for position, score in zip(top.tolist(), scores.tolist()):
+            source = snapshot.sources[position]
+            if isinstance(fields, list):
+                source = {key: source[key] for key in fields if key in source}
+            hits.append(
+                {
+                    "_index": snapshot.physical_index,
+                    "_id": snapshot.ids[position],
+                    "_score": score,
+                    "_source": source,
+                }
+            )
+        return {
+            "took": int((time.perf_counter() - start) * 1000),
+            "timed_out": False,
+            "hits": {
+                "total": {"value": len(hits), "relation": "eq"},
+                "max_score": hits[0]["_score"] if hits else None,
+                "hits": hits,
+            },
+        }
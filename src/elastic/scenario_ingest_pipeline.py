@@ -0,0 +1,321 @@
+import asyncio
+import json
+from typing import AsyncIterator, Iterator, Sequence, TypeVar
+
+import numpy as np
+import shapely
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk
+from loguru import logger
+
+from src.common.config.config import Config, get_optional
+from src.common.exceptions.http_exception import http_exception
+from src.llm.llm_service import LlmService
+from src.llm.question_templates import TemplateQuestionGenerator
+from src.vectorizer.vectorizer_service import VectorizerService
+
+T = TypeVar("T")
+
+
+def batched(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class ScenarioIngestPipeline:
+    """Scenario rows to elastic documents in batches.
+
+    Locations of a whole upload are parsed and repaired with vectorized
+    shapely calls, question generation runs with at most ``llm_concurrency``
+    LLM calls, questions are embedded in batches of ``embed_batch_size`` and
+    every batch of documents is bulk indexed while the next one is prepared.
+    """
+
+    def __init__(
+        self,
+        client: Elasticsearch,
+        llm_service: LlmService,
+        vectorizer_service: VectorizerService,
+        question_generator: TemplateQuestionGenerator,
+        llm_concurrency: int = 4,
+        embed_batch_size: int = 32,
+        embed_concurrency: int = 2,
+        bulk_batch_size: int = 500,
+    ):
+
+        self.client = client
+        self.llm_service = llm_service
+        self.vectorizer_service = vectorizer_service
+        self.question_generator = question_generator
+        self.llm_concurrency = llm_concurrency
+        self.embed_batch_size = embed_batch_size
+        self.embed_concurrency = embed_concurrency
+        self.bulk_batch_size = bulk_batch_size
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Config,
+        client: Elasticsearch,
+        llm_service: LlmService,
+        vectorizer_service: VectorizerService,
+    ) -> "ScenarioIngestPipeline":
+
+        return cls(
+            client,
+            llm_service,
+            vectorizer_service,
+            TemplateQuestionGenerator.from_config(config),
+            llm_concurrency=int(get_optional(config, "INGEST_LLM_CONCURRENCY") or 4),
+            embed_batch_size=int(get_optional(config, "INGEST_EMBED_BATCH_SIZE") or 32),
+            embed_concurrency=int(
+                get_optional(config, "INGEST_EMBED_CONCURRENCY") or 2
+            ),
+            bulk_batch_size=int(get_optional(config, "INGEST_BULK_BATCH_SIZE") or 500),
+        )
+
+    @staticmethod
+    def parse_locations(locations: list[str | dict | None]) -> list[dict | None]:
+        """Parse GeoJSON geometries (strings or dicts) in bulk, invalid
+        geometries are repaired with ``make_valid``, unparsable and empty
+        ones are returned as ``None``."""
+
+        geometries = shapely.from_geojson(
+            np.array(
+                [
+                    i if isinstance(i, str) else json.dumps(i) if i else "null"
+                    for i in locations
+                ],
+                dtype=object,
+            ),
+            on_invalid="ignore",
+        )
+        invalid = ~shapely.is_valid(geometries) & ~shapely.is_missing(geometries)
+        if invalid.any():
+            geometries[invalid] = shapely.make_valid(geometries[invalid])
+        geometries[shapely.is_empty(geometries)] = None
+        return [
+            json.loads(i) if i is not None else None
+            for i in shapely.to_geojson(geometries)
+        ]
+
+    @staticmethod
+    def flatten_properties(value, prefix: str = "") -> list[str]:
+
+        if isinstance(value, dict):
+            return [
+                line
+                for key, item in value.items()
+                for line in ScenarioIngestPipeline.flatten_properties(
+                    item, f"{prefix}{key}" if not prefix else f"{prefix}.{key}"
+                )
+            ]
+        if isinstance(value, list):
+            return [
+                line
+                for item in value
+                for line in ScenarioIngestPipeline.flatten_properties(item, prefix)
+            ]
+        if value is None or value == "":
+            return []
+        return [f"{prefix}: {value}"]
+
+    @staticmethod
+    def describe(row: dict) -> str:
+        """Row text, or a description templated from object properties for
+        rows sent without text."""
+
+        if row.get("text"):
+            return row["text"]
+        return "; ".join(
+            ScenarioIngestPipeline.flatten_properties(row.get("properties"))
+        )
+
+    async def generate_questions(
+        self,
+        rows: list[dict],
+        texts: list[str],
+        num_questions: int,
+        restricted: list[bool],
+        question_mode: str = "llm",
+    ) -> list[list[str]]:
+
+        if question_mode == "template":
+            questions = [
+                self.question_generator.generate(row.get("properties"), num_questions)
+                for row in rows
+            ]
+            for row_questions, text in zip(questions, texts):
+                if not row_questions:
+                    # no template matched, the row is indexed by its
+                    # description so the object does not disappear
+                    logger.warning(f"No template questions for row: {text[:200]!r}")
+                    if text:
+                        row_questions.append(text)
+            return questions
+        # created per call, the cli runs uploads in several event loops
+        semaphore = asyncio.Semaphore(self.llm_concurrency)
+
+        async def generate(text: str, is_restricted: bool) -> list[str]:
+            async with semaphore:
+                questions = await self.llm_service.generate_text_description(
+                    text, num_questions, is_restricted
+                )
+            return [question.strip() for question in questions if question.strip()]
+
+        return await asyncio.gather(*map(generate, texts, restricted))
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+
+        semaphore = asyncio.Semaphore(self.embed_concurrency)
+
+        async def embed_batch(batch: Sequence[str]) -> list[list[float]]:
+            async with semaphore:
+                return await self.vectorizer_service.embed_batch_async(list(batch))
+
+        results = await asyncio.gather(
+            *map(embed_batch, batched(texts, self.embed_batch_size))
+        )
+        return [vector for result in results for vector in result]
+
+    async def iter_docs(
+        self,
+        index_name: str,
+        rows: list[dict],
+        num_questions: int,
+        restricted: list[bool],
+        start_id: int,
+        fields: list[dict],
+        question_mode: str = "llm",
+    ) -> AsyncIterator[list[dict]]:
+        """Documents of ``rows`` in bulk sized batches, one document per
+        generated question with the row ``fields``. Questions are generated
+        by LLM or, with ``question_mode="template"``, from row properties."""
+
+        doc_id = start_id
+        rows_per_batch = max(self.bulk_batch_size // max(num_questions, 1), 1)
+        for start in range(0, len(rows), rows_per_batch):
+            end = start + rows_per_batch
+            texts = [self.describe(row) for row in rows[start:end]]
+            questions = await self.generate_questions(
+                rows[start:end],
+                texts,
+                num_questions,
+                restricted[start:end],
+                question_mode,
+            )
+            pairs = [
+                (row_num, question)
+                for row_num, row_questions in enumerate(questions)
+                for question in row_questions
+            ]
+            vectors = await self.embed([question for _, question in pairs])
+            docs = []
+            for (row_num, _), vector in zip(pairs, vectors):
+                docs.append(
+                    {
+                        "_op_type": "index",
+                        "_index": index_name,
+                        "_id": str(doc_id),
+                        "num_id": doc_id,
+                        "body": texts[row_num],
+                        "body_vector": vector,
+                        **fields[start + row_num],
+                    }
+                )
+                doc_id += 1
+            logger.info(
+                f"Formed {len(docs)} docs from rows {start}-{min(end, len(rows))} "
+                f"of {len(rows)} for index {index_name}"
+            )
+            yield docs
+
+    async def iter_analyze_docs(
+        self,
+        index_name: str,
+        rows: list[dict],
+        num_questions: int = 5,
+        question_mode: str = "llm",
+    ) -> AsyncIterator[list[dict]]:
+
+        locations = await asyncio.to_thread(
+            self.parse_locations, [row.get("location") for row in rows]
+        )
+        valid = [(row, loc) for row, loc in zip(rows, locations) if loc is not None]
+        if len(valid) < len(rows):
+            logger.warning(
+                f"Skipped {len(rows) - len(valid)} rows without valid location "
+                f"for index {index_name}"
+            )
+        async for docs in self.iter_docs(
+            index_name,
+            [row for row, _ in valid],
+            num_questions,
+            [False] * len(valid),
+            0,
+            [
+                {
+                    "object_id": row["object_id"],
+                    "location": location,
+                    "properties": row["properties"],
+                }
+                for row, location in valid
+            ],
+            question_mode,
+        ):
+            yield docs
+
+    async def iter_common_docs(
+        self, index_name: str, rows: list[dict], num_questions: int = 20
+    ) -> AsyncIterator[list[dict]]:
+
+        async for docs in self.iter_docs(
+            index_name,
+            rows,
+            num_questions,
+            [bool(row["feature_collection"]) for row in rows],
+            1,
+            [{"feature_collection": row["feature_collection"]} for row in rows],
+        ):
+            yield docs
+
+    def bulk(self, index_name: str, docs: list[dict]) -> int:
+
+        success, errors = bulk(
+            self.client,
+            docs,
+            index=index_name,
+            request_timeout=1200,
+            raise_on_error=False,
+        )
+        if errors:
+            logger.error(f"Failed to index {len(errors)} docs to {index_name}")
+            raise http_exception(
+                500,
+                "Failed to index scenario documents",
+                _input={"index_name": index_name},
+                _detail={"errors": errors[:5]},
+            )
+        return success
+
+    async def index(self, index_name: str, batches: AsyncIterator[list[dict]]) -> int:
+        """Bulk index document batches, a batch is indexed in a worker thread
+        while the next one is formed."""
+
+        indexed = 0
+        pending = None
+        try:
+            async for docs in batches:
+                if pending is not None:
+                    indexed += await pending
+                pending = asyncio.create_task(
+                    asyncio.to_thread(self.bulk, index_name, docs)
+                )
+            if pending is not None:
+                indexed += await pending
+        except BaseException:
+            if pending is not None and not pending.done():
+                await asyncio.wait([pending])
+            raise
+        return indexed
@@ -1,7 +1,30 @@
+from typing import Literal
+
 from pydantic import BaseModel, Field, field_validator
 
 from src.common.constants.index_mapper import reverse_index_mapper
-from src.dependencies import http_exception
+from src.elastic.index_registry import SCENARIO_INDEX_PATTERN
+
+
+def resolve_index_name(value: str) -> str:
+    """Elastic index name by its display name. Unknown names are kept as is,
+    they are resolved or rejected by ``ElasticService.resolve_index_name``."""
+
+    return reverse_index_mapper.get(value, value)
+
+
+def resolve_federated_indexes(value: list[str]) -> list[str]:
+    """Elastic index names for federated search, scenario index names are
+    taken as is."""
+
+    names = []
+    for index in value:
+        name = (
+            index if SCENARIO_INDEX_PATTERN.match(index) else resolve_index_name(index)
+        )
+        if name not in names:
+            names.append(name)
+    return names
 
 
 class BaseLlmRequest(BaseModel):
@@ -12,15 +35,47 @@ class BaseLlmRequest(BaseModel):
         description="ElasticSearch index name to use as context db",
     )
     user_request: str = Field(..., examples=["Что ты умеешь?"])
+    profile: str | None = Field(
+        default=None,
+        examples=["fast"],
+        description="Generation profile name (thinking, token budget, stop sequences). "
+        "Configured profile for index or mode is used if not set",
+    )
+    stream_thinking: bool = Field(
+        default=False,
+        description="Stream model reasoning as status messages before the answer",
+    )
+    map_zoom: int | None = Field(
+        default=None,
+        ge=0,
+        le=22,
+        examples=[14],
+        description="Client map zoom to simplify returned geometries for, "
+        "configured zoom is used if not set",
+    )
+    layer_encoding: Literal["json", "gzip"] = Field(
+        default="json",
+        examples=["gzip"],
+        description="Websocket encoding of map layers: 'json' text message or "
+        "'gzip' header text message followed by a gzip compressed json binary "
+        "message per layer",
+    )
+    federated_indexes: list[str] = Field(
+        default_factory=list,
+        max_length=5,
+        examples=[["Общее", "1830&general"]],
+        description="Additional indexes searched together with index_name in one "
+        "request: index names as in index_name or scenario indexes as "
+        "'<scenario_id>&<analyze|general>'. Context is merged by normalized score "
+        "and tagged with the source index",
+    )
 
     @field_validator("index_name", mode="after")
     @classmethod
     def validate_index(cls, value: str) -> str:
-        if name := reverse_index_mapper.get(value):
-            return name
-        raise http_exception(
-            400,
-            "No matching elastic index found",
-            _input=value,
-            _detail={"available_indexes": list(reverse_index_mapper.keys())},
-        )
+        return resolve_index_name(value)
+
+    @field_validator("federated_indexes", mode="after")
+    @classmethod
+    def validate_federated_indexes(cls, value: list[str]) -> list[str]:
+        return resolve_federated_indexes(value)
@@ -0,0 +1,81 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field, field_validator
+
+from .base_request_dto import resolve_federated_indexes, resolve_index_name
+
+
+class BatchLlmRequest(BaseModel):
+
+    questions: list[str] = Field(
+        min_length=1,
+        max_length=1000,
+        examples=[["Что ты умеешь?", "Какие стадии проекта существуют?"]],
+        description="Questions to answer",
+    )
+    index_name: str = Field(
+        default="Общее",
+        examples=["Общее"],
+        description="ElasticSearch index name to use as context db, not used "
+        "with scenario_id",
+    )
+    scenario_id: int | None = Field(
+        default=None,
+        examples=[1830],
+        description="Scenario ID from Urban API to answer on scenario data",
+    )
+    mode: Literal["Анализ территории проекта", "Анализ по объектам проекта"] = Field(
+        default="Анализ территории проекта",
+        examples=["Анализ территории проекта"],
+        description="Scenario analyses mode, used with scenario_id",
+    )
+    federated_indexes: list[str] = Field(
+        default_factory=list,
+        max_length=5,
+        examples=[["Общее"]],
+        description="Additional indexes searched together with the target index, "
+        "names as in index_name or scenario indexes as '<scenario_id>&<mode>'",
+    )
+    profile: str | None = Field(
+        default=None,
+        examples=["fast"],
+        description="Generation profile name, configured profile for index or "
+        "mode is used if not set",
+    )
+    concurrency: int | None = Field(
+        default=None,
+        ge=1,
+        le=32,
+        examples=[4],
+        description="Max number of concurrent LLM requests, "
+        "BATCH_LLM_CONCURRENCY is used if not set",
+    )
+
+    @field_validator("index_name", mode="after")
+    @classmethod
+    def validate_index(cls, value: str) -> str:
+        return resolve_index_name(value)
+
+    @field_validator("federated_indexes", mode="after")
+    @classmethod
+    def validate_federated_indexes(cls, value: list[str]) -> list[str]:
+        return resolve_federated_indexes(value)
+
+    def get_mode_index(self) -> str:
+
+        match self.mode:
+            case "Анализ по объектам проекта":
+                return "analyze"
+            case "Анализ территории проекта":
+                return "general"
+            case _:
+                raise Exception("Pydantic validation failed")
+
+    def get_target_index(self) -> str:
+        """Index to answer from: scenario index or ``index_name``."""
+
+        if self.scenario_id is None:
+            return self.index_name
+        if self.scenario_id in (758, 10078):
+            return f"moscow&{self.scenario_id}"
+        return f"{self.scenario_id}&{self.get_mode_index()}"
@@ -3,6 +3,7 @@ from typing import Literal
 from pydantic import Field, model_validator
 
 from src.common.exceptions.http_exception import http_exception
+from src.elastic.dto.geo_filter_dto import GeoFilterDTO
 
 from .base_request_dto import BaseLlmRequest
 
@@ -22,6 +23,12 @@ class ScenarioRequestDTO(BaseLlmRequest):
         examples=["1474596"],
         description="Object ID from Urban API to retrieve data on",
     )
+    geo_filter: GeoFilterDTO | None = Field(
+        default=None,
+        examples=[{"point": [30.3, 59.93], "radius": 500}],
+        description="Area to search project objects in, not available for "
+        "'Анализ территории проекта' mode",
+    )
 
     @model_validator(mode="after")
     def validate_fields(self):
@@ -40,6 +47,14 @@ class ScenarioRequestDTO(BaseLlmRequest):
                 _input={"mode": self.mode, "object_id": self.object_id},
                 _detail={"request_params": self.model_dump_json()},
             )
+        if self.geo_filter is not None and self.get_mode_index() != "analyze":
+            raise http_exception(
+                400,
+                "Geo filter is available only for objects analyses modes",
+                _input={"mode": self.mode, "geo_filter": self.geo_filter.model_dump()},
+                _detail={"request_params": self.model_dump_json()},
+            )
+        return self
 
     def get_mode_index(self) -> str:
 
@@ -1,3 +1,4 @@
+from fastapi import HTTPException
 from pydantic import ValidationError
 
 from src.common.exceptions.http_exception import http_exception
@@ -12,6 +13,9 @@ def validate_in_order(message_info: dict):
     errors = []
     try:
         return ScenarioRequestDTO(**message_info)
+    except HTTPException:
+        # scenario request with invalid field combination, not a simple one
+        raise
     except Exception as e:
         if (
             message_info.get("object_id") is None
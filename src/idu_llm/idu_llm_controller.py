@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import Annotated, AsyncIterable, NoReturn
 
@@ -5,25 +6,87 @@ from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
+    Query,
     WebSocket,
     WebSocketException,
     status,
 )
+from fastapi.responses import StreamingResponse
 from fastapi.sse import EventSourceResponse, ServerSentEvent
 from loguru import logger
 
-from src.dependencies import idu_llm_client
+from src.common.exceptions.upstream_unavailable_error import UpstreamUnavailableError
+from src.common.geo.layer_encoder import LayerEncoder
+from src.dependencies import IduLLMServiceDep, LayerEncoderDep
 
 from .dto.base_request_dto import BaseLlmRequest
+from .dto.batch_request_dto import BatchLlmRequest
 from .dto.scenario_request_dto import ScenarioRequestDTO
 from .dto.validate_in_order import validate_in_order
 
 idu_llm_router = APIRouter()
 
+UNAVAILABLE_MESSAGE = "Сервис временно недоступен, повторите запрос позже"
+
+
+async def send_unavailable(websocket: WebSocket, error: UpstreamUnavailableError):
+    """Report upstream outage to the client and close with 1013 (Try Again
+    Later) instead of an internal error."""
+
+    logger.warning(error)
+    await websocket.send_text(
+        json.dumps(
+            {
+                "type": "status",
+                "status": "unavailable",
+                "service": error.service,
+                "chunk": UNAVAILABLE_MESSAGE,
+            }
+        )
+    )
+    await websocket.close(code=1013, reason=f"{error.service} unavailable")
+
+
+async def send_feature_collections(
+    websocket: WebSocket,
+    layers: list[dict],
+    message_info: BaseLlmRequest,
+    layer_encoder: LayerEncoder,
+):
+    """Send map layers in the encoding requested by the client. For ``gzip``
+    a ``feature_collections`` header with compressed sizes is followed by one
+    binary message with gzip compressed json per layer."""
+
+    if message_info.layer_encoding == "gzip":
+        frames = await asyncio.to_thread(
+            lambda: [
+                layer_encoder.encode(layer, message_info.map_zoom) for layer in layers
+            ]
+        )
+        await websocket.send_text(
+            json.dumps(
+                {
+                    "type": "feature_collections",
+                    "encoding": "gzip",
+                    "sizes": [len(frame) for frame in frames],
+                }
+            )
+        )
+        for frame in frames:
+            await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(
+            json.dumps(
+                {"type": "feature_collections", "chunk": layers},
+                separators=(",", ":"),
+            )
+        )
+
 
 @idu_llm_router.post("/generate")
 async def generate(
     message_info: BaseLlmRequest | ScenarioRequestDTO,
+    idu_llm_client: IduLLMServiceDep,
 ):
     """
     Main function to generate response through bot api
@@ -38,15 +101,33 @@ async def generate(
     """
 
     if isinstance(message_info, BaseLlmRequest):
+        await idu_llm_client.resolve_indexes(message_info)
         response = await idu_llm_client.generate_response(message_info)
         return response
     else:
-        raise HTTPException(422, detail={"message": "Only BaseLlmRequest is suppoerted for generate via post."})
+        raise HTTPException(
+            422,
+            detail={
+                "message": "Only BaseLlmRequest is suppoerted for generate via post."
+            },
+        )
+
+
+async def resolve_stream_request(
+    message_info: Annotated[BaseLlmRequest, Query()],
+    idu_llm_client: IduLLMServiceDep,
+) -> BaseLlmRequest:
+    """Query request with resolved index names, resolved before the stream
+    is started so unknown indexes are rejected with 400."""
+
+    await idu_llm_client.resolve_indexes(message_info)
+    return message_info
 
 
 @idu_llm_router.get("/stream/generate", response_class=EventSourceResponse)
 async def generate_stream_response(
-    message_info: Annotated[BaseLlmRequest, Depends(BaseLlmRequest)],
+    message_info: Annotated[BaseLlmRequest, Depends(resolve_stream_request)],
+    idu_llm_client: IduLLMServiceDep,
 ) -> AsyncIterable:
     """
     Min function to generate response through bot api.
@@ -56,34 +137,83 @@ async def generate_stream_response(
         response (EventSourceResponse): Sse stream response.
     """
 
-    async for chunk in idu_llm_client.generate_simple_stream_response(message_info):
-        if isinstance(chunk, bool):
-            yield {"type": "chunk", "content": {"text": "", "done": chunk}}
-        else:
-            if chunk["type"] == "status":
-                yield {
-                    "type": "status",
-                    "content": {"status": "generation", "text": chunk["chunk"]},
-                }
+    try:
+        async for chunk in idu_llm_client.generate_simple_stream_response(message_info):
+            if isinstance(chunk, bool):
+                yield {"type": "chunk", "content": {"text": "", "done": chunk}}
             else:
-                yield {
-                    "type": "chunk",
-                    "content": {"text": chunk["chunk"], "done": False},
-                }
+                if chunk["type"] == "status":
+                    yield {
+                        "type": "status",
+                        "content": {
+                            "status": chunk.get("status", "generation"),
+                            "text": chunk["chunk"],
+                        },
+                    }
+                else:
+                    yield {
+                        "type": "chunk",
+                        "content": {"text": chunk["chunk"], "done": False},
+                    }
+    except UpstreamUnavailableError as e:
+        logger.warning(e)
+        yield {
+            "type": "status",
+            "content": {"status": "unavailable", "text": UNAVAILABLE_MESSAGE},
+        }
+
+
+@idu_llm_router.post("/batch/generate")
+async def generate_batch(
+    request: BatchLlmRequest, idu_llm_client: IduLLMServiceDep
+) -> StreamingResponse:
+    """
+    Answer a batch of questions for offline evaluation or bulk FAQ generation.
+    Args:
+        request (BatchLlmRequest): Questions and index or scenario to answer from.
+    Returns:
+        response (StreamingResponse): NDJSON stream with one result per question
+        in completion order, ``index`` is the position of the question in the
+        request.
+    """
+
+    await idu_llm_client.resolve_indexes(request)
+    results = idu_llm_client.generate_batch_responses(request)
+    # embedding and search errors are raised before the response is started
+    first = await anext(results)
+
+    async def stream() -> AsyncIterable[str]:
+        yield json.dumps(first, ensure_ascii=False) + "\n"
+        async for result in results:
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
 
 @idu_llm_router.websocket("/ws/test/generate")
-async def websocket_test_transport_endpoint(websocket: WebSocket) -> NoReturn:
+async def websocket_test_transport_endpoint(
+    websocket: WebSocket,
+    idu_llm_client: IduLLMServiceDep,
+    layer_encoder: LayerEncoderDep,
+) -> NoReturn:
     """WebSocket endpoint for the test transport index. Streams status and text
     chunks and returns the isochrone geojson layer when relevant.
 
-    Expected incoming JSON: ``{"user_request": "<question>"}``.
+    Expected incoming JSON: ``{"user_request": "<question>"}`` with optional
+    ``profile``, ``stream_thinking``, ``map_zoom`` and ``layer_encoding``
+    fields.
     """
 
     await websocket.accept()
     try:
         request = await websocket.receive_json()
-        message_info = BaseLlmRequest(user_request=request["user_request"])
+        message_info = BaseLlmRequest(
+            user_request=request["user_request"],
+            profile=request.get("profile"),
+            stream_thinking=request.get("stream_thinking", False),
+            map_zoom=request.get("map_zoom"),
+            layer_encoding=request.get("layer_encoding", "json"),
+        )
         async for chunk in idu_llm_client.generate_test_transport_stream_response(
             message_info
         ):
@@ -92,13 +222,13 @@ async def websocket_test_transport_endpoint(websocket: WebSocket) -> NoReturn:
             elif isinstance(chunk, dict):
                 await websocket.send_text(json.dumps(chunk))
             elif isinstance(chunk, list):
-                await websocket.send_text(
-                    json.dumps({"type": "feature_collections", "chunk": chunk})
+                await send_feature_collections(
+                    websocket, chunk, message_info, layer_encoder
                 )
             elif isinstance(chunk, str) and chunk:
-                await websocket.send_text(
-                    json.dumps({"type": "text", "chunk": chunk})
-                )
+                await websocket.send_text(json.dumps({"type": "text", "chunk": chunk}))
+    except UpstreamUnavailableError as e:
+        await send_unavailable(websocket, e)
     except HTTPException as http_e:
         logger.exception(http_e)
         if http_e.status_code == 400:
@@ -112,7 +242,11 @@ async def websocket_test_transport_endpoint(websocket: WebSocket) -> NoReturn:
 
 
 @idu_llm_router.websocket("/ws/generate")
-async def websocket_llm_endpoint(websocket: WebSocket) -> NoReturn:
+async def websocket_llm_endpoint(
+    websocket: WebSocket,
+    idu_llm_client: IduLLMServiceDep,
+    layer_encoder: LayerEncoderDep,
+) -> NoReturn:
     """
     WebSocket endpoint to generate response through bot api
 
@@ -129,6 +263,7 @@ async def websocket_llm_endpoint(websocket: WebSocket) -> NoReturn:
     try:
         request = await websocket.receive_json()
         message_info = validate_in_order(request)
+        await idu_llm_client.resolve_indexes(message_info)
         if message_info.index_name == "project":
             async for text in idu_llm_client.generate_scenario_stream_response(
                 message_info
@@ -142,8 +277,8 @@ async def websocket_llm_endpoint(websocket: WebSocket) -> NoReturn:
                                 json.dumps({"type": "text", "chunk": text})
                             )
                     elif isinstance(text, list):
-                        await websocket.send_text(
-                            json.dumps({"type": "feature_collections", "chunk": text})
+                        await send_feature_collections(
+                            websocket, text, message_info, layer_encoder
                         )
                 else:
                     await websocket.close(1000, "Stream ended")
@@ -158,6 +293,8 @@ async def websocket_llm_endpoint(websocket: WebSocket) -> NoReturn:
                         continue
                 else:
                     await websocket.close(1000, "Stream ended")
+    except UpstreamUnavailableError as e:
+        await send_unavailable(websocket, e)
     except HTTPException as http_e:
         logger.exception(http_e)
         if http_e.status_code == 400:
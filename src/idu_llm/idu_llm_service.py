@@ -1,16 +1,25 @@
-import json
+import asyncio
 from typing import AsyncIterator
 
-import requests
+from fastapi import HTTPException
 from loguru import logger
 
+from src.common.constants.generation_profiles import (
+    SCENARIO_ANALYZE_TARGET,
+    SCENARIO_GENERAL_TARGET,
+    SCENARIO_OBJECT_TARGET,
+)
 from src.common.constants.index_mapper import TEST_TRANSPORT_INDEX
 from src.common.exceptions.http_exception import http_exception
+from src.common.exceptions.upstream_unavailable_error import UpstreamUnavailableError
+from src.common.geo.feature_collection_shaper import FeatureCollectionShaper
 from src.elastic.elastic_service import ElasticService
 from src.llm.llm_service import LlmService
+from src.reranker.reranker_service import RerankerService
 from src.vectorizer.vectorizer_service import VectorizerService
 
 from .dto.base_request_dto import BaseLlmRequest
+from .dto.batch_request_dto import BatchLlmRequest
 from .dto.scenario_request_dto import ScenarioRequestDTO
 
 
@@ -21,15 +30,102 @@ class IduLLMService:
         llm_service: LlmService,
         elastic_client: ElasticService,
         vectorizer_model: VectorizerService,
+        feature_collection_shaper: FeatureCollectionShaper,
+        batch_concurrency: int = 4,
+        batch_embed_size: int = 32,
+        reranker: RerankerService | None = None,
     ):
 
         self.llm_service = llm_service
         self.elastic_client = elastic_client
         self.vectorizer_model = vectorizer_model
+        self.feature_collection_shaper = feature_collection_shaper
+        self.batch_concurrency = batch_concurrency
+        self.batch_embed_size = batch_embed_size
+        self.reranker = reranker
+
+    async def shape_feature_collections(
+        self, layers: list[tuple[dict, dict]], zoom: int | None
+    ) -> list[dict]:
+        """Shape ``(feature_collection, source)`` layers for the map in a
+        worker thread, geometry simplification is cpu bound."""
+
+        return await asyncio.to_thread(
+            lambda: [
+                self.feature_collection_shaper.shape(fc, zoom, source)
+                for fc, source in layers
+            ]
+        )
+
+    async def rerank_hits(self, question: str, hits: list[dict]) -> list[dict]:
+        """Best hits for the context by the reranker, unchanged hits without
+        one."""
+
+        if self.reranker is None:
+            return hits
+        return await asyncio.to_thread(self.reranker.rerank, question, hits)
+
+    def format_federated_context(self, hits: list[dict]) -> str:
+        """Context of federated search hits tagged with the source index."""
+
+        index_mapper = self.elastic_client.index_mapper
+        return ";".join(
+            f"[{index_mapper.get(hit['source_index'], hit['source_index'])}] "
+            + hit["_source"]["body"].rstrip()
+            for hit in hits
+        )
+
+    async def resolve_indexes(
+        self, message_info: BaseLlmRequest | BatchLlmRequest
+    ) -> None:
+        """Resolve request index names the validator didn't find in the local
+        index mapper, raises 400 for unknown ones."""
+
+        message_info.index_name = await self.elastic_client.resolve_index_name(
+            message_info.index_name
+        )
+        message_info.federated_indexes = (
+            await self.elastic_client.resolve_federated_indexes(
+                message_info.federated_indexes
+            )
+        )
+
+    async def search_context(
+        self, embedding: list, message_info: BaseLlmRequest
+    ) -> str:
+        """Context from ``index_name``, searched together with
+        ``federated_indexes`` in one request when they are set."""
+
+        if message_info.federated_indexes:
+            hits = await self.elastic_client.search_federated(
+                self.elastic_client.get_federated_searches(
+                    embedding,
+                    list(
+                        dict.fromkeys(
+                            [message_info.index_name, *message_info.federated_indexes]
+                        )
+                    ),
+                ),
+                self.elastic_client.get_federated_size(),
+            )
+            return self.format_federated_context(
+                await self.rerank_hits(message_info.user_request, hits)
+            )
+        elastic_response = await self.elastic_client.search(
+            embedding, message_info.index_name
+        )
+        hits = await self.rerank_hits(
+            message_info.user_request, elastic_response["hits"]["hits"]
+        )
+        return ";".join([resp["_source"]["body"].rstrip() for resp in hits])
 
     async def generate_response(self, message_info: BaseLlmRequest) -> str:
         try:
-            embedding = self.vectorizer_model.embed(message_info.user_request)
+            embedding = await self.vectorizer_model.embed_async(
+                message_info.user_request
+            )
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             raise http_exception(
                 500,
@@ -38,9 +134,7 @@ class IduLLMService:
                 _detail=e.__str__(),
             )
         try:
-            elastic_response = await self.elastic_client.search(
-                embedding, message_info.index_name
-            )
+            context = await self.search_context(embedding, message_info)
         except Exception as e:
             raise http_exception(
                 500,
@@ -51,21 +145,18 @@ class IduLLMService:
                 },
                 _detail=e.__str__(),
             )
-        context = ";".join(
-            [
-                resp["_source"]["body"].rstrip()
-                for resp in elastic_response["hits"]["hits"]
-            ]
+        profile = self.llm_service.get_generation_profile(
+            message_info.index_name, message_info.profile
         )
         headers, data = await self.llm_service.generate_request_data(
-            message_info.user_request, context, False
+            message_info.user_request, context, False, profile
         )
         try:
-            llm_response = requests.post(
-                f"{self.llm_service.url}/api/generate",
-                headers=headers,
-                data=json.dumps(data),
+            return await asyncio.to_thread(
+                self.llm_service.generate_completion, headers, data
             )
+        except (HTTPException, UpstreamUnavailableError):
+            raise
         except Exception as e:
             raise http_exception(
                 500,
@@ -79,27 +170,41 @@ class IduLLMService:
                 },
                 _detail=e.__str__(),
             )
-        if llm_response.status_code != 200:
-            raise http_exception(
-                llm_response.status_code,
-                "Error during generating llm request",
-                _input={
-                    "message_info.user_request": message_info.user_request,
-                    "embedding": embedding,
-                    "context": context,
-                    "llm_request_headers": headers,
-                    "formed_data": data,
-                },
-                _detail=llm_response.text,
-            )
-        return llm_response.json()
+
+    async def stream_answer(
+        self, headers: dict, data: dict, stream_thinking: bool
+    ) -> AsyncIterator[dict | bool]:
+        """Stream llm answer as text chunks. Model reasoning is either streamed as
+        ``thinking`` status chunks or reported once with a single status, so the
+        client is not left waiting through a silent reasoning phase."""
+
+        thinking_reported = False
+        async for chunk in self.llm_service.aiter_generation(headers, data):
+            if chunk["done"]:
+                yield False
+            elif chunk.get("thinking"):
+                if stream_thinking:
+                    yield {
+                        "type": "status",
+                        "status": "thinking",
+                        "chunk": chunk["thinking"],
+                    }
+                elif not thinking_reported:
+                    thinking_reported = True
+                    yield {"type": "status", "chunk": "Обдумывание ответа"}
+            else:
+                yield {"type": "text", "chunk": chunk["response"]}
 
     async def generate_simple_stream_response(
         self, message_info: BaseLlmRequest
     ) -> AsyncIterator[str | bool | list | dict]:
         try:
-            embedding = self.vectorizer_model.embed(message_info.user_request)
+            embedding = await self.vectorizer_model.embed_async(
+                message_info.user_request
+            )
             yield {"type": "status", "chunk": "Подготовка контекста"}
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             raise http_exception(
                 500,
@@ -108,9 +213,7 @@ class IduLLMService:
                 _detail=e.__str__(),
             )
         try:
-            elastic_response = await self.elastic_client.search(
-                embedding, message_info.index_name
-            )
+            context = await self.search_context(embedding, message_info)
             yield {"type": "status", "chunk": "Анализ контекста"}
         except Exception as e:
             raise http_exception(
@@ -122,28 +225,16 @@ class IduLLMService:
                 },
                 _detail=e.__str__(),
             )
-        context = ";".join(
-            [
-                resp["_source"]["body"].rstrip()
-                for resp in elastic_response["hits"]["hits"]
-            ]
+        profile = self.llm_service.get_generation_profile(
+            message_info.index_name, message_info.profile
         )
         headers, data = await self.llm_service.generate_request_data(
-            message_info.user_request, context, True
+            message_info.user_request, context, True, profile
         )
-        with requests.post(
-            f"{self.llm_service.url}/api/generate",
-            headers=headers,
-            data=json.dumps(data),
-            stream=True,
-        ) as response:
-            if response.status_code == 200:
-                for chunk in response.iter_content(chunk_size=512 * 1024):
-                    chunk = json.loads(chunk)
-                    if not chunk["done"]:
-                        yield {"type": "text", "chunk": chunk["response"]}
-                    else:
-                        yield False
+        async for chunk in self.stream_answer(
+            headers, data, message_info.stream_thinking
+        ):
+            yield chunk
 
     async def generate_test_transport_stream_response(
         self, message_info: BaseLlmRequest
@@ -154,8 +245,12 @@ class IduLLMService:
 
         index_name = TEST_TRANSPORT_INDEX
         try:
-            embedding = self.vectorizer_model.embed(message_info.user_request)
+            embedding = await self.vectorizer_model.embed_async(
+                message_info.user_request
+            )
             yield {"type": "status", "chunk": "Подготовка контекста"}
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             logger.error(e)
             raise http_exception(
@@ -179,11 +274,16 @@ class IduLLMService:
                 _detail=e.__str__(),
             )
 
-        context = ";".join([hit["_source"]["body"].rstrip() for hit in hits])
+        context = ";".join(
+            [
+                hit["_source"]["body"].rstrip()
+                for hit in await self.rerank_hits(message_info.user_request, hits)
+            ]
+        )
 
         # Only chunks that carry a feature_collection contribute a layer.
         # De-duplicate identical layers matched via several question chunks.
-        feature_collections = []
+        layers = []
         seen_layers = set()
         for hit in hits:
             fc = hit["_source"].get("feature_collection")
@@ -193,25 +293,31 @@ class IduLLMService:
             if layer_key in seen_layers:
                 continue
             seen_layers.add(layer_key)
-            feature_collections.append(fc)
-        yield feature_collections
+            layers.append(
+                (
+                    fc,
+                    {
+                        "index": index_name,
+                        "version": hit.get("_index"),
+                        "doc_id": hit["_id"],
+                    },
+                )
+            )
+        yield await self.shape_feature_collections(layers, message_info.map_zoom)
 
+        profile = self.llm_service.get_generation_profile(
+            index_name, message_info.profile
+        )
         headers, data = await self.llm_service.generate_request_data(
-            message_info.user_request, context, True
+            message_info.user_request, context, True, profile
         )
-        with requests.post(
-            f"{self.llm_service.url}/api/generate",
-            headers=headers,
-            data=json.dumps(data),
-            stream=True,
-        ) as response:
-            if response.status_code == 200:
-                for chunk in response.iter_content(chunk_size=512 * 1024):
-                    chunk = json.loads(chunk)
-                    if not chunk["done"]:
-                        yield chunk["response"]
-                    else:
-                        yield False
+        async for chunk in self.stream_answer(
+            headers, data, message_info.stream_thinking
+        ):
+            if isinstance(chunk, dict) and chunk["type"] == "text":
+                yield chunk["chunk"]
+            else:
+                yield chunk
 
     async def generate_scenario_stream_response(
         self, message_info: ScenarioRequestDTO
@@ -221,8 +327,12 @@ class IduLLMService:
         else:
             index_name = f"{message_info.scenario_id}&{message_info.get_mode_index()}"
         try:
-            embedding = self.vectorizer_model.embed(message_info.user_request)
+            embedding = await self.vectorizer_model.embed_async(
+                message_info.user_request
+            )
             yield {"type": "status", "chunk": "Подготовка контекста"}
+        except UpstreamUnavailableError:
+            raise
         except Exception as e:
             logger.error(e)
             raise http_exception(
@@ -231,10 +341,37 @@ class IduLLMService:
                 _input=message_info.user_request,
                 _detail=e.__str__(),
             )
+        geo_query = (
+            message_info.geo_filter.to_query() if message_info.geo_filter else None
+        )
+        federated_hits = None
         try:
-            elastic_response = await self.elastic_client.search_scenario(
-                embedding, index_name, message_info.object_id
-            )
+            if message_info.federated_indexes:
+                federated_hits = await self.elastic_client.search_federated(
+                    [
+                        (
+                            index_name,
+                            self.elastic_client.get_scenario_search_body(
+                                embedding, message_info.object_id, geo_query
+                            ),
+                        ),
+                        *self.elastic_client.get_federated_searches(
+                            embedding,
+                            [
+                                i
+                                for i in message_info.federated_indexes
+                                if i != index_name
+                            ],
+                        ),
+                    ]
+                )
+                elastic_response = [
+                    hit for hit in federated_hits if hit["source_index"] == index_name
+                ]
+            else:
+                elastic_response = await self.elastic_client.search_scenario(
+                    embedding, index_name, message_info.object_id, geo_query
+                )
             yield {"type": "status", "chunk": "Анализ контекста"}
         except Exception as e:
             logger.error(e)
@@ -247,61 +384,201 @@ class IduLLMService:
                 },
                 _detail=e.__str__(),
             )
-        if message_info.get_mode_index() == "analyze":
+        if federated_hits is not None:
+            context = self.format_federated_context(
+                await self.rerank_hits(
+                    message_info.user_request,
+                    federated_hits[: self.elastic_client.get_federated_size()],
+                )
+            )
+        elif message_info.get_mode_index() == "analyze":
             context = ";".join(
-                [resp["_source"]["body"].rstrip() for resp in elastic_response]
+                [
+                    resp["_source"]["body"].rstrip()
+                    for resp in await self.rerank_hits(
+                        message_info.user_request, elastic_response
+                    )
+                ]
             )
         else:
             context = ";".join(
-                [resp["_source"]["body"].rstrip() for resp in elastic_response]
+                [
+                    resp["_source"]["body"].rstrip()
+                    for resp in await self.rerank_hits(
+                        message_info.user_request, elastic_response
+                    )
+                ]
             )
         if message_info.get_mode_index() == "general":
-            feature_collections = [
-                resp["_source"]["feature_collection"]
-                for resp in elastic_response
-                if resp["_source"].get("feature_collection")
-            ]
+            feature_collections = await self.shape_feature_collections(
+                [
+                    (
+                        resp["_source"]["feature_collection"],
+                        {
+                            "index": index_name,
+                            "version": resp.get("_index"),
+                            "doc_id": resp["_id"],
+                        },
+                    )
+                    for resp in elastic_response
+                    if resp["_source"].get("feature_collection")
+                ],
+                message_info.map_zoom,
+            )
         elif message_info.get_mode_index() == "analyze" and message_info.object_id:
             feature_collections = None
         else:
             features = [
                 {
                     "type": "Feature",
+                    "id": resp["_id"],
                     "geometry": resp["_source"]["location"],
                     "properties": resp["_source"]["properties"],
                 }
                 for resp in elastic_response
             ]
-            feature_collections = [{"type": "FeatureCollection", "features": features}]
+            feature_collections = await self.shape_feature_collections(
+                [
+                    (
+                        {"type": "FeatureCollection", "features": features},
+                        {"index": index_name},
+                    )
+                ],
+                message_info.map_zoom,
+            )
         yield feature_collections
 
         if "general" in index_name:
+            profile = self.llm_service.get_generation_profile(
+                SCENARIO_GENERAL_TARGET, message_info.profile
+            )
             headers, data = (
                 await self.llm_service.generate_general_scenario_request_data(
-                    message_info.user_request, context, True
+                    message_info.user_request, context, True, profile
                 )
             )
         else:
             if message_info.object_id:
+                profile = self.llm_service.get_generation_profile(
+                    SCENARIO_OBJECT_TARGET, message_info.profile
+                )
                 headers, data = (
                     await self.llm_service.generate_object_scenario_request_data(
-                        message_info.user_request, context, True
+                        message_info.user_request, context, True, profile
                     )
                 )
             else:
-                headers, data = await self.llm_service.generate_scenario_request_data(
-                    message_info.user_request, context, True
+                profile = self.llm_service.get_generation_profile(
+                    SCENARIO_ANALYZE_TARGET, message_info.profile
                 )
-        with requests.post(
-            f"{self.llm_service.url}/api/generate",
-            headers=headers,
-            data=json.dumps(data),
-            stream=True,
-        ) as response:
-            if response.status_code == 200:
-                for chunk in response.iter_content(chunk_size=512 * 1024):
-                    chunk = json.loads(chunk)
-                    if not chunk["done"]:
-                        yield chunk["response"]
-                    else:
-                        yield False
+                headers, data = (
+                    await self.llm_service.generate_analyze_scenario_request_data(
+                        message_info.user_request, context, True, profile
+                    )
+                )
+        async for chunk in self.stream_answer(
+            headers, data, message_info.stream_thinking
+        ):
+            if isinstance(chunk, dict) and chunk["type"] == "text":
+                yield chunk["chunk"]
+            else:
+                yield chunk
+
+    async def generate_batch_request_data(
+        self, target: str, question: str, context: str, profile_name: str | None
+    ) -> tuple[dict, dict]:
+        """Non-streaming request data with the prompt of the target index."""
+
+        if "&" in target and "general" in target:
+            profile = self.llm_service.get_generation_profile(
+                SCENARIO_GENERAL_TARGET, profile_name
+            )
+            return await self.llm_service.generate_general_scenario_request_data(
+                question, context, False, profile
+            )
+        if "&" in target:
+            profile = self.llm_service.get_generation_profile(
+                SCENARIO_ANALYZE_TARGET, profile_name
+            )
+            return await self.llm_service.generate_analyze_scenario_request_data(
+                question, context, False, profile
+            )
+        profile = self.llm_service.get_generation_profile(target, profile_name)
+        return await self.llm_service.generate_request_data(
+            question, context, False, profile
+        )
+
+    async def generate_batch_responses(
+        self, request: BatchLlmRequest
+    ) -> AsyncIterator[dict]:
+        """Answer a batch of questions: embeddings are requested in batches,
+        contexts for all questions are searched in one msearch request and
+        answers are generated with at most ``concurrency`` LLM requests at a
+        time. Results are yielded as they complete, failed questions are
+        reported with ``error`` instead of failing the batch.
+
+        Yields:
+            dict: ``index`` of the question in the request, ``question``,
+            ``answer``, ``sources`` and ``error``.
+        """
+
+        target = request.get_target_index()
+        names = list(dict.fromkeys([target, *request.federated_indexes]))
+        embeddings = []
+        for start in range(0, len(request.questions), self.batch_embed_size):
+            embeddings += await self.vectorizer_model.embed_batch_async(
+                request.questions[start : start + self.batch_embed_size]
+            )
+        hits = await self.elastic_client.search_federated_batch(
+            [
+                self.elastic_client.get_federated_searches(embedding, names)
+                for embedding in embeddings
+            ],
+            self.elastic_client.get_federated_size(),
+        )
+        semaphore = asyncio.Semaphore(request.concurrency or self.batch_concurrency)
+
+        async def answer(index: int, question: str, question_hits: list[dict]):
+            question_hits = await self.rerank_hits(question, question_hits)
+            result = {
+                "index": index,
+                "question": question,
+                "answer": None,
+                "sources": [
+                    {
+                        "index": hit["source_index"],
+                        "id": hit["_id"],
+                        "score": hit["normalized_score"],
+                        "rerank_score": hit.get("rerank_score"),
+                    }
+                    for hit in question_hits
+                ],
+                "error": None,
+            }
+            try:
+                headers, data = await self.generate_batch_request_data(
+                    target,
+                    question,
+                    self.format_federated_context(question_hits),
+                    request.profile,
+                )
+                async with semaphore:
+                    result["answer"] = await self.llm_service.generate_response(
+                        headers, data
+                    )
+            except Exception as e:
+                logger.warning(f"Batch question {index} failed: {e!r}")
+                result["error"] = (
+                    e.detail if isinstance(e, HTTPException) else e.__str__()
+                )
+            return result
+
+        for future in asyncio.as_completed(
+            [
+                answer(index, question, question_hits)
+                for index, (question, question_hits) in enumerate(
+                    zip(request.questions, hits)
+                )
+            ]
+        ):
+            yield await future
@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+
+
+class GenerationProfile(BaseModel):
+
+    think: bool = Field(description="Enable model reasoning phase before the answer")
+    num_predict: int = Field(description="Max number of tokens to generate")
+    temperature: float = Field(description="Sampling temperature")
+    stop: list[str] = Field(default_factory=list, description="Stop sequences")
+
+    def to_request_data(self) -> dict:
+        """Ollama ``/api/generate`` fields controlled by the profile."""
+
+        options = {"temperature": self.temperature, "num_predict": self.num_predict}
+        if self.stop:
+            options["stop"] = self.stop
+        return {"think": self.think, "options": options}
@@ -0,0 +1,88 @@
+import json
+import string
+
+from src.common.config.config import Config, get_optional
+from src.common.constants.question_templates import question_templates
+
+
+class TemplateQuestionGenerator:
+    """Deterministic questions for structured scenario objects built from
+    row ``properties`` with templates per object type, an alternative to
+    ``LlmService.generate_text_description`` for analyze mode uploads."""
+
+    def __init__(self, templates: dict[str, list[str]]):
+
+        self.templates = templates
+        self._fields = {
+            template: [
+                field
+                for _, field, _, _ in string.Formatter().parse(template)
+                if field is not None
+            ]
+            for type_templates in templates.values()
+            for template in type_templates
+        }
+
+    @classmethod
+    def from_config(cls, config: Config) -> "TemplateQuestionGenerator":
+
+        return cls(
+            {
+                **question_templates,
+                **json.loads(get_optional(config, "QUESTION_TEMPLATES") or "{}"),
+            }
+        )
+
+    @staticmethod
+    def get_names(items: list | None, type_field: str) -> str:
+
+        names = []
+        for item in items or []:
+            name = item.get("name") or (item.get(type_field) or {}).get("name")
+            if name and name not in names:
+                names.append(name)
+        return ", ".join(names)
+
+    @staticmethod
+    def get_fields(properties: dict) -> dict[str, str]:
+        """Template fields of the object, empty values are left out."""
+
+        fields = {
+            key: str(value)
+            for key, value in properties.items()
+            if isinstance(value, (str, int, float)) and value != ""
+        }
+        physical_objects = properties.get("physical_objects") or []
+        fields["physical_objects"] = TemplateQuestionGenerator.get_names(
+            physical_objects, "physical_object_type"
+        )
+        fields["services"] = TemplateQuestionGenerator.get_names(
+            properties.get("services"), "service_type"
+        )
+        floors = [
+            str(i["building"]["floors"])
+            for i in physical_objects
+            if (i.get("building") or {}).get("floors")
+        ]
+        fields["floors"] = ", ".join(floors)
+        if "physical_object_type" in properties:
+            fields["object_type"] = fields.get("physical_object_type", "")
+        elif fields["physical_objects"]:
+            fields["object_type"] = fields["physical_objects"]
+        return {key: value for key, value in fields.items() if value}
+
+    def generate(self, properties: dict | None, num_questions: int) -> list[str]:
+        """Up to ``num_questions`` questions, type specific templates first."""
+
+        fields = self.get_fields(properties or {})
+        type_templates = self.templates.get(fields.get("object_type"), [])
+        templates = type_templates + [
+            i for i in self.templates.get("default", []) if i not in type_templates
+        ]
+        questions = []
+        for template in templates:
+            if all(field in fields for field in self._fields[template]):
+                questions.append(template.format_map(fields))
+            if len(questions) == num_questions:
+                break
+        return questions
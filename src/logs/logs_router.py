@@ -1,13 +1,20 @@
+import asyncio
+from datetime import datetime
+from typing import AsyncIterable, Literal
+
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import FileResponse
+from fastapi.sse import EventSourceResponse
 
-from src.dependencies import logs_service
+from src.dependencies import LogsServiceDep
 
 logs_router = APIRouter(prefix="/logs", tags=["logs"])
 
+LogLevel = Literal["TRACE", "DEBUG", "INFO", "SUCCESS", "WARNING", "ERROR", "CRITICAL"]
+
 
 @logs_router.get("/file")
-async def get_logs_file():
+async def get_logs_file(logs_service: LogsServiceDep):
     """
     Get service logs as file
     """
@@ -19,12 +26,34 @@ async def get_logs_file():
 
 
 @logs_router.get("/log")
-async def get_logs(length: int):
+async def get_logs(
+    length: int,
+    logs_service: LogsServiceDep,
+    level: LogLevel | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+):
     """
-    Get service logs by length
+    Get last ``length`` lines of service logs, optionally only records with at
+    least ``level`` written between ``since`` and ``until``
     """
 
     try:
-        return logs_service.get_logs(length)
+        return await asyncio.to_thread(
+            logs_service.get_logs, length, level, since, until
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=repr(e)) from e
+
+
+@logs_router.get("/follow", response_class=EventSourceResponse)
+async def follow_logs(
+    logs_service: LogsServiceDep, length: int = 0, level: LogLevel | None = None
+) -> AsyncIterable[str]:
+    """
+    Stream service logs as server-sent events: last ``length`` lines, then
+    lines of new records with at least ``level`` as they are written
+    """
+
+    async for line in logs_service.follow(length, level):
+        yield line
@@ -1,14 +1,32 @@
-from collections import deque
+import asyncio
+import os
+import re
+from datetime import datetime
 from pathlib import Path
+from typing import AsyncIterator, Iterator
 
 from loguru import logger
 
+# header of a record written with the format of ``init_logs``, following
+# lines without it (tracebacks) belong to the same record
+RECORD_PATTERN = re.compile(
+    r"^(?P<time>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) \| (?P<level>\w+) \|"
+)
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 
 class LogsService:
 
-    def __init__(self, logs_file_path: Path):
+    def __init__(
+        self,
+        logs_file_path: Path,
+        block_size: int = 64 * 1024,
+        follow_interval: float = 0.5,
+    ):
 
         self.logs_file_path = logs_file_path
+        self.block_size = block_size
+        self.follow_interval = follow_interval
 
     def check_file(self):
 
@@ -41,9 +59,133 @@ class LogsService:
             logger.exception(e)
             raise
 
-    def get_logs(self, length: int) -> list[str]:
+    @staticmethod
+    def get_level_no(level: str) -> int:
+
+        try:
+            return logger.level(level.upper()).no
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def to_local(value: datetime | None) -> datetime | None:
+        """Naive local time, as record times are written."""
+
+        if value is None or value.tzinfo is None:
+            return value
+        return value.astimezone().replace(tzinfo=None)
+
+    def iter_lines_backward(self) -> Iterator[str]:
+        """Lines of the log file from the end, read in blocks, so only the
+        requested tail is read from a large file."""
+
+        with open(self.logs_file_path, "rb") as f:
+            end = position = f.seek(0, os.SEEK_END)
+            rest = b""
+            while position > 0:
+                size = min(self.block_size, position)
+                position -= size
+                f.seek(position)
+                data = f.read(size) + rest
+                if position + size == end and data.endswith(b"\n"):
+                    # no line after the last newline
+                    data = data[:-1]
+                lines = data.split(b"\n")
+                # the first line may continue in the previous block
+                rest = lines.pop(0)
+                for line in reversed(lines):
+                    yield line.decode(errors="replace")
+            if rest:
+                yield rest.decode(errors="replace")
+
+    def iter_records_backward(self) -> Iterator[list[str]]:
+        """Records (header line with continuation lines) from the end."""
+
+        lines = []
+        for line in self.iter_lines_backward():
+            lines.append(line)
+            if RECORD_PATTERN.match(line):
+                lines.reverse()
+                yield lines
+                lines = []
+        if lines:
+            lines.reverse()
+            yield lines
 
-        self.check_file()
-        with open(self.logs_file_path, "r") as f:
-            logger.info("Read logs file from path {}".format(self.logs_file_path))
-            return list(deque(f, maxlen=length))
+    def get_logs(
+        self,
+        length: int,
+        level: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[str]:
+        """Last ``length`` lines of records with at least ``level`` written
+        between ``since`` and ``until``. Blocking, run it in a thread."""
+
+        min_level = self.get_level_no(level) if level else 0
+        since, until = self.to_local(since), self.to_local(until)
+        filtered = bool(level or since or until)
+        records = []
+        count = 0
+        for record in self.iter_records_backward():
+            if count >= length:
+                break
+            match = RECORD_PATTERN.match(record[0])
+            if match is None:
+                if filtered:
+                    continue
+            else:
+                time = datetime.strptime(match.group("time"), TIME_FORMAT)
+                # records are chronological, older ones can't match
+                if since is not None and time < since:
+                    break
+                if until is not None and time > until:
+                    continue
+                if self.get_level_no(match.group("level")) < min_level:
+                    continue
+            records.append(record)
+            count += len(record)
+        lines = [line + "\n" for record in reversed(records) for line in record]
+        return lines[-length:] if length else []
+
+    def is_rotated(self, f) -> bool:
+
+        try:
+            stat = os.stat(self.logs_file_path)
+        except FileNotFoundError:
+            return False
+        return stat.st_ino != os.fstat(f.fileno()).st_ino or stat.st_size < f.tell()
+
+    async def follow(
+        self, length: int = 0, level: str | None = None
+    ) -> AsyncIterator[str]:
+        """Last ``length`` lines, then lines of new records with at least
+        ``level`` as they are written. The file is reopened after rotation."""
+
+        for line in await asyncio.to_thread(self.get_logs, length, level):
+            yield line.rstrip("\n")
+        min_level = self.get_level_no(level) if level else 0
+        f = await asyncio.to_thread(open, self.logs_file_path, "rb")
+        f.seek(0, os.SEEK_END)
+        partial = b""
+        keep = True
+        try:
+            while True:
+                data = await asyncio.to_thread(f.read, self.block_size)
+                if not data:
+                    if await asyncio.to_thread(self.is_rotated, f):
+                        f.close()
+                        f = await asyncio.to_thread(open, self.logs_file_path, "rb")
+                        continue
+                    await asyncio.sleep(self.follow_interval)
+                    continue
+                lines = (partial + data).split(b"\n")
+                partial = lines.pop()
+                for raw in lines:
+                    line = raw.decode(errors="replace")
+                    if match := RECORD_PATTERN.match(line):
+                        keep = self.get_level_no(match.group("level")) >= min_level
+                    if keep:
+                        yield line
+        finally:
+            f.close()
@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict
+
+import requests
+from loguru import logger
+
+from src.common.backend_pool.backend_pool import BackendPool
+from src.common.config.config import Config, get_optional
+
+
+class RerankerService:
+    """Cross-encoder reranking of retrieved hits.
+
+    Hits are found by the similarity of the question to generated questions
+    of a chunk, not to the chunk itself, so the retrieval order is rough. The
+    reranker scores ``(question, body)`` pairs of all hits in one request to
+    a ``/v1/rerank`` endpoint (vLLM, Infinity, llama.cpp, Jina or Cohere
+    compatible) and keeps the ``top_n`` best, so fewer and better chunks go
+    to the prompt. Hits with the same body are scored once, scores are kept
+    in an LRU cache of ``cache_size`` pairs.
+    """
+
+    def __init__(
+        self,
+        pool: BackendPool,
+        model: str | None = None,
+        path: str = "/v1/rerank",
+        top_n: int = 5,
+        cache_size: int = 10000,
+    ):
+
+        self.pool = pool
+        self.model = model
+        self.path = path
+        self.top_n = top_n
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Config) -> "RerankerService | None":
+        """Reranker if ``RERANKER_HOSTS`` or ``RERANKER_HOST`` is set."""
+
+        if not (
+            get_optional(config, "RERANKER_HOSTS")
+            or get_optional(config, "RERANKER_HOST")
+        ):
+            return None
+        request_kwargs = {}
+        if client_cert := get_optional(config, "CLIENT_CERT"):
+            request_kwargs = {"verify": "onti-ca.crt", "cert": (client_cert, "DECFILE")}
+        return cls(
+            BackendPool.from_config(config, "RERANKER", "/health", request_kwargs),
+            model=get_optional(config, "RERANKER_MODEL"),
+            path=get_optional(config, "RERANKER_PATH") or "/v1/rerank",
+            top_n=int(get_optional(config, "RERANKER_TOP_N") or 5),
+            cache_size=int(get_optional(config, "RERANKER_CACHE_SIZE") or 10000),
+        )
+
+    def post_rerank(self, url: str, query: str, documents: list[str]) -> list[float]:
+        """Scores of documents in input order."""
+
+        data = {"query": query, "documents": documents}
+        if self.model:
+            data["model"] = self.model
+        with requests.post(
+            f"{url}{self.path}",
+            json=data,
+            timeout=self.pool.timeout,
+            **self.pool.request_kwargs,
+        ) as response:
+            response.raise_for_status()
+            body = response.json()
+        scores = [0.0] * len(documents)
+        for result in body["results"] if isinstance(body, dict) else body:
+            scores[result["index"]] = float(
+                result.get("relevance_score", result.get("score", 0.0))
+            )
+        return scores
+
+    def score(self, query: str, documents: list[str]) -> list[float]:
+        """Scores of ``(query, document)`` pairs, only pairs missing in the
+        cache are sent to the reranker."""
+
+        with self._lock:
+            cached = {}
+            for document in documents:
+                score = self._cache.get((query, document))
+                if score is not None:
+                    self._cache.move_to_end((query, document))
+                    cached[document] = score
+        missing = list(dict.fromkeys(i for i in documents if i not in cached))
+        if missing:
+            scores = self.pool.call(lambda url: self.post_rerank(url, query, missing))
+            with self._lock:
+                for document, score in zip(missing, scores):
+                    cached[document] = score
+                    self._cache[(query, document)] = score
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return [cached[document] for document in documents]
+
+    def rerank(
+        self, query: str, hits: list[dict], top_n: int | None = None
+    ) -> list[dict]:
+        """``top_n`` hits with distinct bodies ordered by ``rerank_score``.
+        Hits are returned unchanged if the reranker fails."""
+
+        unique = {}
+        for hit in hits:
+            unique.setdefault(hit["_source"]["body"], hit)
+        if not unique:
+            return hits
+        try:
+            scores = self.score(query, list(unique))
+        except Exception as e:
+            logger.warning(f"Reranking failed, using retrieval order: {e!r}")
+            return hits
+        ranked = sorted(
+            (
+                {**hit, "rerank_score": score}
+                for hit, score in zip(unique.values(), scores)
+            ),
+            key=lambda hit: hit["rerank_score"],
+            reverse=True,
+        )
+        return ranked[: top_n or self.top_n]
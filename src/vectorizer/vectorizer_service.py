@@ -1,35 +1,84 @@
-import json
+import asyncio
 
 import requests
 
-from src.common.config.config import Config
+from src.common.backend_pool.backend_pool import BackendPool
+from src.common.config.config import Config, get_optional
+from src.common.exceptions.upstream_unavailable_error import UpstreamUnavailableError
+from src.common.resilience.retry_policy import RetryPolicy
 
 
 class VectorizerService:
     def __init__(self, config: Config):
         self.config = config
-        self.url = f"http://{config.get('VECTORIZER_HOST')}:{config.get('VECTORIZER_PORT')}/v1/embeddings"
+        self.request_kwargs = {"verify": "onti-ca.crt"}
+        # plain http vectorizers (local, benchmark stubs) run without client cert
+        if client_cert := get_optional(config, "CLIENT_CERT"):
+            self.request_kwargs["cert"] = (client_cert, "DECFILE")
+        self.pool = BackendPool.from_config(
+            config, "VECTORIZER", "/health", self.request_kwargs
+        )
+        self.retry_policy = RetryPolicy.from_config(config, "VECTORIZER")
 
-    def embed(self, prompt: str) -> list[float]:
-        client_cert = self.config.get("CLIENT_CERT")
-        ca_cert = "onti-ca.crt"
-        client_key = "DECFILE"
+    def post_embeddings(self, url: str, data: dict) -> list[list[float]]:
+
+        with requests.post(
+            f"{url}/v1/embeddings",
+            json=data,
+            timeout=self.pool.timeout,
+            **self.request_kwargs,
+        ) as response:
+            if response.status_code >= 500:
+                response.raise_for_status()
+            if response.status_code == 200:
+                return [
+                    i["embedding"]
+                    for i in sorted(response.json()["data"], key=lambda i: i["index"])
+                ]
+            raise RuntimeError("Vectorizer ended not with 200: " + response.text)
 
-        data = {
-            "input": prompt,
+    def get_embeddings_data(self, prompts: str | list[str]) -> dict:
+
+        return {
+            "input": prompts,
             "model": self.config.get("VECTORIZER_MODEL"),
             "encoding_format": "float",
         }
 
+    def embed(self, prompt: str) -> list[float]:
+
+        return self.embed_batch(prompt)[0]
+
+    def embed_batch(self, prompts: str | list[str]) -> list[list[float]]:
+        """Embeddings of prompts in one vectorizer request, in input order.
+        Blocks between retries, use ``embed_batch_async`` on the event loop."""
+
+        data = self.get_embeddings_data(prompts)
+        try:
+            return self.retry_policy.call(
+                lambda: self.pool.call(lambda url: self.post_embeddings(url, data))
+            )
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
+            raise ConnectionError("Failed to call vectorizer: " + str(e))
+
+    async def embed_async(self, prompt: str) -> list[float]:
+
+        return (await self.embed_batch_async(prompt))[0]
+
+    async def embed_batch_async(self, prompts: str | list[str]) -> list[list[float]]:
+        """``embed_batch`` for async callers: the request runs in a thread and
+        retries wait without blocking the event loop."""
+
+        data = self.get_embeddings_data(prompts)
         try:
-            with requests.post(
-                self.url,
-                json=data,
-                cert=(client_cert, client_key),
-                verify=ca_cert,
-            ) as response:
-                if response.status_code == 200:
-                    return response.json()["data"][0]["embedding"]
-                raise RuntimeError("Vectorizer ended not with 200: " + response.text)
-        except BaseException as e:
+            return await self.retry_policy.call_async(
+                lambda: asyncio.to_thread(
+                    self.pool.call, lambda url: self.post_embeddings(url, data)
+                )
+            )
+        except UpstreamUnavailableError:
+            raise
+        except Exception as e:
             raise ConnectionError("Failed to call vectorizer: " + str(e))
@@ -0,0 +1,22 @@
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+from uvicorn.workers import UvicornWorker
+
+# the worker class is loaded by the gunicorn master before the app config
+load_dotenv(Path().absolute() / f".env.{os.getenv('APP_ENV')}")
+
+
+class IduUvicornWorker(UvicornWorker):
+    """Uvicorn worker with explicit websocket settings. permessage-deflate is
+    negotiated with clients offering it (browsers do) unless
+    ``WS_PER_MESSAGE_DEFLATE`` is ``false``."""
+
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "ws": "websockets",
+        "ws_per_message_deflate": os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower()
+        != "false",
+        "ws_max_size": int(os.getenv("WS_MAX_SIZE") or 16 * 2**20),
+    }
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Iterator
+
+import pytest
+from elasticsearch import Elasticsearch
+
+from benchmarks.memory_elastic import memory_client
+from benchmarks.rag_suite import BenchmarkConfig
+from src.elastic.elastic_service import ElasticService
+
+INDEX = "1830&general"
+VECTORS = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], [1.0, 1.0, 0.0]]
+
+
+class CountingClient:
+    """Client proxy counting msearch requests and their searches."""
+
+    def __init__(self, client: Elasticsearch):
+
+        self.client = client
+        self.requests: list[int] = []
+
+    def msearch(self, searches: list[dict]):
+
+        self.requests.append(len(searches) // 2)
+        return self.client.msearch(searches=searches)
+
+    def __getattr__(self, name: str):
+
+        return getattr(self.client, name)
+
+
+@pytest.fixture
+def client() -> Iterator[CountingClient]:
+
+    client = memory_client()
+    client.indices.create(index=INDEX)
+    for i, vector in enumerate(VECTORS):
+        client.index(
+            index=INDEX, id=str(i), document={"body": f"doc {i}", "body_vector": vector}
+        )
+    client.indices.refresh(index=INDEX)
+    yield CountingClient(client)
+    # memory nodes share one store
+    client.indices.delete(index=INDEX)
+
+
+def make_service(client: CountingClient, msearch_size: int) -> ElasticService:
+
+    config = BenchmarkConfig(
+        {
+            "SCENARIO_K": "2",
+            "SCENARIO_NUM_K": "10",
+            "ELASTIC_MSEARCH_SIZE": str(msearch_size),
+        }
+    )
+    return ElasticService(config, None, None, {}, {}, client=client)
+
+
+def search(service: ElasticService, queries: int) -> list[list[dict]]:
+
+    batches = [
+        service.get_federated_searches(VECTORS[i % len(VECTORS)], [INDEX])
+        for i in range(queries)
+    ]
+    return asyncio.run(service.search_federated_batch(batches, 2))
+
+
+def test_msearch_is_split_by_size(client: CountingClient):
+
+    hits = search(make_service(client, 2), 5)
+    assert client.requests == [2, 2, 1]
+    assert hits == search(make_service(client, 100), 5)
+    assert client.requests[-1] == 5
+
+
+def test_scenario_hits_have_no_vectors(client: CountingClient):
+
+    (hits,) = search(make_service(client, 100), 1)
+    assert [hit["_source"] for hit in hits] == [{"body": "doc 0"}, {"body": "doc 3"}]
@@ -0,0 +1,42 @@
+from typing import Iterator
+
+import pytest
+from elasticsearch import Elasticsearch
+
+from benchmarks.memory_elastic import memory_client
+from src.elastic.index_registry import IndexRegistry
+
+INDEX = "1830&analyze"
+
+
+@pytest.fixture
+def client() -> Iterator[Elasticsearch]:
+
+    client = memory_client()
+    yield client
+    # memory nodes share one store
+    if client.indices.exists(index=INDEX):
+        client.indices.delete(index=INDEX)
+
+
+def test_index_created_by_another_worker(client: Elasticsearch):
+
+    registry = IndexRegistry(client)
+    registry.refresh()
+    client.indices.create(index=INDEX)
+
+    assert not registry.exists(INDEX)
+    assert registry.exists_live(INDEX)
+    assert registry.exists(INDEX)
+
+
+def test_index_deleted_by_another_worker(client: Elasticsearch):
+
+    client.indices.create(index=INDEX)
+    registry = IndexRegistry(client)
+    registry.refresh()
+    client.indices.delete(index=INDEX)
+
+    assert registry.exists(INDEX)
+    assert not registry.exists_live(INDEX)
+    assert INDEX not in registry.get_indexes()
@@ -0,0 +1,49 @@
+import gzip
+import json
+
+from benchmarks.rag_suite import BenchmarkConfig
+from src.common.geo.layer_encoder import LayerEncoder
+
+
+def make_layer(name: str) -> dict:
+
+    return {
+        "type": "FeatureCollection",
+        "features": [],
+        "name": name,
+        "source": {
+            "index": "1830&general",
+            "version": "1830&general_v1",
+            "doc_id": "1",
+        },
+    }
+
+
+def decode(data: bytes) -> dict:
+
+    return json.loads(gzip.decompress(data))
+
+
+def test_ttl_is_bounded_by_registry_refresh():
+
+    config = BenchmarkConfig(
+        {"LAYER_CACHE_TTL": "600", "ELASTIC_INDEX_REFRESH_INTERVAL": "30"}
+    )
+    assert LayerEncoder.from_config(config).ttl == 30
+    assert LayerEncoder.from_config(BenchmarkConfig({})).ttl == 60
+
+
+def test_recreated_index_layer_after_invalidate():
+
+    encoder = LayerEncoder()
+    encoder.encode(make_layer("old"))
+    assert decode(encoder.encode(make_layer("new")))["name"] == "old"
+    encoder.invalidate("1830&general")
+    assert decode(encoder.encode(make_layer("new")))["name"] == "new"
+
+
+def test_expired_layer_is_encoded_again():
+
+    encoder = LayerEncoder(ttl=0)
+    encoder.encode(make_layer("old"))
+    assert decode(encoder.encode(make_layer("new")))["name"] == "new"
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+from typing import Iterator
+
+import pytest
+
+from src.llm.llm_service import LlmService
+
+
+class SlowLlmService(LlmService):
+    """Service streaming ``chunks`` with a blocking delay before each one."""
+
+    def __init__(self, chunks: list[dict], delay: float = 0.05, error=None):
+
+        self.chunks = chunks
+        self.delay = delay
+        self.error = error
+        self.closed = threading.Event()
+
+    def iter_generation(self, headers: dict, data: dict) -> Iterator[dict]:
+
+        try:
+            for chunk in self.chunks:
+                time.sleep(self.delay)
+                yield chunk
+            if self.error:
+                raise self.error
+        finally:
+            self.closed.set()
+
+
+CHUNKS = [{"response": str(i), "done": False} for i in range(5)] + [{"done": True}]
+
+
+def test_chunks_are_streamed_in_order():
+
+    async def collect():
+        return [i async for i in SlowLlmService(CHUNKS, 0).aiter_generation({}, {})]
+
+    assert asyncio.run(collect()) == CHUNKS
+
+
+def test_event_loop_is_not_blocked_between_chunks():
+
+    async def run() -> int:
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        async for _ in SlowLlmService(CHUNKS).aiter_generation({}, {}):
+            pass
+        ticker.cancel()
+        return ticks
+
+    # 6 chunks with 50 ms delay each leave ~30 ticks of 10 ms
+    assert asyncio.run(run()) >= 15
+
+
+def test_stream_error_is_raised_to_consumer():
+
+    async def consume(service: LlmService):
+        async for _ in service.aiter_generation({}, {}):
+            pass
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(consume(SlowLlmService(CHUNKS[:2], 0, ConnectionError())))
+
+
+def test_stream_is_closed_when_consumer_stops():
+
+    service = SlowLlmService(CHUNKS, 0.1)
+
+    async def first() -> dict:
+        stream = service.aiter_generation({}, {})
+        chunk = await anext(stream)
+        await stream.aclose()
+        return chunk
+
+    assert asyncio.run(first()) == CHUNKS[0]
+    # the reading thread stops after the next chunk, not at the end of stream
+    assert service.closed.wait(0.3)
@@ -0,0 +1,78 @@
+import io
+
+import pytest
+
+from src.elastic.doc_parser import BaseParser, PdfParser
+
+
+def make_pdf(pages: list[list[str]]) -> bytes:
+    """Pdf with a Helvetica text layer, one text line per item."""
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for lines in pages:
+        shown = " ".join(f"({line}) Tj T*" for line in lines)
+        content = f"BT /F1 10 Tf 12 TL 50 800 Td {shown} ET".encode()
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = (
+        f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+    )
+
+    buffer = io.BytesIO()
+    buffer.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(buffer.tell())
+        buffer.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = buffer.tell()
+    buffer.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        buffer.write(b"%010d 00000 n \n" % offset)
+    buffer.write(
+        b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (len(objects) + 1, xref)
+    )
+    return buffer.getvalue()
+
+
+def parse(pages: list[list[str]]) -> list[str]:
+
+    return [block.text for block in PdfParser.iter_blocks(io.BytesIO(make_pdf(pages)))]
+
+
+def test_page_numbers_in_footer_and_header_are_dropped():
+
+    pages = [["Street width is regulated.", "1"], ["- 2 -", "Setback is 5 m."]]
+    assert parse(pages) == ["Street width is regulated.", "Setback is 5 m."]
+
+
+def test_numeric_table_cells_are_kept():
+
+    pages = [["Zone height, m:", "25", "40", "Setback is 5 m.", "3"]]
+    assert parse(pages) == ["Zone height, m:", "25 40 Setback is 5 m."]
+
+
+def test_paragraph_continues_on_next_page():
+
+    pages = [["Buildings are placed", "7"], ["8", "along the red line."]]
+    assert parse(pages) == ["Buildings are placed along the red line."]
+
+
+def test_base_parser_requires_iter_blocks():
+
+    class Parser(BaseParser):
+        pass
+
+    with pytest.raises(TypeError):
+        Parser()
@@ -0,0 +1,100 @@
+import ast
+import json
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from src.elastic.doc_parser import DocBlock, attach_table_context
+
+DEV_DATA = Path(__file__).resolve().parent.parent / "dev_data"
+
+
+def dev_data_blocks() -> Iterator[DocBlock]:
+    """Blocks built from ``dev_data`` records: every string field is a text
+    block, every record is a ``field | value`` table. Plain text records are
+    a single text block."""
+
+    for name in ("test_common_json_to_load.json", "index_test_data.json"):
+        for record in json.loads((DEV_DATA / name).read_text(encoding="utf-8")):
+            try:
+                fields = ast.literal_eval(record["text"])
+            except (ValueError, SyntaxError):
+                yield DocBlock(record["text"], "text")
+                continue
+            for value in fields.values():
+                if isinstance(value, str) and value:
+                    yield DocBlock(value, "text")
+            rows = "\n".join(f"| {key} | {value} |" for key, value in fields.items())
+            yield DocBlock(f"| поле | значение |\n| --- | --- |\n{rows}", "table")
+
+
+def make_blocks(kinds: str) -> list[DocBlock]:
+    """``kinds`` is a string of ``t`` (text) and ``T`` (table) blocks."""
+
+    return [
+        DocBlock(f"block {i}", "table" if kind == "T" else "text")
+        for i, kind in enumerate(kinds)
+    ]
+
+
+def list_contexts(blocks: list[DocBlock], size: int) -> list[tuple[str, str]]:
+    """Previous list-based implementation. Its forward slice started at the
+    table itself, here it starts after the table as in the sliding window."""
+
+    result = []
+    for index, block in enumerate(blocks):
+        if block.kind != "table":
+            continue
+        before = "\n".join(
+            i.text for i in blocks[max(index - size, 0) : index] if i.kind == "text"
+        )
+        after = "\n".join(
+            i.text for i in blocks[index + 1 : index + 1 + size] if i.kind == "text"
+        )
+        result.append((before, after))
+    return result
+
+
+def window_contexts(blocks: list[DocBlock], size: int) -> list[tuple[str, str]]:
+
+    return [
+        (block.before, block.after)
+        for block in attach_table_context(iter(blocks), size)
+        if block.kind == "table"
+    ]
+
+
+def test_blocks_passed_through_in_order():
+
+    blocks = make_blocks("ttTtTTt")
+    assert list(attach_table_context(iter(blocks), 2)) == blocks
+
+
+def test_zero_size_leaves_context_empty():
+
+    assert window_contexts(make_blocks("tTt"), 0) == [("", "")]
+
+
+def test_size_one_takes_adjacent_text_only():
+
+    assert window_contexts(make_blocks("ttTtt"), 1) == [("block 1", "block 3")]
+
+
+def test_adjacent_tables_are_not_context():
+
+    assert window_contexts(make_blocks("tTTt"), 1) == [("block 0", ""), ("", "block 3")]
+
+
+@pytest.mark.parametrize("kinds", ["T", "tT", "Tt", "tTt", "TT"])
+def test_document_shorter_than_window(kinds: str):
+
+    blocks = make_blocks(kinds)
+    assert window_contexts(blocks, 5) == list_contexts(blocks, 5)
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 5, 50])
+def test_matches_list_implementation_on_dev_data(size: int):
+
+    blocks = list(dev_data_blocks())
+    assert window_contexts(blocks, size) == list_contexts(blocks, size)
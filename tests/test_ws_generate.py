@@ -0,0 +1,62 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from src.dependencies import get_idu_llm_service, get_layer_encoder
+from src.idu_llm.dto.validate_in_order import validate_in_order
+from src.idu_llm.idu_llm_controller import idu_llm_router
+
+GEO_FILTER = {"point": [30.3, 59.93], "radius": 500}
+GENERAL_REQUEST = {
+    "index_name": "project",
+    "user_request": "Какие ограничения действуют?",
+    "scenario_id": 1830,
+    "mode": "Анализ территории проекта",
+    "geo_filter": GEO_FILTER,
+}
+
+
+class IduLLMServiceStub:
+    """Service that fails the test if the request gets past validation."""
+
+    async def resolve_indexes(self, message_info):
+
+        raise AssertionError(f"Invalid request was not rejected: {message_info}")
+
+
+@pytest.fixture
+def client() -> TestClient:
+
+    app = FastAPI()
+    app.include_router(idu_llm_router)
+    app.dependency_overrides[get_idu_llm_service] = IduLLMServiceStub
+    app.dependency_overrides[get_layer_encoder] = lambda: None
+    return TestClient(app)
+
+
+def test_geo_filter_on_general_mode_is_rejected():
+
+    with pytest.raises(HTTPException) as error:
+        validate_in_order(GENERAL_REQUEST)
+    assert error.value.status_code == 400
+
+
+def test_simple_request_falls_back_to_base_request():
+
+    message_info = validate_in_order({"user_request": "Что ты умеешь?"})
+    assert type(message_info).__name__ == "BaseLlmRequest"
+
+
+def test_ws_geo_filter_on_general_mode_closes_with_policy_violation(
+    client: TestClient,
+):
+
+    with client.websocket_connect("/ws/generate") as websocket:
+        websocket.send_json(GENERAL_REQUEST)
+        message = websocket.receive_json()
+        with pytest.raises(WebSocketDisconnect) as disconnect:
+            websocket.receive_text()
+    assert message["http_code"] == 400
+    assert message["input"]["mode"] == GENERAL_REQUEST["mode"]
+    assert disconnect.value.code == 1008